@@ -19,13 +19,66 @@ Output (JSON to stdout):
   "surface": [ { "lat": 24, "lng": -125, "cloud_total": 85, ... }, ... ],
   "pressure": [ { "lat": 24, "lng": -125, "pressure_level": 850, ... }, ... ]
 }
+
+COPY output:
+  Passing --format copy-text or copy-binary (plus --init-time, --forecast-hour
+  and --copy-dir) writes one PostgreSQL COPY file per table instead, with
+  columns in a_hrrr_surface / a_hrrr_pressure order, and prints a small JSON
+  manifest to stdout:
+
+  COPY a_hrrr_surface (init_time, forecast_hour, ...) FROM STDIN (FORMAT binary)
+
+Airport profiles:
+  Passing --airports airports.csv with one --profile-pressure FH=PATH per
+  forecast hour extracts native-resolution soundings (altitude, temperature,
+  dewpoint, RH, wind) at every pressure level above each field, keyed by
+  airport ident, instead of the 1° grid.
+
+Sub-hourly:
+  Passing --subhourly /tmp/hrrr_subh_f01.grib2 processes every 15-minute valid
+  time in the file as one stacked time dimension and prints columnar JSON:
+  { "steps_min": [15, 30, 45, 60], "points": [[lat, lng], ...],
+    "surface": { "cloud_total": [[...per point] per step], ... } }
+
+Cross-cycle delta:
+  Adding --delta-against state.json --delta-out delta.json compares this run
+  to the state clients hold for the same valid time, using per-variable
+  tolerances (DELTA_TOLERANCES, --delta-tolerance NAME=VALUE), and writes only
+  the changed rows plus a base64 bitmap over the row order per table.
+  --delta-state-out next-state.json writes that state with the delta applied;
+  pass it as the next cycle's --delta-against. Diffing against the previous
+  cycle's raw output instead would let changes below tolerance accumulate
+  unseen on clients.
+
+Data quality:
+  Adding --quality-out quality.json writes NaN fraction, min, max, mean and
+  out-of-range count of every full-resolution field the extractor reads
+  (QUALITY_RANGES), per typeOfLevel and level, with anomaly flags (all_nan,
+  constant, out_of_range and, against --quality-against prev.json from the
+  previous cycle, nan_increase, mean_shift). "ok": false means the forecast
+  hour should not be activated.
+
+Point time series:
+  Passing --series-out PREFIX with one --hour-output FH=PATH per forecast hour
+  (the JSON written by earlier runs) transposes the cycle into a point-major
+  float32 cube PREFIX.bin of shape (point, forecast_hour, variable), indexed by
+  PREFIX.json, so a meteogram reads one contiguous record per point.
+
+Forecast-window aggregates:
+  Adding --window-hours 3,6 to --series-out also writes, per window length L,
+  PREFIX.wL.bin/json: a float32 grid of shape (window_start, point, aggregate)
+  holding the worst flight category, minimum ceiling, minimum visibility,
+  maximum gust and maximum cloud cover over forecast hours fh .. fh + L - 1.
 """
 
 import argparse
 import json
+import os
+import struct
 import sys
 import math
 import warnings
+from datetime import datetime, timedelta, timezone
 
 import numpy as np
 
@@ -33,6 +86,17 @@ import numpy as np
 warnings.filterwarnings('ignore', category=FutureWarning)
 warnings.filterwarnings('ignore', message='.*eccodes.*')
 
+# Pressure level to standard-atmosphere altitude mapping (feet MSL)
+LEVEL_ALTITUDES_FT = {
+    1000: 360, 950: 1640, 925: 2500, 900: 3200, 850: 5000,
+    800: 6200, 700: 10000, 600: 14000, 500: 18000,
+    400: 24000, 300: 30000, 250: 34000, 200: 39000, 150: 44000,
+}
+
+# Flight categories as ordered codes (higher is worse) for array outputs
+FLIGHT_CATEGORY_CODES = {'VFR': 0, 'MVFR': 1, 'IFR': 2, 'LIFR': 3}
+FLIGHT_CATEGORY_NAMES = {code: name for name, code in FLIGHT_CATEGORY_CODES.items()}
+
 
 def load_grib2(path, filter_keys=None):
     """Load a GRIB2 file as an xarray Dataset using cfgrib."""
@@ -63,6 +127,74 @@ def nearest_idx(arr, value):
     return idx
 
 
+def nearest_idx_array(arr, values):
+    """Vectorized nearest_idx: nearest index in a sorted array for each value."""
+    values = np.asarray(values, dtype=float)
+    if len(arr) == 1:
+        return np.zeros(values.shape, dtype=int)
+    idx = np.clip(np.searchsorted(arr, values, side='left'), 1, len(arr) - 1)
+    take_left = np.abs(values - arr[idx - 1]) < np.abs(values - arr[idx])
+    return idx - take_left
+
+
+def grid_lat_lng(ds):
+    """Lat/lng arrays of a cfgrib Dataset, with longitude in -180..180."""
+    lats = ds.latitude.values
+    lngs = ds.longitude.values
+    if lngs.max() > 180:
+        lngs = np.where(lngs > 180, lngs - 360, lngs)
+    return lats, lngs
+
+
+def nearest_grid_indices(lats, lngs, pt_lats, pt_lngs, stride=16, chunk=512):
+    """Nearest grid (y, x) indices for many points in one vectorized search.
+
+    Regular grids (1D lat/lng) use searchsorted. Curvilinear grids such as the
+    HRRR Lambert conformal grid (2D lat/lng) are searched coarse-to-fine: an
+    argmin over every `stride`-th grid point, then an exact argmin over the
+    (2*stride+1)² neighbourhood around the coarse hit. Both run `chunk`
+    points at a time to bound memory.
+    """
+    pt_lats = np.asarray(pt_lats, dtype=float)
+    pt_lngs = np.asarray(pt_lngs, dtype=float)
+
+    if lats.ndim == 1:
+        return nearest_idx_array(lats, pt_lats), nearest_idx_array(lngs, pt_lngs)
+
+    ny, nx = lats.shape
+    coarse_lats = lats[::stride, ::stride]
+    coarse_lngs = lngs[::stride, ::stride]
+    flat_lats = coarse_lats.ravel()
+    flat_lngs = coarse_lngs.ravel()
+
+    n = len(pt_lats)
+    coarse_flat = np.empty(n, dtype=int)
+    for start in range(0, n, chunk):
+        end = start + chunk
+        dist = ((flat_lats[None, :] - pt_lats[start:end, None]) ** 2
+                + (flat_lngs[None, :] - pt_lngs[start:end, None]) ** 2)
+        coarse_flat[start:end] = np.argmin(dist, axis=1)
+    cy, cx = np.unravel_index(coarse_flat, coarse_lats.shape)
+
+    # Refine in chunks: each point's window is (2*stride+1)² float64 values
+    offsets = np.arange(-stride, stride + 1)
+    y_idx = np.empty(n, dtype=int)
+    x_idx = np.empty(n, dtype=int)
+    for start in range(0, n, chunk):
+        end = min(start + chunk, n)
+        win_y = np.clip(cy[start:end, None] * stride + offsets[None, :], 0, ny - 1)
+        win_x = np.clip(cx[start:end, None] * stride + offsets[None, :], 0, nx - 1)
+        win_lats = lats[win_y[:, :, None], win_x[:, None, :]]
+        win_lngs = lngs[win_y[:, :, None], win_x[:, None, :]]
+        dist = ((win_lats - pt_lats[start:end, None, None]) ** 2
+                + (win_lngs - pt_lngs[start:end, None, None]) ** 2)
+        wy, wx = np.unravel_index(dist.reshape(end - start, -1).argmin(axis=1), dist.shape[1:])
+        rows = np.arange(end - start)
+        y_idx[start:end] = win_y[rows, wy]
+        x_idx[start:end] = win_x[rows, wx]
+    return y_idx, x_idx
+
+
 def uv_to_dir_speed(u, v):
     """Convert U/V wind components (m/s) to direction (degrees true) and speed (knots)."""
     speed_ms = math.sqrt(u * u + v * v)
@@ -76,6 +208,25 @@ def uv_to_dir_speed(u, v):
     return round(direction), speed_kt
 
 
+def uv_to_dir_speed_array(u, v):
+    """Vectorized uv_to_dir_speed; NaN where either component is missing."""
+    u = np.asarray(u, dtype=float)
+    v = np.asarray(v, dtype=float)
+    speed_ms = np.sqrt(u * u + v * v)
+    speed_kt = np.round(speed_ms * 1.944)
+    direction = np.round((270 - np.degrees(np.arctan2(v, u))) % 360)
+    calm = speed_ms < 0.01
+    return np.where(calm, 0, direction), np.where(calm, 0, speed_kt)
+
+
+def dewpoint_from_rh(temp_c, rh):
+    """Dewpoint (°C) from temperature (°C) and relative humidity (%), Magnus formula."""
+    a, b = 17.625, 243.04
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = np.log(np.clip(rh, 1, 100) / 100.0) + a * temp_c / (b + temp_c)
+        return b * gamma / (a - gamma)
+
+
 def gpm_to_feet(gpm):
     """Convert geopotential meters to feet MSL."""
     if gpm is None or math.isnan(gpm):
@@ -114,6 +265,20 @@ def compute_flight_category(ceiling_ft, visibility_sm):
     return 'VFR'
 
 
+def compute_flight_category_array(ceiling_ft, visibility_sm):
+    """Vectorized compute_flight_category returning FLIGHT_CATEGORY_CODES values.
+
+    NaN ceiling/visibility behave like None in the scalar version.
+    """
+    ceiling_ft = np.asarray(ceiling_ft, dtype=float)
+    visibility_sm = np.asarray(visibility_sm, dtype=float)
+    codes = np.zeros(np.broadcast(ceiling_ft, visibility_sm).shape, dtype=np.int8)
+    with np.errstate(invalid='ignore'):
+        for max_ceiling, max_vis, code in ((3000, 5, 1), (1000, 3, 2), (500, 1, 3)):
+            codes = np.where((ceiling_ft < max_ceiling) | (visibility_sm < max_vis), code, codes)
+    return codes
+
+
 def safe_float(val):
     """Safely convert a numpy/xarray value to a Python float, handling NaN."""
     if val is None:
@@ -144,8 +309,12 @@ def extract_value(ds, var_name, lat_idx, lng_idx):
     return None
 
 
-def process_surface(surface_path, grid_lats, grid_lngs):
-    """Extract surface-level data from wrfsfcf GRIB2 file."""
+def process_surface(surface_path, grid_lats, grid_lngs, quality=None):
+    """Extract surface-level data from wrfsfcf GRIB2 file.
+
+    With a quality list, field_stats of every checked full-resolution field
+    are appended to it, per hypercube and level.
+    """
     import cfgrib
 
     # Open all datasets from the GRIB file (may have multiple hypercubes)
@@ -157,6 +326,9 @@ def process_surface(surface_path, grid_lats, grid_lngs):
         for var in ds.data_vars:
             var_ds[var] = ds
 
+    if quality is not None:
+        collect_field_stats(quality, all_datasets)
+
     # Get lat/lon arrays from any dataset
     ref_ds = all_datasets[0]
     lats = ref_ds.latitude.values
@@ -252,16 +424,13 @@ def process_surface(surface_path, grid_lats, grid_lngs):
     return results
 
 
-def process_pressure(pressure_path, grid_lats, grid_lngs, levels):
-    """Extract pressure-level data from wrfprsf GRIB2 file."""
-    import cfgrib
+def process_pressure(pressure_path, grid_lats, grid_lngs, levels, quality=None):
+    """Extract pressure-level data from wrfprsf GRIB2 file.
 
-    # Pressure level to altitude mapping (feet MSL)
-    level_altitudes = {
-        1000: 360, 950: 1640, 925: 2500, 900: 3200, 850: 5000,
-        800: 6200, 700: 10000, 600: 14000, 500: 18000,
-        400: 24000, 300: 30000, 250: 34000, 200: 39000, 150: 44000,
-    }
+    With a quality list, field_stats of every checked full-resolution field
+    at each level are appended to it.
+    """
+    import cfgrib
 
     results = []
 
@@ -291,6 +460,9 @@ def process_pressure(pressure_path, grid_lats, grid_lngs, levels):
             for var in ds.data_vars:
                 var_ds[var] = ds
 
+        if quality is not None:
+            collect_field_stats(quality, datasets)
+
         ref_ds = datasets[0]
         lats = ref_ds.latitude.values
         lngs = ref_ds.longitude.values
@@ -298,7 +470,7 @@ def process_pressure(pressure_path, grid_lats, grid_lngs, levels):
         if lngs.max() > 180:
             lngs = np.where(lngs > 180, lngs - 360, lngs)
 
-        alt_ft = level_altitudes.get(level_hpa, 0)
+        alt_ft = LEVEL_ALTITUDES_FT.get(level_hpa, 0)
 
         for glat in grid_lats:
             for glng in grid_lngs:
@@ -348,10 +520,912 @@ def process_pressure(pressure_path, grid_lats, grid_lngs, levels):
     return results
 
 
+# --- Airport vertical profiles ---
+
+# cfgrib short names gathered for each profile (dpt is optional in wrfprsf)
+PROFILE_VARS = ('gh', 't', 'dpt', 'r', 'u', 'v')
+
+PROFILE_FIELDS = [
+    'altitude_ft', 'temperature_c', 'dewpoint_c',
+    'relative_humidity', 'wind_dir', 'wind_speed_kt',
+]
+
+
+def parse_hour_specs(specs):
+    """Parse repeated FH=PATH arguments into [(forecast_hour, path)] sorted by hour."""
+    hours = []
+    for spec in specs or []:
+        fh, sep, path = spec.partition('=')
+        if not sep or not path:
+            raise ValueError(f"Expected FH=PATH, got '{spec}'")
+        hours.append((int(fh), path))
+    return sorted(hours)
+
+
+def load_airports(path):
+    """Read an airport CSV with ident, lat, lng and elevation_ft columns."""
+    import csv
+
+    idents, lats, lngs, elevations = [], [], [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            idents.append(row['ident'])
+            lats.append(float(row['lat']))
+            lngs.append(float(row['lng']))
+            elevations.append(float(row.get('elevation_ft') or 0))
+    return idents, np.array(lats), np.array(lngs), np.array(elevations)
+
+
+def open_pressure_datasets(pressure_path):
+    """Open every isobaric hypercube of a wrfprsf file."""
+    import cfgrib
+
+    return cfgrib.open_datasets(
+        pressure_path,
+        backend_kwargs={'filter_by_keys': {'typeOfLevel': 'isobaricInhPa'}},
+    )
+
+
+def gather_pressure_points(datasets, levels, y_idx, x_idx, var_names=PROFILE_VARS):
+    """Gather (level, point) arrays of each variable at the given grid indices.
+
+    Fields are loaded one level at a time and reduced to the gathered points,
+    so only a single native-resolution level is in memory at once, never the
+    full (level, y, x) stack.
+    """
+    level_pos = {lvl: k for k, lvl in enumerate(levels)}
+    gathered = {}
+    for ds in datasets:
+        if 'isobaricInhPa' not in ds.coords:
+            continue
+        ds_levels = np.atleast_1d(ds['isobaricInhPa'].values).astype(int)
+        for var in var_names:
+            if var not in ds.data_vars:
+                continue
+            array = ds[var]
+            stacked = 'isobaricInhPa' in array.dims
+            out = gathered.setdefault(var, np.full((len(levels), len(y_idx)), np.nan))
+            for k, lvl in enumerate(ds_levels):
+                if lvl in level_pos:
+                    field = array.isel({'isobaricInhPa': k}) if stacked else array
+                    out[level_pos[lvl]] = field.values[y_idx, x_idx]
+    return gathered
+
+
+def derive_profile_fields(gathered, levels):
+    """Convert gathered raw (level, point) arrays to profile fields in display units."""
+    n_points = next(iter(gathered.values())).shape[1] if gathered else 0
+    missing = np.full((len(levels), n_points), np.nan)
+
+    # Geopotential height where available, standard-atmosphere altitude otherwise
+    std_alt = np.array([LEVEL_ALTITUDES_FT.get(lvl, 0) for lvl in levels], dtype=float)
+    altitude_ft = np.round(gathered.get('gh', missing) * 3.28084)
+    altitude_ft = np.where(np.isnan(altitude_ft), std_alt[:, None], altitude_ft)
+
+    temp_c = np.round(gathered.get('t', missing) - 273.15, 1)
+    rh = gathered.get('r', missing)
+    if 'dpt' in gathered:
+        dewpoint_c = gathered['dpt'] - 273.15
+    else:
+        dewpoint_c = dewpoint_from_rh(gathered.get('t', missing) - 273.15, rh)
+    wind_dir, wind_speed_kt = uv_to_dir_speed_array(
+        gathered.get('u', missing), gathered.get('v', missing),
+    )
+
+    return {
+        'altitude_ft': altitude_ft,
+        'temperature_c': temp_c,
+        'dewpoint_c': np.round(dewpoint_c, 1),
+        'relative_humidity': np.clip(np.round(rh), 0, 100),
+        'wind_dir': wind_dir,
+        'wind_speed_kt': wind_speed_kt,
+    }
+
+
+def to_json_values(arr, as_int=False):
+    """Array → nested lists with NaN as None (ints for integer fields)."""
+    if arr.ndim > 1:
+        return [to_json_values(a, as_int) for a in arr]
+    if as_int:
+        return [None if math.isnan(x) else int(x) for x in arr.tolist()]
+    return [None if math.isnan(x) else x for x in arr.tolist()]
+
+
+def build_airport_profiles(idents, elevations, grid_idx, levels, hour_fields):
+    """Assemble the per-cycle profile table keyed by airport.
+
+    hour_fields is [(forecast_hour, derive_profile_fields(...))]. Each field
+    is a (forecast_hour, level) list per airport, with levels below the
+    field elevation set to null.
+    """
+    hours = [fh for fh, _ in hour_fields]
+    # (field, hour, level, point) → mask levels at or below the field
+    cube = {f: np.stack([fields[f] for _, fields in hour_fields]) for f in PROFILE_FIELDS}
+    below = cube['altitude_ft'] <= elevations[None, None, :]
+    int_fields = {'altitude_ft', 'relative_humidity', 'wind_dir', 'wind_speed_kt'}
+
+    columns = {}
+    for f in PROFILE_FIELDS:
+        masked = np.where(below, np.nan, cube[f])
+        # (hour, level, point) → (point, hour, level)
+        columns[f] = to_json_values(np.transpose(masked, (2, 0, 1)), f in int_fields)
+
+    y_idx, x_idx = grid_idx
+    airports = {}
+    for p, ident in enumerate(idents):
+        entry = {
+            'elevation_ft': int(round(elevations[p])),
+            'grid': [int(y_idx[p]), int(x_idx[p])],
+        }
+        for f in PROFILE_FIELDS:
+            entry[f] = columns[f][p]
+        airports[ident] = entry
+
+    return {
+        'levels': list(levels),
+        'forecast_hours': hours,
+        'fields': PROFILE_FIELDS,
+        'airports': airports,
+    }
+
+
+def process_airport_profiles(airports_path, hour_paths, levels):
+    """Extract native-resolution profiles for every airport and forecast hour."""
+    idents, pt_lats, pt_lngs, elevations = load_airports(airports_path)
+
+    grid_idx = None
+    hour_fields = []
+    for fh, path in hour_paths:
+        datasets = open_pressure_datasets(path)
+        if not datasets:
+            print(f"Warning: no pressure data in {path}", file=sys.stderr)
+            continue
+        if grid_idx is None:
+            lats, lngs = grid_lat_lng(datasets[0])
+            grid_idx = nearest_grid_indices(lats, lngs, pt_lats, pt_lngs)
+        gathered = gather_pressure_points(datasets, levels, *grid_idx)
+        hour_fields.append((fh, derive_profile_fields(gathered, levels)))
+
+    if not hour_fields:
+        return {'levels': list(levels), 'forecast_hours': [], 'fields': PROFILE_FIELDS,
+                'airports': {}}
+    return build_airport_profiles(idents, elevations, grid_idx, levels, hour_fields)
+
+
+# --- Sub-hourly (wrfsubhf) processing ---
+
+# cfgrib short names read from wrfsubhf; every message set holds several
+# 15-minute valid times, stacked on the `step` dimension
+SUBHOURLY_VARS = ('tcc', 'lcc', 'mcc', 'hcc', 'ceil', 'gh', 'vis',
+                  'u10', 'v10', 'gust', 'i10fg', 't2m')
+
+SUBHOURLY_INT_FIELDS = {
+    'cloud_total', 'cloud_low', 'cloud_mid', 'cloud_high', 'ceiling_ft',
+    'cloud_base_ft', 'wind_dir', 'wind_speed_kt', 'wind_gust_kt',
+}
+
+
+def step_minutes(ds):
+    """Valid-time offsets (minutes from init) of a dataset's `step` coordinate."""
+    if 'step' not in ds.coords:
+        return np.array([0])
+    steps = np.atleast_1d(ds['step'].values)
+    return (steps / np.timedelta64(1, 'm')).astype(int)
+
+
+def gather_surface_steps(datasets, y_idx, x_idx, var_names=SUBHOURLY_VARS):
+    """Gather every variable at the grid indices for all valid times at once.
+
+    Returns (steps_min, {var: (step, point) array}). A variable split across
+    hypercubes (e.g. instantaneous and averaged steps) is merged from all of
+    them; where two hold the same step, the first one wins. Steps a variable
+    has in no hypercube are NaN.
+    """
+    per_var = {}
+    for ds in datasets:
+        minutes = step_minutes(ds)
+        for var in var_names:
+            if var not in ds.data_vars:
+                continue
+            values = ds[var].values
+            if values.ndim == 2:
+                values = values[np.newaxis]
+            per_var.setdefault(var, []).append((minutes, values[:, y_idx, x_idx]))
+
+    steps = sorted({int(m) for parts in per_var.values() for minutes, _ in parts for m in minutes})
+    step_pos = {m: k for k, m in enumerate(steps)}
+    gathered = {}
+    for var, parts in per_var.items():
+        out = np.full((len(steps), len(y_idx)), np.nan)
+        filled = np.zeros(len(steps), dtype=bool)
+        for minutes, values in parts:
+            for m, row in zip(minutes, values):
+                k = step_pos[int(m)]
+                if not filled[k]:
+                    out[k] = row
+                    filled[k] = True
+        gathered[var] = out
+    return steps, gathered
+
+
+def derive_surface_arrays(gathered):
+    """Vectorized equivalent of the per-point derivations in process_surface.
+
+    Works on (step, point) arrays; NaN plays the role of None.
+    """
+    shape = next(iter(gathered.values())).shape if gathered else (0, 0)
+    missing = np.full(shape, np.nan)
+
+    def raw(name):
+        return gathered.get(name, missing)
+
+    def clamp_cloud(v):
+        return np.clip(np.round(v), 0, 100)
+
+    ceiling_ft = np.round(raw('ceil') * 3.28084)
+    cloud_base_ft = np.round((raw('gh') if 'gh' in gathered else raw('ceil')) * 3.28084)
+    visibility_sm = np.round(raw('vis') / 1609.34, 1)
+    wind_dir, wind_speed_kt = uv_to_dir_speed_array(raw('u10'), raw('v10'))
+    gust_ms = np.where(np.isnan(raw('gust')), raw('i10fg'), raw('gust'))
+
+    return {
+        'cloud_total': clamp_cloud(raw('tcc')),
+        'cloud_low': clamp_cloud(raw('lcc')),
+        'cloud_mid': clamp_cloud(raw('mcc')),
+        'cloud_high': clamp_cloud(raw('hcc')),
+        'ceiling_ft': ceiling_ft,
+        'cloud_base_ft': cloud_base_ft,
+        'flight_category': compute_flight_category_array(ceiling_ft, visibility_sm),
+        'visibility_sm': visibility_sm,
+        'wind_dir': wind_dir,
+        'wind_speed_kt': wind_speed_kt,
+        'wind_gust_kt': np.round(gust_ms * 1.944),
+        'temperature_c': np.round(raw('t2m') - 273.15, 1),
+    }
+
+
+def pack_subhourly(steps, points, fields):
+    """Columnar output: one (step, point) list per field, points listed once.
+
+    Row dicts repeat every key name per point; at 4 valid times per file the
+    columnar form keeps the output about the size of one hourly row set.
+    """
+    surface = {}
+    for name, values in fields.items():
+        if name == 'flight_category':
+            surface[name] = [[FLIGHT_CATEGORY_NAMES[int(c)] for c in row] for row in values]
+        else:
+            surface[name] = to_json_values(values, name in SUBHOURLY_INT_FIELDS)
+    return {'steps_min': list(steps), 'points': points, 'surface': surface}
+
+
+def process_subhourly(subhourly_path, grid_lats, grid_lngs):
+    """Extract every 15-minute valid time of a wrfsubhf file in one pass."""
+    import cfgrib
+
+    datasets = cfgrib.open_datasets(subhourly_path)
+    lats, lngs = grid_lat_lng(datasets[0])
+
+    pt_lats, pt_lngs = np.meshgrid(grid_lats, grid_lngs, indexing='ij')
+    pt_lats, pt_lngs = pt_lats.ravel(), pt_lngs.ravel()
+    y_idx, x_idx = nearest_grid_indices(lats, lngs, pt_lats, pt_lngs)
+
+    steps, gathered = gather_surface_steps(datasets, y_idx, x_idx)
+    points = [[float(lat), float(lng)] for lat, lng in zip(pt_lats, pt_lngs)]
+    return pack_subhourly(steps, points, derive_surface_arrays(gathered))
+
+
+# --- Point-major time series ---
+
+# Surface variables stored per (point, forecast_hour); flight_category is coded
+SERIES_VARIABLES = [
+    'cloud_total', 'cloud_low', 'cloud_mid', 'cloud_high',
+    'ceiling_ft', 'cloud_base_ft', 'cloud_top_ft', 'flight_category',
+    'visibility_sm', 'wind_dir', 'wind_speed_kt', 'wind_gust_kt', 'temperature_c',
+]
+
+
+def load_hour_outputs(hour_paths):
+    """Load per-forecast-hour JSON outputs of this script: [(fh, output)]."""
+    outputs = []
+    for fh, path in hour_paths:
+        with open(path) as f:
+            outputs.append((fh, json.load(f)))
+    return outputs
+
+
+def encode_series_value(name, value):
+    """Numeric value of a surface field for the float32 cube (NaN for null)."""
+    if value is None:
+        return np.nan
+    if name == 'flight_category':
+        return FLIGHT_CATEGORY_CODES.get(value, np.nan)
+    return value
+
+
+def stack_surface_hours(hour_outputs, variables=SERIES_VARIABLES):
+    """Stack the surface rows of every forecast hour into one (hour, point, var) array.
+
+    Points are keyed by (lat, lng) in first-seen order; a point missing from
+    an hour is NaN for that hour.
+    """
+    point_pos = {}
+    for _, output in hour_outputs:
+        for row in output.get('surface', []):
+            point_pos.setdefault((row['lat'], row['lng']), len(point_pos))
+
+    cube = np.full((len(hour_outputs), len(point_pos), len(variables)), np.nan, dtype=np.float32)
+    for h, (_, output) in enumerate(hour_outputs):
+        for row in output.get('surface', []):
+            p = point_pos[(row['lat'], row['lng'])]
+            cube[h, p] = [encode_series_value(v, row.get(v)) for v in variables]
+
+    points = [[lat, lng] for lat, lng in point_pos]
+    return points, cube
+
+
+def write_array_with_index(prefix, array, meta):
+    """Write an array as raw little-endian PREFIX.bin plus a PREFIX.json index."""
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+    with open(f"{prefix}.bin", 'wb') as f:
+        f.write(array.tobytes())
+    index = {'dtype': array.dtype.str, 'shape': list(array.shape), **meta}
+    with open(f"{prefix}.json", 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    return index
+
+
+def write_point_series(prefix, points, hours, cube, variables=SERIES_VARIABLES):
+    """Write the cycle as a point-major (point, hour, var) cube with byte offsets.
+
+    Each point's full time series is one contiguous record of
+    len(hours) * len(variables) float32 values starting at offsets[p].
+    """
+    series = np.transpose(cube, (1, 0, 2))
+    record_bytes = len(hours) * len(variables) * series.dtype.itemsize
+    return write_array_with_index(prefix, series, {
+        'layout': 'point,forecast_hour,variable',
+        'forecast_hours': list(hours),
+        'variables': list(variables),
+        'flight_categories': FLIGHT_CATEGORY_CODES,
+        'points': points,
+        'record_bytes': record_bytes,
+        'offsets': [p * record_bytes for p in range(len(points))],
+    })
+
+
+def read_point_series(prefix, lat, lng):
+    """Read one point's (hour, var) time series with a single contiguous read."""
+    with open(f"{prefix}.json") as f:
+        index = json.load(f)
+    p = index['points'].index([lat, lng])
+    _, hours, nvars = index['shape']
+    with open(f"{prefix}.bin", 'rb') as f:
+        f.seek(index['offsets'][p])
+        data = f.read(index['record_bytes'])
+    return np.frombuffer(data, dtype=index['dtype']).reshape(hours, nvars)
+
+
+# --- Forecast-window aggregates ---
+
+# (output name, series variable, reduction) per aggregate; a window where the
+# variable is null in every hour (e.g. no ceiling) stays NaN
+WINDOW_AGGREGATES = [
+    ('worst_category', 'flight_category', 'max'),
+    ('min_ceiling_ft', 'ceiling_ft', 'min'),
+    ('min_visibility_sm', 'visibility_sm', 'min'),
+    ('max_gust_kt', 'wind_gust_kt', 'max'),
+    ('max_cloud_total', 'cloud_total', 'max'),
+]
+
+
+def parse_window_hours(spec):
+    """Parse a comma-separated list of window lengths in hours, e.g. '3,6'."""
+    windows = sorted({int(w) for w in spec.split(',') if w.strip()})
+    if not windows or windows[0] < 1:
+        raise ValueError(f"Expected positive window lengths, got '{spec}'")
+    return windows
+
+
+def dense_hour_cube(hours, cube):
+    """Spread an (hour, point, var) cube onto consecutive forecast hours.
+
+    Forecast hours missing between the first and last are all-NaN slices.
+    """
+    dense_hours = list(range(hours[0], hours[-1] + 1))
+    if dense_hours == list(hours):
+        return dense_hours, cube
+    dense = np.full((len(dense_hours),) + cube.shape[1:], np.nan, dtype=cube.dtype)
+    dense[[fh - hours[0] for fh in hours]] = cube
+    return dense_hours, dense
+
+
+def window_aggregates(hours, cube, window, variables=SERIES_VARIABLES,
+                      aggregates=WINDOW_AGGREGATES):
+    """Sliding-window aggregates of a stacked (hour, point, var) cube.
+
+    Returns (start_hours, grid) with grid of shape (start, point, aggregate);
+    the window starting at forecast hour fh covers fh .. fh + window - 1.
+    Min/max skip null hours, so one missing hour does not blank a window.
+    """
+    dense_hours, dense = dense_hour_cube(list(hours), cube)
+    starts = dense_hours[:len(dense_hours) - window + 1] if window <= len(dense_hours) else []
+    grid = np.full((len(starts), cube.shape[1], len(aggregates)), np.nan, dtype=np.float32)
+    if not starts:
+        return starts, grid
+    for a, (_, name, op) in enumerate(aggregates):
+        values = dense[:, :, variables.index(name)]
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+        reduce = np.fmax if op == 'max' else np.fmin
+        grid[:, :, a] = reduce.reduce(windows, axis=-1)
+    return starts, grid
+
+
+def write_window_aggregates(prefix, points, hours, cube, window, aggregates=WINDOW_AGGREGATES):
+    """Write one window length's aggregate grid to PREFIX.wWINDOW.bin/json."""
+    starts, grid = window_aggregates(hours, cube, window, aggregates=aggregates)
+    return write_array_with_index(f"{prefix}.w{window}", grid, {
+        'layout': 'window_start,point,aggregate',
+        'window_hours': window,
+        'start_hours': starts,
+        'aggregates': [name for name, _, _ in aggregates],
+        'flight_categories': FLIGHT_CATEGORY_CODES,
+        'points': points,
+    })
+
+
+# --- Cross-cycle deltas ---
+
+# A field counts as changed only when it moves by more than this much since
+# the previous cycle's run for the same valid time. Fields not listed (and
+# flight_category) must match exactly.
+DELTA_TOLERANCES = {
+    'cloud_total': 5, 'cloud_low': 5, 'cloud_mid': 5, 'cloud_high': 5,
+    'ceiling_ft': 100, 'cloud_base_ft': 100, 'cloud_top_ft': 100,
+    'visibility_sm': 0.5,
+    'wind_dir': 10, 'wind_speed_kt': 2, 'wind_gust_kt': 2,
+    'temperature_c': 0.5,
+    'relative_humidity': 5,
+}
+
+DELTA_KEYS = {
+    'surface': ('lat', 'lng'),
+    'pressure': ('lat', 'lng', 'pressure_level'),
+}
+
+
+def parse_tolerances(specs):
+    """Merge repeated NAME=VALUE overrides into DELTA_TOLERANCES."""
+    tolerances = dict(DELTA_TOLERANCES)
+    for spec in specs or []:
+        name, sep, value = spec.partition('=')
+        if not sep:
+            raise ValueError(f"Expected NAME=VALUE, got '{spec}'")
+        tolerances[name] = float(value)
+    return tolerances
+
+
+def field_changed(name, new, old, tolerances):
+    """Whether one field differs beyond its tolerance."""
+    if new is None or old is None:
+        return new is not old
+    if isinstance(new, str) or isinstance(old, str):
+        return new != old
+    diff = abs(new - old)
+    if name == 'wind_dir':
+        diff = min(diff, 360 - diff)
+    return diff > tolerances.get(name, 0)
+
+
+def row_changed(new_row, old_row, tolerances, key_fields=()):
+    """Whether any non-key field of a row changed beyond tolerance."""
+    return any(
+        field_changed(name, value, old_row.get(name), tolerances)
+        for name, value in new_row.items()
+        if name not in key_fields
+    )
+
+
+def pack_bitmap(flags):
+    """Pack booleans MSB-first into a base64 string."""
+    import base64
+
+    return base64.b64encode(np.packbits(np.asarray(flags, dtype=bool)).tobytes()).decode('ascii')
+
+
+def unpack_bitmap(bitmap, count):
+    """Inverse of pack_bitmap."""
+    import base64
+
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(bitmap), dtype=np.uint8))
+    return bits[:count].astype(bool)
+
+
+def compute_table_delta(new_rows, old_rows, key_fields, tolerances):
+    """Changed rows of one table plus a bitmap over the new output's row order."""
+    old_by_key = {tuple(r[k] for k in key_fields): r for r in old_rows}
+    changed_flags = []
+    changed_rows = []
+    for row in new_rows:
+        old = old_by_key.pop(tuple(row[k] for k in key_fields), None)
+        changed = old is None or row_changed(row, old, tolerances, key_fields)
+        changed_flags.append(changed)
+        if changed:
+            changed_rows.append(row)
+
+    return {
+        'rows_total': len(new_rows),
+        'rows_changed': len(changed_rows),
+        'bitmap': pack_bitmap(changed_flags),
+        'rows': changed_rows,
+        'removed': [list(key) for key in old_by_key],
+    }
+
+
+def compute_delta(output, previous, tolerances=DELTA_TOLERANCES):
+    """Delta of a forecast hour's output against the state clients hold for
+    the same valid time (see chain_delta)."""
+    return {
+        key: compute_table_delta(output.get(key, []), previous.get(key, []), key_fields, tolerances)
+        for key, key_fields in DELTA_KEYS.items()
+    }
+
+
+def apply_delta(previous, delta):
+    """Rebuild a full output from the previous cycle's output and a delta.
+
+    Unchanged cells keep the previous cycle's values, so the result equals
+    the new output within the tolerances used to build the delta. Both
+    outputs list rows in the same grid order, so unchanged rows are taken
+    from the previous output in order.
+    """
+    result = {}
+    for key, key_fields in DELTA_KEYS.items():
+        table = delta[key]
+        changed_rows = table['rows']
+        skip = {tuple(k) for k in table['removed']}
+        skip.update(tuple(r[k] for k in key_fields) for r in changed_rows)
+        unchanged = iter([
+            r for r in previous.get(key, [])
+            if tuple(r[k] for k in key_fields) not in skip
+        ])
+        changed = iter(changed_rows)
+
+        flags = unpack_bitmap(table['bitmap'], table['rows_total'])
+        result[key] = [next(changed) if flag else next(unchanged) for flag in flags]
+    return result
+
+
+def chain_delta(output, state, tolerances=DELTA_TOLERANCES):
+    """Delta against the clients' state and that state with the delta applied.
+
+    state is what clients rebuilt from earlier deltas (or the full output
+    they first loaded), not the previous cycle's raw output, so every cell
+    clients hold stays within tolerance of the latest output.
+    """
+    delta = compute_delta(output, state, tolerances)
+    return delta, apply_delta(state, delta)
+
+
+# --- Data-quality statistics ---
+
+# Physically plausible range of each GRIB field in its native units; finite
+# values outside it are counted as out of range
+QUALITY_RANGES = {
+    'tcc': (0, 100), 'lcc': (0, 100), 'mcc': (0, 100), 'hcc': (0, 100),
+    'ceil': (-500, 30000), 'gh': (-1000, 35000),
+    'vis': (0, 100000),
+    'u10': (-150, 150), 'v10': (-150, 150), 'u': (-150, 150), 'v': (-150, 150),
+    'gust': (0, 150), 'i10fg': (0, 150),
+    't2m': (150, 350), 't': (150, 350), 'dpt': (150, 350),
+    'r': (0, 105),
+}
+
+# A field is flagged when its mean moves by more than this since the previous
+# cycle's run for the same forecast hour
+QUALITY_MEAN_TOLERANCES = {
+    'tcc': 40, 'lcc': 40, 'mcc': 40, 'hcc': 40,
+    'ceil': 5000, 'gh': 3000, 'vis': 15000,
+    'u10': 15, 'v10': 15, 'u': 20, 'v': 20, 'gust': 15, 'i10fg': 15,
+    't2m': 10, 't': 10, 'dpt': 10,
+    'r': 30,
+}
+
+# ...or when its NaN fraction grows by more than this
+QUALITY_NAN_TOLERANCE = 0.05
+
+
+def field_stats(values, valid_range=None):
+    """NaN fraction, min, max, mean and out-of-range count of a whole field.
+
+    Statistics of finite values are None when the field has none.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    count = int(values.size)
+    n_finite = int(finite.sum())
+    stats = {
+        'count': count,
+        'nan_fraction': round(1 - n_finite / count, 6) if count else 1.0,
+        'min': None, 'max': None, 'mean': None,
+        'out_of_range': 0,
+    }
+    if n_finite:
+        good = values[finite]
+        stats['min'] = float(good.min())
+        stats['max'] = float(good.max())
+        stats['mean'] = float(good.mean())
+        if valid_range is not None:
+            lo, hi = valid_range
+            stats['out_of_range'] = int(np.count_nonzero((good < lo) | (good > hi)))
+    return stats
+
+
+def _level_value(value):
+    """JSON form of a vertical coordinate value (int when integral)."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def field_levels(ds, name):
+    """(type_of_level, level, values) of each level of one variable.
+
+    cfgrib names the vertical coordinate of a hypercube after its
+    typeOfLevel; a multi-level variable is split along that dimension.
+    """
+    array = ds[name]
+    type_of_level = getattr(array, 'attrs', {}).get('GRIB_typeOfLevel', 'unknown')
+    values = array.values
+    if type_of_level not in ds.coords:
+        return [(type_of_level, None, values)]
+    levels = np.atleast_1d(ds[type_of_level].values)
+    dims = tuple(getattr(array, 'dims', ()))
+    if type_of_level not in dims:
+        return [(type_of_level, _level_value(levels[0]), values)]
+    axis = dims.index(type_of_level)
+    return [(type_of_level, _level_value(level), np.take(values, k, axis=axis))
+            for k, level in enumerate(levels)]
+
+
+def quality_key(stats):
+    """(variable, typeOfLevel, level) identifying one field_stats entry."""
+    return (stats['variable'], stats.get('type_of_level'), stats['level'])
+
+
+def collect_field_stats(quality, datasets):
+    """Append field_stats per (variable, typeOfLevel, level) of every hypercube.
+
+    Only the variables the extractor consumes (QUALITY_RANGES) are checked;
+    HRRR carries other fields, such as the categorical precipitation types,
+    that are legitimately all zero for most hours. Keys already in quality
+    are not collected twice.
+    """
+    seen = {quality_key(f) for f in quality}
+    for ds in datasets:
+        for name in sorted(ds.data_vars):
+            if name not in QUALITY_RANGES:
+                continue
+            try:
+                levels = field_levels(ds, name)
+            except (KeyError, ValueError):
+                continue
+            for type_of_level, level, values in levels:
+                key = (name, type_of_level, level)
+                if key in seen:
+                    continue
+                seen.add(key)
+                quality.append({'variable': name, 'type_of_level': type_of_level, 'level': level,
+                                **field_stats(values, QUALITY_RANGES[name])})
+
+
+def quality_flags(stats, previous=None):
+    """Anomaly flags of one field's stats, optionally against the previous cycle's."""
+    flags = []
+    if stats['mean'] is None:
+        flags.append('all_nan')
+    elif stats['count'] > 1 and stats['min'] == stats['max']:
+        flags.append('constant')
+    if stats['out_of_range']:
+        flags.append('out_of_range')
+    if previous is None:
+        return flags
+    if stats['nan_fraction'] > previous['nan_fraction'] + QUALITY_NAN_TOLERANCE:
+        flags.append('nan_increase')
+    tolerance = QUALITY_MEAN_TOLERANCES.get(stats['variable'])
+    if (tolerance is not None and stats['mean'] is not None and previous['mean'] is not None
+            and abs(stats['mean'] - previous['mean']) > tolerance):
+        flags.append('mean_shift')
+    return flags
+
+
+def quality_report(fields, forecast_hour=None, previous=None):
+    """Flag each field's stats and summarize; previous is an earlier report.
+
+    Fields present in the previous report but missing now are listed under
+    "missing". "ok" is false when any field is flagged or missing.
+    """
+    before = {quality_key(f): f for f in (previous or {}).get('fields', [])}
+    flagged = 0
+    for stats in fields:
+        stats['flags'] = quality_flags(stats, before.get(quality_key(stats)))
+        flagged += bool(stats['flags'])
+    current = {quality_key(f) for f in fields}
+    missing = [{'variable': var, 'type_of_level': type_of_level, 'level': level}
+               for var, type_of_level, level in before
+               if (var, type_of_level, level) not in current]
+    return {
+        'forecast_hour': forecast_hour,
+        'fields': fields,
+        'missing': missing,
+        'flagged': flagged,
+        'ok': not flagged and not missing,
+    }
+
+
+# --- PostgreSQL COPY output ---
+
+# Column order of the HrrrSurface / HrrrPressure entities (the generated `id`
+# is left to the database). Types select the COPY BINARY encoding.
+SURFACE_COPY_COLUMNS = [
+    ('init_time', 'timestamptz'),
+    ('forecast_hour', 'int4'),
+    ('valid_time', 'timestamptz'),
+    ('lat', 'float8'),
+    ('lng', 'float8'),
+    ('cloud_total', 'int2'),
+    ('cloud_low', 'int2'),
+    ('cloud_mid', 'int2'),
+    ('cloud_high', 'int2'),
+    ('ceiling_ft', 'int4'),
+    ('cloud_base_ft', 'int4'),
+    ('cloud_top_ft', 'int4'),
+    ('flight_category', 'varchar'),
+    ('visibility_sm', 'float8'),
+    ('wind_dir', 'int2'),
+    ('wind_speed_kt', 'int2'),
+    ('wind_gust_kt', 'int2'),
+    ('temperature_c', 'float8'),
+]
+
+PRESSURE_COPY_COLUMNS = [
+    ('init_time', 'timestamptz'),
+    ('forecast_hour', 'int4'),
+    ('valid_time', 'timestamptz'),
+    ('lat', 'float8'),
+    ('lng', 'float8'),
+    ('pressure_level', 'int2'),
+    ('altitude_ft', 'int4'),
+    ('relative_humidity', 'int2'),
+    ('wind_dir', 'int2'),
+    ('wind_speed_kt', 'int2'),
+    ('temperature_c', 'float8'),
+]
+
+COPY_TABLES = {
+    'surface': ('a_hrrr_surface', SURFACE_COPY_COLUMNS),
+    'pressure': ('a_hrrr_pressure', PRESSURE_COPY_COLUMNS),
+}
+
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+PG_COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+
+
+def pg_timestamptz_micros(dt):
+    """Microseconds since the PostgreSQL epoch (2000-01-01 UTC)."""
+    delta = dt - PG_EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+COPY_BINARY_ENCODERS = {
+    'timestamptz': lambda v: struct.pack('>q', pg_timestamptz_micros(v)),
+    'int2': lambda v: struct.pack('>h', int(v)),
+    'int4': lambda v: struct.pack('>i', int(v)),
+    'float8': lambda v: struct.pack('>d', float(v)),
+    'varchar': lambda v: str(v).encode('utf-8'),
+}
+
+
+def cycle_copy_values(init_time, forecast_hour):
+    """Values shared by every row of one forecast hour."""
+    return {
+        'init_time': init_time,
+        'forecast_hour': forecast_hour,
+        'valid_time': init_time + timedelta(hours=forecast_hour),
+    }
+
+
+def copy_row_values(row, names, cycle_values):
+    """A row's values in column order, filling in the cycle columns."""
+    return [cycle_values[n] if n in cycle_values else row.get(n) for n in names]
+
+
+def copy_text_value(value, pg_type):
+    """Format one value for COPY TEXT (tab-separated, \\N for NULL)."""
+    if value is None:
+        return '\\N'
+    if pg_type == 'timestamptz':
+        return value.isoformat()
+    if pg_type == 'float8':
+        return repr(float(value))
+    if pg_type in ('int2', 'int4'):
+        return str(int(value))
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def write_copy_text(stream, rows, columns, init_time, forecast_hour):
+    """Write rows to a binary stream in PostgreSQL COPY TEXT format."""
+    names = [name for name, _ in columns]
+    types = [t for _, t in columns]
+    cycle_values = cycle_copy_values(init_time, forecast_hour)
+    count = 0
+    for row in rows:
+        values = copy_row_values(row, names, cycle_values)
+        line = '\t'.join(copy_text_value(v, t) for v, t in zip(values, types))
+        stream.write(line.encode('utf-8') + b'\n')
+        count += 1
+    return count
+
+
+def write_copy_binary(stream, rows, columns, init_time, forecast_hour):
+    """Write rows to a binary stream in PostgreSQL COPY BINARY format."""
+    names = [name for name, _ in columns]
+    encoders = [COPY_BINARY_ENCODERS[t] for _, t in columns]
+    cycle_values = cycle_copy_values(init_time, forecast_hour)
+    field_count = struct.pack('>h', len(columns))
+    null_field = struct.pack('>i', -1)
+
+    stream.write(PG_COPY_SIGNATURE + struct.pack('>ii', 0, 0))
+    count = 0
+    for row in rows:
+        parts = [field_count]
+        values = copy_row_values(row, names, cycle_values)
+        for value, encode in zip(values, encoders):
+            if value is None:
+                parts.append(null_field)
+            else:
+                data = encode(value)
+                parts.append(struct.pack('>i', len(data)))
+                parts.append(data)
+        stream.write(b''.join(parts))
+        count += 1
+    stream.write(struct.pack('>h', -1))
+    return count
+
+
+def parse_init_time(value):
+    """Parse an ISO 8601 cycle init time; naive values are taken as UTC."""
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def write_copy_output(output, fmt, copy_dir, init_time, forecast_hour):
+    """Write each table's rows to a COPY file and return a manifest for Node."""
+    writer = write_copy_binary if fmt == 'copy-binary' else write_copy_text
+    ext = 'bin' if fmt == 'copy-binary' else 'tsv'
+    os.makedirs(copy_dir, exist_ok=True)
+
+    manifest = {'format': fmt}
+    for key, (table, columns) in COPY_TABLES.items():
+        path = os.path.join(copy_dir, f"{table}_f{forecast_hour:02d}.{ext}")
+        with open(path, 'wb') as f:
+            rows = writer(f, output[key], columns, init_time, forecast_hour)
+        manifest[key] = {
+            'table': table,
+            'columns': [name for name, _ in columns],
+            'path': path,
+            'rows': rows,
+        }
+    return manifest
+
+
 def main():
     parser = argparse.ArgumentParser(description='Process HRRR GRIB2 data')
     parser.add_argument('--surface', help='Path to wrfsfcf GRIB2 file')
     parser.add_argument('--pressure', help='Path to wrfprsf GRIB2 file')
+    parser.add_argument('--subhourly', help='Path to wrfsubhf GRIB2 file (15-minute valid times)')
     parser.add_argument('--grid-spacing', type=float, default=1.0)
     parser.add_argument('--lat-min', type=float, default=24.0)
     parser.add_argument('--lat-max', type=float, default=50.0)
@@ -359,9 +1433,48 @@ def main():
     parser.add_argument('--lng-max', type=float, default=-66.0)
     parser.add_argument('--pressure-levels', default='1000,950,925,900,850,800,700,600,500,400,300,250,200,150',
                         help='Comma-separated pressure levels in hPa')
+    parser.add_argument('--format', choices=['json', 'copy-text', 'copy-binary'], default='json',
+                        help='json (stdout) or PostgreSQL COPY files written to --copy-dir')
+    parser.add_argument('--copy-dir', help='Directory for COPY output files')
+    parser.add_argument('--init-time', help='Cycle init time (ISO 8601), required for COPY output')
+    parser.add_argument('--forecast-hour', type=int, help='Forecast hour, required for COPY output')
+    parser.add_argument('--airports',
+                        help='Airport CSV (ident,lat,lng,elevation_ft); outputs per-airport profiles')
+    parser.add_argument('--profile-pressure', action='append', metavar='FH=PATH',
+                        help='wrfprsf file for one forecast hour (repeat for each hour)')
+    parser.add_argument('--hour-output', action='append', metavar='FH=PATH',
+                        help='JSON output of one forecast hour (repeat for each hour of the cycle)')
+    parser.add_argument('--series-out', metavar='PREFIX',
+                        help='Write a point-major time-series cube to PREFIX.bin/PREFIX.json')
+    parser.add_argument('--window-hours', metavar='L[,L...]',
+                        help='With --series-out, also write forecast-window aggregates '
+                             'for these window lengths (hours)')
+    parser.add_argument('--delta-against', metavar='PATH',
+                        help='State clients hold for the same valid time: the previous '
+                             "cycle's --delta-state-out, or the full output they loaded")
+    parser.add_argument('--delta-out', metavar='PATH',
+                        help='Write changed cells and bitmap against --delta-against here')
+    parser.add_argument('--delta-state-out', metavar='PATH',
+                        help='Write --delta-against with the delta applied, for the next cycle')
+    parser.add_argument('--delta-tolerance', action='append', metavar='NAME=VALUE',
+                        help='Override a per-variable change tolerance')
+    parser.add_argument('--quality-out', metavar='PATH',
+                        help='Write per-field data-quality statistics and anomaly flags here')
+    parser.add_argument('--quality-against', metavar='PATH',
+                        help="Previous cycle's --quality-out report for the same forecast hour")
 
     args = parser.parse_args()
 
+    if args.format != 'json' and (not args.copy_dir or not args.init_time
+                                  or args.forecast_hour is None):
+        parser.error('--format copy-* requires --copy-dir, --init-time and --forecast-hour')
+    if bool(args.delta_against) != bool(args.delta_out):
+        parser.error('--delta-against and --delta-out must be used together')
+    if args.delta_state_out and not args.delta_out:
+        parser.error('--delta-state-out requires --delta-against and --delta-out')
+    if args.quality_against and not args.quality_out:
+        parser.error('--quality-against requires --quality-out')
+
     # Generate grid points
     spacing = args.grid_spacing
     grid_lats = list(np.arange(args.lat_min, args.lat_max + spacing, spacing))
@@ -369,20 +1482,96 @@ def main():
 
     pressure_levels = [int(p) for p in args.pressure_levels.split(',')]
 
+    if args.subhourly:
+        print(f"Processing sub-hourly file: {args.subhourly}", file=sys.stderr)
+        output = process_subhourly(args.subhourly, grid_lats, grid_lngs)
+        print(f"  Extracted {len(output['points'])} grid points x "
+              f"{len(output['steps_min'])} valid times", file=sys.stderr)
+        json.dump(output, sys.stdout, separators=(',', ':'))
+        return
+
+    if args.series_out:
+        hour_paths = parse_hour_specs(args.hour_output)
+        if not hour_paths:
+            parser.error('--series-out requires at least one --hour-output FH=PATH')
+        try:
+            windows = parse_window_hours(args.window_hours) if args.window_hours else []
+        except ValueError as e:
+            parser.error(str(e))
+        hour_outputs = load_hour_outputs(hour_paths)
+        hours = [fh for fh, _ in hour_outputs]
+        points, cube = stack_surface_hours(hour_outputs)
+        index = write_point_series(args.series_out, points, hours, cube)
+        print(f"Wrote time series for {len(points)} points x {len(hour_outputs)} hours",
+              file=sys.stderr)
+        result = {'series': {'path': f"{args.series_out}.bin", 'shape': index['shape']}}
+        if windows:
+            result['windows'] = []
+            for window in windows:
+                window_index = write_window_aggregates(args.series_out, points, hours, cube, window)
+                result['windows'].append({'hours': window,
+                                          'path': f"{args.series_out}.w{window}.bin",
+                                          'shape': window_index['shape']})
+            print(f"Wrote window aggregates for {len(windows)} window lengths", file=sys.stderr)
+        json.dump(result, sys.stdout, separators=(',', ':'))
+        return
+
+    if args.airports:
+        hour_paths = parse_hour_specs(args.profile_pressure)
+        if not hour_paths:
+            parser.error('--airports requires at least one --profile-pressure FH=PATH')
+        print(f"Extracting airport profiles for {len(hour_paths)} forecast hours", file=sys.stderr)
+        profiles = process_airport_profiles(args.airports, hour_paths, pressure_levels)
+        print(f"  Extracted profiles for {len(profiles['airports'])} airports", file=sys.stderr)
+        json.dump(profiles, sys.stdout, separators=(',', ':'))
+        return
+
     output = {'surface': [], 'pressure': []}
+    quality = [] if args.quality_out else None
 
     if args.surface:
         print(f"Processing surface file: {args.surface}", file=sys.stderr)
-        output['surface'] = process_surface(args.surface, grid_lats, grid_lngs)
+        output['surface'] = process_surface(args.surface, grid_lats, grid_lngs, quality)
         print(f"  Extracted {len(output['surface'])} surface grid points", file=sys.stderr)
 
     if args.pressure:
         print(f"Processing pressure file: {args.pressure}", file=sys.stderr)
         output['pressure'] = process_pressure(
-            args.pressure, grid_lats, grid_lngs, pressure_levels,
+            args.pressure, grid_lats, grid_lngs, pressure_levels, quality,
         )
         print(f"  Extracted {len(output['pressure'])} pressure-level grid points", file=sys.stderr)
 
+    if args.quality_out:
+        previous = None
+        if args.quality_against:
+            with open(args.quality_against) as f:
+                previous = json.load(f)
+        report = quality_report(quality, args.forecast_hour, previous)
+        with open(args.quality_out, 'w') as f:
+            json.dump(report, f, separators=(',', ':'))
+        print(f"  Quality: {report['flagged']} of {len(quality)} fields flagged, "
+              f"{len(report['missing'])} missing", file=sys.stderr)
+
+    if args.delta_against:
+        with open(args.delta_against) as f:
+            state = json.load(f)
+        delta, state = chain_delta(output, state, parse_tolerances(args.delta_tolerance))
+        with open(args.delta_out, 'w') as f:
+            json.dump(delta, f, separators=(',', ':'))
+        if args.delta_state_out:
+            with open(args.delta_state_out, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
+        print(f"  Delta: {delta['surface']['rows_changed']} surface and "
+              f"{delta['pressure']['rows_changed']} pressure rows changed", file=sys.stderr)
+
+    if args.format != 'json':
+        manifest = write_copy_output(
+            output, args.format, args.copy_dir,
+            parse_init_time(args.init_time), args.forecast_hour,
+        )
+        json.dump(manifest, sys.stdout, separators=(',', ':'))
+        return
+
     # Output JSON to stdout (Node.js reads this)
     json.dump(output, sys.stdout, separators=(',', ':'))
 
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 """Unit tests for process.py helper functions."""
 
+import copy
+import io
 import math
+import struct
 import sys
 import os
+import tempfile
 import unittest
+from datetime import datetime, timezone
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -290,5 +295,633 @@ class TestNearestIdx(unittest.TestCase):
         self.assertIn(idx, [0, 1])  # Either is acceptable
 
 
+class TestNearestIdxArray(unittest.TestCase):
+    """Test the vectorized nearest_idx."""
+
+    def test_matches_scalar(self):
+        import numpy as np
+        arr = np.array([24.0, 25.0, 26.0, 27.0])
+        values = [20.0, 24.0, 24.4, 25.3, 25.7, 26.0, 27.0, 30.0]
+        expected = [process_hrrr.nearest_idx(arr, v) for v in values]
+        self.assertEqual(process_hrrr.nearest_idx_array(arr, values).tolist(), expected)
+
+    def test_single_element(self):
+        import numpy as np
+        result = process_hrrr.nearest_idx_array(np.array([24.0]), [20.0, 30.0])
+        self.assertEqual(result.tolist(), [0, 0])
+
+
+class TestNearestGridIndices(unittest.TestCase):
+    """Test coarse-to-fine nearest search on a curvilinear grid."""
+
+    def test_matches_brute_force(self):
+        import numpy as np
+        # Sheared, slightly rotated grid, like a Lambert conformal projection
+        yy, xx = np.meshgrid(np.arange(120), np.arange(200), indexing='ij')
+        lats = 21.0 + yy * 0.03 + xx * 0.004
+        lngs = -122.0 + xx * 0.035 - yy * 0.006
+        rng = np.random.default_rng(7)
+        pt_lats = rng.uniform(23.0, 24.0, 50)
+        pt_lngs = rng.uniform(-120.0, -117.0, 50)
+
+        y_idx, x_idx = process_hrrr.nearest_grid_indices(lats, lngs, pt_lats, pt_lngs,
+                                                         stride=8, chunk=16)
+        for p in range(50):
+            dist = (lats - pt_lats[p]) ** 2 + (lngs - pt_lngs[p]) ** 2
+            expected = np.unravel_index(np.argmin(dist), dist.shape)
+            self.assertEqual((y_idx[p], x_idx[p]), expected)
+
+    def test_regular_grid(self):
+        import numpy as np
+        lats = np.arange(24.0, 51.0)
+        lngs = np.arange(-125.0, -65.0)
+        y_idx, x_idx = process_hrrr.nearest_grid_indices(lats, lngs, [39.6], [-104.8])
+        self.assertEqual((y_idx[0], x_idx[0]), (16, 20))
+
+
+class TestUVToDirSpeedArray(unittest.TestCase):
+    """Test the vectorized wind conversion against the scalar one."""
+
+    def test_matches_scalar(self):
+        import numpy as np
+        u = np.array([10, 0, 0, -10, 10, 0, 0.001, 50])
+        v = np.array([0, -10, 10, 0, 10, 0, 0.001, 0])
+        dirs, speeds = process_hrrr.uv_to_dir_speed_array(u, v)
+        for k in range(len(u)):
+            self.assertEqual((dirs[k], speeds[k]), process_hrrr.uv_to_dir_speed(u[k], v[k]))
+
+    def test_missing_component(self):
+        dirs, speeds = process_hrrr.uv_to_dir_speed_array([float('nan')], [5.0])
+        self.assertTrue(math.isnan(dirs[0]))
+        self.assertTrue(math.isnan(speeds[0]))
+
+
+class TestDewpointFromRh(unittest.TestCase):
+    """Test Magnus dewpoint approximation."""
+
+    def test_saturated(self):
+        self.assertAlmostEqual(float(process_hrrr.dewpoint_from_rh(15.0, 100.0)), 15.0, places=3)
+
+    def test_typical(self):
+        """20°C at 50% RH ≈ 9.3°C dewpoint."""
+        self.assertAlmostEqual(float(process_hrrr.dewpoint_from_rh(20.0, 50.0)), 9.3, places=1)
+
+
+class TestParseHourSpecs(unittest.TestCase):
+    """Test FH=PATH argument parsing."""
+
+    def test_sorted(self):
+        specs = ['3=/tmp/f03.grib2', '1=/tmp/f01.grib2']
+        self.assertEqual(process_hrrr.parse_hour_specs(specs),
+                         [(1, '/tmp/f01.grib2'), (3, '/tmp/f03.grib2')])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            process_hrrr.parse_hour_specs(['/tmp/f01.grib2'])
+
+
+class TestAirportProfiles(unittest.TestCase):
+    """Test per-airport profile assembly from gathered fields."""
+
+    def test_profiles_mask_levels_below_field(self):
+        import numpy as np
+        levels = [850, 700]
+        # Two airports: sea level and 6000 ft (above the 850 hPa surface)
+        gathered = {
+            'gh': np.array([[1500.0, 1500.0], [3000.0, 3000.0]]),
+            't': np.array([[283.15, 283.15], [273.15, 273.15]]),
+            'r': np.array([[50.0, 50.0], [100.0, 100.0]]),
+            'u': np.array([[10.0, 10.0], [0.0, 0.0]]),
+            'v': np.array([[0.0, 0.0], [-10.0, -10.0]]),
+        }
+        fields = process_hrrr.derive_profile_fields(gathered, levels)
+        table = process_hrrr.build_airport_profiles(
+            ['KSEA', 'KAPA'], np.array([400.0, 6000.0]),
+            (np.array([3, 4]), np.array([5, 6])), levels, [(1, fields)],
+        )
+
+        self.assertEqual(table['levels'], [850, 700])
+        self.assertEqual(table['forecast_hours'], [1])
+        sea = table['airports']['KSEA']
+        self.assertEqual(sea['altitude_ft'], [[4921, 9843]])
+        self.assertEqual(sea['temperature_c'], [[10.0, 0.0]])
+        self.assertEqual(sea['dewpoint_c'][0][1], 0.0)
+        self.assertEqual(sea['wind_dir'], [[270, 0]])
+        self.assertEqual(sea['wind_speed_kt'], [[19, 19]])
+        self.assertEqual(sea['grid'], [3, 5])
+
+        apa = table['airports']['KAPA']
+        self.assertEqual(apa['elevation_ft'], 6000)
+        self.assertEqual(apa['temperature_c'], [[None, 0.0]])
+        self.assertEqual(apa['relative_humidity'], [[None, 100]])
+
+    def test_gather_pressure_points(self):
+        import numpy as np
+        t = np.arange(3 * 4 * 5, dtype=float).reshape(3, 4, 5)
+        datasets = [
+            FakeDataset({'t': t}, type_of_level='isobaricInhPa', levels=[850, 700, 500]),
+            FakeDataset({'r': np.full((4, 5), 80.0)}, type_of_level='isobaricInhPa', levels=250),
+        ]
+        gathered = process_hrrr.gather_pressure_points(
+            datasets, [250, 500, 850], np.array([0, 3]), np.array([1, 4]))
+        self.assertTrue(np.isnan(gathered['t'][0]).all())
+        self.assertEqual(gathered['t'][1].tolist(), [41.0, 59.0])
+        self.assertEqual(gathered['t'][2].tolist(), [1.0, 19.0])
+        self.assertEqual(gathered['r'][0].tolist(), [80.0, 80.0])
+
+    def test_standard_altitude_without_gh(self):
+        import numpy as np
+        fields = process_hrrr.derive_profile_fields({'t': np.array([[280.0]])}, [850])
+        self.assertEqual(fields['altitude_ft'].tolist(), [[5000.0]])
+
+
+INIT_TIME = datetime(2026, 2, 13, 12, tzinfo=timezone.utc)
+
+SURFACE_ROW = {
+    'lat': 39.0, 'lng': -105.0, 'cloud_total': 85, 'cloud_low': 40,
+    'cloud_mid': None, 'cloud_high': 10, 'ceiling_ft': 1200,
+    'cloud_base_ft': 1200, 'cloud_top_ft': None, 'flight_category': 'MVFR',
+    'visibility_sm': 6.2, 'wind_dir': 270, 'wind_speed_kt': 19,
+    'wind_gust_kt': None, 'temperature_c': -3.5,
+}
+
+
+class TestCopyText(unittest.TestCase):
+    """Test PostgreSQL COPY TEXT output."""
+
+    def write(self, rows, columns=None):
+        buf = io.BytesIO()
+        count = process_hrrr.write_copy_text(
+            buf, rows, columns or process_hrrr.SURFACE_COPY_COLUMNS, INIT_TIME, 2,
+        )
+        return count, buf.getvalue().decode('utf-8')
+
+    def test_column_order_and_cycle_columns(self):
+        count, text = self.write([SURFACE_ROW])
+        self.assertEqual(count, 1)
+        fields = text.rstrip('\n').split('\t')
+        self.assertEqual(len(fields), len(process_hrrr.SURFACE_COPY_COLUMNS))
+        self.assertEqual(fields[0], '2026-02-13T12:00:00+00:00')
+        self.assertEqual(fields[1], '2')
+        self.assertEqual(fields[2], '2026-02-13T14:00:00+00:00')
+        self.assertEqual(fields[3:6], ['39.0', '-105.0', '85'])
+        self.assertEqual(fields[12], 'MVFR')
+
+    def test_nulls(self):
+        _, text = self.write([SURFACE_ROW])
+        fields = text.rstrip('\n').split('\t')
+        self.assertEqual(fields[7], '\\N')   # cloud_mid
+        self.assertEqual(fields[16], '\\N')  # wind_gust_kt
+
+    def test_escapes_text(self):
+        self.assertEqual(process_hrrr.copy_text_value('a\tb\\', 'varchar'), 'a\\tb\\\\')
+
+    def test_one_line_per_row(self):
+        count, text = self.write([SURFACE_ROW] * 3)
+        self.assertEqual(count, 3)
+        self.assertEqual(text.count('\n'), 3)
+
+
+class TestCopyBinary(unittest.TestCase):
+    """Test PostgreSQL COPY BINARY output."""
+
+    def write(self, rows, columns):
+        buf = io.BytesIO()
+        count = process_hrrr.write_copy_binary(buf, rows, columns, INIT_TIME, 1)
+        return count, buf.getvalue()
+
+    def test_header_and_trailer(self):
+        count, data = self.write([], process_hrrr.SURFACE_COPY_COLUMNS)
+        self.assertEqual(count, 0)
+        self.assertEqual(data[:11], b'PGCOPY\n\xff\r\n\x00')
+        self.assertEqual(struct.unpack('>ii', data[11:19]), (0, 0))
+        self.assertEqual(data[19:], struct.pack('>h', -1))
+
+    def test_tuple_encoding(self):
+        columns = [('init_time', 'timestamptz'), ('lat', 'float8'),
+                   ('pressure_level', 'int2'), ('relative_humidity', 'int2')]
+        _, data = self.write([{'lat': 39.5, 'pressure_level': 850}], columns)
+        body = data[19:-2]
+        self.assertEqual(struct.unpack('>h', body[:2])[0], 4)
+        # init_time: 8-byte microseconds since 2000-01-01
+        length, micros = struct.unpack('>iq', body[2:14])
+        self.assertEqual(length, 8)
+        expected = int((INIT_TIME - process_hrrr.PG_EPOCH).total_seconds()) * 1_000_000
+        self.assertEqual(micros, expected)
+        self.assertEqual(struct.unpack('>id', body[14:26]), (8, 39.5))
+        self.assertEqual(struct.unpack('>ih', body[26:32]), (2, 850))
+        # relative_humidity is NULL
+        self.assertEqual(struct.unpack('>i', body[32:36])[0], -1)
+        self.assertEqual(len(body), 36)
+
+    def test_copy_output_manifest(self):
+        output = {'surface': [SURFACE_ROW], 'pressure': []}
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = process_hrrr.write_copy_output(output, 'copy-binary', tmp, INIT_TIME, 3)
+            self.assertEqual(manifest['surface']['table'], 'a_hrrr_surface')
+            self.assertEqual(manifest['surface']['rows'], 1)
+            self.assertEqual(manifest['pressure']['rows'], 0)
+            self.assertEqual(manifest['surface']['columns'][:3],
+                             ['init_time', 'forecast_hour', 'valid_time'])
+            self.assertTrue(os.path.exists(manifest['pressure']['path']))
+            self.assertTrue(manifest['surface']['path'].endswith('a_hrrr_surface_f03.bin'))
+
+
+def surface_hour(rows):
+    """Minimal per-hour output dict with the given surface rows."""
+    return {'surface': [dict(SURFACE_ROW, **row) for row in rows], 'pressure': []}
+
+
+class TestPointSeries(unittest.TestCase):
+    """Test point-major time-series stacking and layout."""
+
+    def hours(self):
+        return [
+            (1, surface_hour([{'lat': 39.0, 'lng': -105.0, 'temperature_c': 1.0},
+                              {'lat': 40.0, 'lng': -105.0, 'temperature_c': 2.0}])),
+            (2, surface_hour([{'lat': 39.0, 'lng': -105.0, 'temperature_c': 3.0,
+                               'flight_category': 'LIFR'},
+                              {'lat': 40.0, 'lng': -105.0, 'temperature_c': 4.0}])),
+        ]
+
+    def test_stack_shape_and_encoding(self):
+        points, cube = process_hrrr.stack_surface_hours(self.hours())
+        variables = process_hrrr.SERIES_VARIABLES
+        self.assertEqual(points, [[39.0, -105.0], [40.0, -105.0]])
+        self.assertEqual(cube.shape, (2, 2, len(variables)))
+        temp = variables.index('temperature_c')
+        cat = variables.index('flight_category')
+        self.assertEqual(cube[1, 0, temp], 3.0)
+        self.assertEqual(cube[0, 0, cat], 1)  # MVFR
+        self.assertEqual(cube[1, 0, cat], 3)  # LIFR
+        self.assertTrue(math.isnan(cube[0, 0, variables.index('cloud_mid')]))
+
+    def test_missing_point_is_nan(self):
+        hours = self.hours()
+        hours[1][1]['surface'].pop()
+        _, cube = process_hrrr.stack_surface_hours(hours)
+        self.assertTrue(all(math.isnan(x) for x in cube[1, 1]))
+
+    def test_contiguous_record_per_point(self):
+        points, cube = process_hrrr.stack_surface_hours(self.hours())
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, 'series')
+            index = process_hrrr.write_point_series(prefix, points, [1, 2], cube)
+            nvars = len(process_hrrr.SERIES_VARIABLES)
+            self.assertEqual(index['shape'], [2, 2, nvars])
+            self.assertEqual(index['offsets'], [0, 2 * nvars * 4])
+            self.assertEqual(os.path.getsize(prefix + '.bin'), 2 * 2 * nvars * 4)
+
+            series = process_hrrr.read_point_series(prefix, 40.0, -105.0)
+            temp = process_hrrr.SERIES_VARIABLES.index('temperature_c')
+            self.assertEqual(series[:, temp].tolist(), [2.0, 4.0])
+
+
+class TestWindowAggregates(unittest.TestCase):
+    """Test sliding forecast-window aggregates over the stacked cube."""
+
+    def stacked(self):
+        rows = [
+            {'ceiling_ft': 4000.0, 'visibility_sm': 10.0, 'wind_gust_kt': 12, 'cloud_total': 40},
+            {'ceiling_ft': 800.0, 'visibility_sm': 2.0, 'wind_gust_kt': None, 'cloud_total': 90},
+            {'ceiling_ft': None, 'visibility_sm': 6.0, 'wind_gust_kt': 30, 'cloud_total': 10},
+        ]
+        hours = [(fh, surface_hour([dict(row, lat=39.0, lng=-105.0, flight_category=cat)]))
+                 for fh, row, cat in zip((1, 2, 3), rows, ('VFR', 'IFR', 'VFR'))]
+        points, cube = process_hrrr.stack_surface_hours(hours)
+        return points, [1, 2, 3], cube
+
+    def column(self, grid, name):
+        names = [n for n, _, _ in process_hrrr.WINDOW_AGGREGATES]
+        return grid[:, 0, names.index(name)].tolist()
+
+    def test_two_hour_windows(self):
+        _, hours, cube = self.stacked()
+        starts, grid = process_hrrr.window_aggregates(hours, cube, 2)
+        self.assertEqual(starts, [1, 2])
+        self.assertEqual(self.column(grid, 'worst_category'), [2, 2])  # IFR
+        self.assertEqual(self.column(grid, 'min_ceiling_ft'), [800, 800])
+        self.assertEqual(self.column(grid, 'min_visibility_sm'), [2, 2])
+        self.assertEqual(self.column(grid, 'max_gust_kt'), [12, 30])
+        self.assertEqual(self.column(grid, 'max_cloud_total'), [90, 90])
+
+    def test_null_in_every_hour_stays_nan(self):
+        _, hours, cube = self.stacked()
+        _, grid = process_hrrr.window_aggregates(hours, cube, 1)
+        self.assertTrue(math.isnan(self.column(grid, 'min_ceiling_ft')[2]))
+        self.assertTrue(math.isnan(self.column(grid, 'max_gust_kt')[1]))
+
+    def test_missing_forecast_hour(self):
+        _, _, cube = self.stacked()
+        starts, grid = process_hrrr.window_aggregates([1, 3], cube[[0, 2]], 2)
+        self.assertEqual(starts, [1, 2])
+        self.assertEqual(self.column(grid, 'max_gust_kt'), [12, 30])
+
+    def test_window_longer_than_cycle(self):
+        _, hours, cube = self.stacked()
+        starts, grid = process_hrrr.window_aggregates(hours, cube, 4)
+        self.assertEqual(starts, [])
+        self.assertEqual(grid.shape, (0, 1, len(process_hrrr.WINDOW_AGGREGATES)))
+
+    def test_write_index(self):
+        points, hours, cube = self.stacked()
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, 'series')
+            index = process_hrrr.write_window_aggregates(prefix, points, hours, cube, 3)
+            self.assertEqual(index['shape'], [1, 1, len(process_hrrr.WINDOW_AGGREGATES)])
+            self.assertEqual(index['start_hours'], [1])
+            self.assertEqual(os.path.getsize(prefix + '.w3.bin'),
+                             len(process_hrrr.WINDOW_AGGREGATES) * 4)
+
+    def test_parse_window_hours(self):
+        self.assertEqual(process_hrrr.parse_window_hours('6,3,3'), [3, 6])
+        with self.assertRaises(ValueError):
+            process_hrrr.parse_window_hours('0')
+
+
+class FakeArray:
+    def __init__(self, values, dims=(), attrs=None):
+        self.values = values
+        self.dims = dims
+        self.attrs = attrs or {}
+
+    def isel(self, indexers):
+        import numpy as np
+        (dim, k), = indexers.items()
+        axis = self.dims.index(dim)
+        return FakeArray(np.take(self.values, k, axis=axis),
+                         self.dims[:axis] + self.dims[axis + 1:], self.attrs)
+
+
+class FakeDataset:
+    """Just enough of a cfgrib hypercube for the gather and quality helpers.
+
+    With type_of_level, variables carry GRIB_typeOfLevel and the vertical
+    coordinate; with several levels it is their leading dimension.
+    """
+
+    def __init__(self, data_vars, step_min=None, type_of_level=None, levels=None):
+        import numpy as np
+        self.data_vars = data_vars
+        self.coords = {}
+        self.type_of_level = type_of_level
+        if step_min is not None:
+            self.coords['step'] = FakeArray(np.array(step_min, dtype='timedelta64[m]'))
+        if type_of_level is not None:
+            self.coords[type_of_level] = FakeArray(np.array(levels if levels is not None else 0))
+
+    def __getitem__(self, name):
+        if name in self.coords:
+            return self.coords[name]
+        if self.type_of_level is None:
+            return FakeArray(self.data_vars[name])
+        stacked = self.coords[self.type_of_level].values.ndim == 1
+        dims = (self.type_of_level,) if stacked else ()
+        return FakeArray(self.data_vars[name], dims,
+                         {'GRIB_typeOfLevel': self.type_of_level})
+
+
+class TestFlightCategoryArray(unittest.TestCase):
+    """Test the vectorized flight category against the scalar one."""
+
+    def test_matches_scalar(self):
+        import numpy as np
+        ceilings = [None, 200, 499, 500, 999, 1000, 2999, 3000, 5000]
+        visibilities = [None, 0.25, 0.99, 1.0, 2.9, 3.0, 4.9, 5.0, 10.0]
+        ceil = np.array([np.nan if c is None else c for c in ceilings], dtype=float)
+        vis = np.array([np.nan if v is None else v for v in visibilities], dtype=float)
+        codes = process_hrrr.compute_flight_category_array(ceil[:, None], vis[None, :])
+        for i, c in enumerate(ceilings):
+            for j, v in enumerate(visibilities):
+                expected = process_hrrr.compute_flight_category(c, v)
+                self.assertEqual(process_hrrr.FLIGHT_CATEGORY_NAMES[int(codes[i, j])], expected)
+
+
+class TestSubhourly(unittest.TestCase):
+    """Test stacked 15-minute gathering and derivation."""
+
+    def test_gather_stacks_steps(self):
+        import numpy as np
+        t2m = np.arange(4 * 3 * 3, dtype=float).reshape(4, 3, 3)
+        vis = np.full((3, 3), 16093.4)
+        datasets = [
+            FakeDataset({'t2m': t2m}, step_min=[15, 30, 45, 60]),
+            FakeDataset({'vis': vis}, step_min=60),
+        ]
+        steps, gathered = process_hrrr.gather_surface_steps(
+            datasets, np.array([0, 2]), np.array([1, 2]),
+        )
+        self.assertEqual(steps, [15, 30, 45, 60])
+        self.assertEqual(gathered['t2m'].shape, (4, 2))
+        self.assertEqual(gathered['t2m'][:, 1].tolist(), [8.0, 17.0, 26.0, 35.0])
+        self.assertTrue(np.isnan(gathered['vis'][0]).all())
+        self.assertEqual(gathered['vis'][3].tolist(), [16093.4, 16093.4])
+
+    def test_gather_merges_split_variable(self):
+        import numpy as np
+        instant = np.full((2, 3, 3), 5.0)
+        averaged = np.full((3, 3, 3), 7.0)
+        datasets = [
+            FakeDataset({'gust': instant}, step_min=[15, 30]),
+            FakeDataset({'gust': averaged}, step_min=[30, 45, 60]),
+        ]
+        steps, gathered = process_hrrr.gather_surface_steps(
+            datasets, np.array([0]), np.array([0]),
+        )
+        self.assertEqual(steps, [15, 30, 45, 60])
+        # 30 min is in both hypercubes; the first one wins
+        self.assertEqual(gathered['gust'][:, 0].tolist(), [5.0, 5.0, 7.0, 7.0])
+
+    def test_derive_and_pack(self):
+        import numpy as np
+        gathered = {
+            'tcc': np.array([[85.4, 120.0]]),
+            'ceil': np.array([[300.0, np.nan]]),
+            'vis': np.array([[16093.4, 1609.34]]),
+            'u10': np.array([[10.0, 0.0]]),
+            'v10': np.array([[0.0, 0.0]]),
+            'gust': np.array([[np.nan, 5.0]]),
+            'i10fg': np.array([[10.0, 10.0]]),
+            't2m': np.array([[273.15, 288.0]]),
+        }
+        fields = process_hrrr.derive_surface_arrays(gathered)
+        out = process_hrrr.pack_subhourly([15], [[39.0, -105.0], [40.0, -105.0]], fields)
+        surface = out['surface']
+        self.assertEqual(out['steps_min'], [15])
+        self.assertEqual(surface['cloud_total'], [[85, 100]])
+        self.assertEqual(surface['cloud_low'], [[None, None]])
+        self.assertEqual(surface['ceiling_ft'], [[984, None]])
+        self.assertEqual(surface['flight_category'], [['IFR', 'IFR']])
+        self.assertEqual(surface['visibility_sm'], [[10.0, 1.0]])
+        self.assertEqual(surface['wind_dir'], [[270, 0]])
+        self.assertEqual(surface['wind_gust_kt'], [[19, 10]])
+        self.assertEqual(surface['temperature_c'], [[0.0, 14.9]])
+
+
+class TestDelta(unittest.TestCase):
+    """Test cross-cycle deltas."""
+
+    def outputs(self):
+        previous = surface_hour([
+            {'lat': 39.0, 'lng': -105.0},
+            {'lat': 40.0, 'lng': -105.0},
+            {'lat': 41.0, 'lng': -105.0},
+        ])
+        previous['pressure'] = [
+            {'lat': 39.0, 'lng': -105.0, 'pressure_level': 850, 'altitude_ft': 5000,
+             'relative_humidity': 60, 'wind_dir': 355, 'wind_speed_kt': 20, 'temperature_c': 5.0},
+        ]
+        current = copy.deepcopy(previous)
+        current['surface'][0]['temperature_c'] += 0.4      # within tolerance
+        current['surface'][1]['flight_category'] = 'IFR'   # categorical change
+        current['pressure'][0]['wind_dir'] = 5             # 10° across north
+        return previous, current
+
+    def test_only_changed_rows(self):
+        previous, current = self.outputs()
+        delta = process_hrrr.compute_delta(current, previous)
+        self.assertEqual(delta['surface']['rows_total'], 3)
+        self.assertEqual(delta['surface']['rows_changed'], 1)
+        self.assertEqual(delta['surface']['rows'][0]['lat'], 40.0)
+        flags = process_hrrr.unpack_bitmap(delta['surface']['bitmap'], 3)
+        self.assertEqual(flags.tolist(), [False, True, False])
+        self.assertEqual(delta['pressure']['rows_changed'], 0)
+
+    def test_tolerance_override(self):
+        previous, current = self.outputs()
+        tolerances = process_hrrr.parse_tolerances(['temperature_c=0.1'])
+        delta = process_hrrr.compute_delta(current, previous, tolerances)
+        self.assertEqual(delta['surface']['rows_changed'], 2)
+
+    def test_null_transition_is_change(self):
+        self.assertTrue(process_hrrr.field_changed('ceiling_ft', None, 1200, {}))
+        self.assertFalse(process_hrrr.field_changed('ceiling_ft', None, None, {}))
+
+    def test_new_and_removed_points(self):
+        previous, current = self.outputs()
+        current['surface'].pop(0)
+        current['surface'].append(dict(SURFACE_ROW, lat=42.0, lng=-105.0))
+        delta = process_hrrr.compute_delta(current, previous)
+        self.assertEqual(delta['surface']['removed'], [[39.0, -105.0]])
+        self.assertEqual(delta['surface']['rows_changed'], 2)
+
+    def test_apply_round_trip(self):
+        previous, current = self.outputs()
+        tolerances = {name: 0 for name in process_hrrr.DELTA_TOLERANCES}
+        delta = process_hrrr.compute_delta(current, previous, tolerances)
+        self.assertEqual(process_hrrr.apply_delta(previous, delta), current)
+
+    def test_chained_cycles_stay_within_tolerance(self):
+        state = surface_hour([{'lat': 39.0, 'lng': -105.0, 'cloud_total': 50}])
+        sent = []
+        for cloud in (54, 58, 62, 66):
+            output = surface_hour([{'lat': 39.0, 'lng': -105.0, 'cloud_total': cloud}])
+            delta, state = process_hrrr.chain_delta(output, state)
+            sent.append(delta['surface']['rows_changed'])
+            held = state['surface'][0]['cloud_total']
+            self.assertLessEqual(abs(held - cloud), process_hrrr.DELTA_TOLERANCES['cloud_total'])
+        # 50 -> 58 and 58 -> 66 exceed the tolerance; each 4-point step alone does not
+        self.assertEqual(sent, [0, 1, 0, 1])
+        self.assertEqual(state['surface'][0]['cloud_total'], 66)
+
+
+class TestQuality(unittest.TestCase):
+    """Test per-field data-quality statistics and anomaly flags."""
+
+    def fields(self, t2m, tcc=(10.0, 50.0, 90.0)):
+        import numpy as np
+        datasets = [
+            FakeDataset({'t2m': np.array(t2m)}, type_of_level='heightAboveGround', levels=2.0),
+            FakeDataset({'tcc': np.array(tcc)}, type_of_level='atmosphere'),
+        ]
+        quality = []
+        process_hrrr.collect_field_stats(quality, datasets)
+        return quality
+
+    def test_field_stats(self):
+        stats = process_hrrr.field_stats([280.0, float('nan'), 290.0, 400.0], (150, 350))
+        self.assertEqual(stats['count'], 4)
+        self.assertAlmostEqual(stats['nan_fraction'], 0.25)
+        self.assertEqual((stats['min'], stats['max']), (280.0, 400.0))
+        self.assertAlmostEqual(stats['mean'], 970.0 / 3)
+        self.assertEqual(stats['out_of_range'], 1)
+
+    def test_all_nan_field(self):
+        stats = process_hrrr.field_stats([float('nan')] * 3)
+        self.assertEqual(stats['nan_fraction'], 1.0)
+        self.assertIsNone(stats['mean'])
+
+    def test_collect_per_variable_and_level(self):
+        quality = self.fields([280.0, 290.0, 300.0])
+        self.assertEqual([process_hrrr.quality_key(f) for f in quality],
+                         [('t2m', 'heightAboveGround', 2), ('tcc', 'atmosphere', 0)])
+        self.assertEqual(quality[0]['mean'], 290.0)
+
+    def test_collect_splits_levels_and_hypercubes(self):
+        import numpy as np
+        t = np.array([[280.0, 282.0], [260.0, 262.0]])
+        datasets = [
+            FakeDataset({'t': t}, type_of_level='isobaricInhPa', levels=[850, 700]),
+            FakeDataset({'gh': np.array([900.0, 1100.0])}, type_of_level='cloudBase'),
+            FakeDataset({'gh': np.array([8000.0, 9000.0])}, type_of_level='cloudTop'),
+        ]
+        quality = []
+        process_hrrr.collect_field_stats(quality, datasets)
+        process_hrrr.collect_field_stats(quality, datasets[:1])  # not collected twice
+        self.assertEqual([process_hrrr.quality_key(f) for f in quality], [
+            ('t', 'isobaricInhPa', 850), ('t', 'isobaricInhPa', 700),
+            ('gh', 'cloudBase', 0), ('gh', 'cloudTop', 0),
+        ])
+        self.assertEqual([f['mean'] for f in quality], [281.0, 261.0, 1000.0, 8500.0])
+
+    def test_untracked_zero_field_is_ignored(self):
+        import numpy as np
+        datasets = [
+            FakeDataset({'t2m': np.array([280.0, 290.0])}, type_of_level='heightAboveGround',
+                        levels=2.0),
+            FakeDataset({'cfrzr': np.zeros(4), 'csnow': np.zeros(4)}, type_of_level='surface'),
+            FakeDataset({'rwmr': np.zeros((2, 4))}, type_of_level='isobaricInhPa',
+                        levels=[200, 100]),
+        ]
+        quality = []
+        process_hrrr.collect_field_stats(quality, datasets)
+        report = process_hrrr.quality_report(quality)
+        self.assertEqual([f['variable'] for f in report['fields']], ['t2m'])
+        self.assertTrue(report['ok'])
+
+    def test_clean_fields_are_ok(self):
+        report = process_hrrr.quality_report(self.fields([280.0, 290.0, 300.0]), 3)
+        self.assertTrue(report['ok'])
+        self.assertEqual(report['forecast_hour'], 3)
+        self.assertEqual(report['fields'][0]['flags'], [])
+
+    def test_absolute_flags(self):
+        report = process_hrrr.quality_report(
+            self.fields([float('nan')] * 3, tcc=(0.0, 0.0, 130.0)))
+        self.assertFalse(report['ok'])
+        self.assertEqual(report['fields'][0]['flags'], ['all_nan'])
+        self.assertEqual(report['fields'][1]['flags'], ['out_of_range'])
+
+    def test_constant_field(self):
+        report = process_hrrr.quality_report(self.fields([0.0, 0.0, 0.0]))
+        self.assertIn('constant', report['fields'][0]['flags'])
+
+    def test_flags_against_previous_cycle(self):
+        previous = process_hrrr.quality_report(self.fields([280.0, 290.0, 300.0]))
+        report = process_hrrr.quality_report(
+            self.fields([float('nan'), 250.0, 260.0]), previous=previous)
+        self.assertEqual(report['fields'][0]['flags'], ['nan_increase', 'mean_shift'])
+        self.assertEqual(report['fields'][1]['flags'], [])
+        self.assertEqual(report['flagged'], 1)
+
+    def test_missing_field(self):
+        previous = process_hrrr.quality_report(self.fields([280.0, 290.0, 300.0]))
+        report = process_hrrr.quality_report(self.fields([280.0, 290.0, 300.0])[:1],
+                                             previous=previous)
+        self.assertEqual(report['missing'],
+                         [{'variable': 'tcc', 'type_of_level': 'atmosphere', 'level': 0}])
+        self.assertFalse(report['ok'])
+
+
 if __name__ == '__main__':
     unittest.main()
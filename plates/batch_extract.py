@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Cycle-wide batch extraction of approach plates.
+
+Runs extract_plate() over a directory of plate PDFs, a manifest listing
+them or a d-TPP zip archive across a process pool. Every plate's result,
+skip or error record is appended to an NDJSON file (errors also to an
+error file) and a checkpoint lets an interrupted run resume. --cache-dir
+reuses the results of unchanged plates; --route skips charts no
+extractor handles (plate_classify).
+
+Usage:
+  python batch_extract.py /data/dtpp/2602 \
+    --out results.ndjson --errors errors.ndjson \
+    --checkpoint checkpoint.txt --workers 8 --cache-dir /var/cache/plates
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from extract_plate import (EXTRACTOR_VERSION, StageRecorder, extract_plate_bytes,
+                           instrumented, stage)
+from plate_cache import ExtractionCache, cached_extract, content_key
+from plate_classify import extract_routed, load_chart_codes
+from plate_inputs import iter_inputs, read_input
+
+# Cache version of routed results, which include skip records (records keep
+# the EXTRACTOR_VERSION content_key)
+ROUTED_VERSION = f"{EXTRACTOR_VERSION}+routed"
+
+# Chunks a worker runs before it is replaced (bounds MuPDF memory growth)
+MAX_TASKS_PER_CHILD = 500
+
+# Error of a plate whose worker died (e.g. a MuPDF segfault) while it ran alone
+WORKER_CRASHED = "WorkerCrashed: worker process died on this plate"
+
+# Per-worker cache handle, instrumentation and routing switches and the
+# metafile's chart codes, set by init_worker
+_cache = None
+_instrument = False
+_route = False
+_chart_codes = None
+
+
+def load_checkpoint(path, retry_errors=False):
+    """Set of plate paths already finished by a previous run."""
+    if not path or not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if not fields[0]:
+                continue
+            if retry_errors and len(fields) > 1 and fields[1] == "error":
+                continue
+            done.add(fields[0])
+    return done
+
+
+def init_worker(cache_dir, cache_max_bytes, instrument=False, route=False, chart_codes=None):
+    global _cache, _instrument, _route, _chart_codes
+    _cache = ExtractionCache(cache_dir, cache_max_bytes) if cache_dir else None
+    _instrument = instrument
+    _route = route
+    _chart_codes = chart_codes
+
+
+def extract_one(pdf_path):
+    """Worker: extract one plate, never raising (errors become records).
+
+    Returns (status, path, record, seconds, cache_hit, stages); status is
+    "ok", "error" or (when routing) "unsupported", cache_hit is None when
+    no cache is configured, stages is the plate's StageRecorder.to_dict()
+    when instrumenting, else None.
+    """
+    start = time.perf_counter()
+    hit = key = None
+    recorder = StageRecorder() if _instrument else None
+    with instrumented(recorder) if recorder else contextlib.nullcontext():
+        try:
+            # Read once; the cache hashes and PyMuPDF parses the same buffer
+            with stage("read_input"):
+                data = read_input(pdf_path)
+            extract, version = (
+                (functools.partial(extract_routed, chart_codes=_chart_codes), ROUTED_VERSION)
+                if _route else (extract_plate_bytes, EXTRACTOR_VERSION))
+            # Records are keyed on the extractor version alone, so routed and
+            # unrouted runs of a plate compare equal in plate_changes
+            key = content_key(data, EXTRACTOR_VERSION)
+            if _cache is not None:
+                cache_key = key if version == EXTRACTOR_VERSION else content_key(data, version)
+                with stage("cache") as st:
+                    result, hit = cached_extract(pdf_path, _cache, data, extract, version,
+                                                 cache_key)
+                    st.outcome = "hit" if hit else "miss"
+            else:
+                result = extract(data, pdf_path)
+            status = "unsupported" if "skipped" in result else "ok"
+            record = dict(result, content_key=key)
+        except Exception as e:
+            status, record = "error", error_record(pdf_path, f"{type(e).__name__}: {e}", key)
+    stages = recorder.to_dict() if recorder else None
+    return status, pdf_path, record, time.perf_counter() - start, hit, stages
+
+
+def error_record(pdf_path, error, key=None):
+    """Error line of a plate; content_key is null when its bytes were never read."""
+    return {"source": pdf_path, "error": error, "content_key": key}
+
+
+def run_chunk(tasks, worker):
+    """Worker: worker results for a chunk of tasks."""
+    return [worker(task) for task in tasks]
+
+
+def pool_results(chunks, workers, suspects, worker, initializer=None, initargs=()):
+    """Yield worker results for every chunk, run across a process pool.
+
+    A worker that dies breaks the whole pool (BrokenProcessPool) instead of
+    hanging the run: the tasks of every chunk still in flight are appended
+    to suspects, and the chunks not yet submitted go to a fresh pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    queue = deque(chunks)
+    # spawn: workers never inherit the parent's threads or open archives
+    context = multiprocessing.get_context("spawn")
+    while queue:
+        with ProcessPoolExecutor(workers, context, initializer, initargs,
+                                 max_tasks_per_child=MAX_TASKS_PER_CHILD) as pool:
+            running = {}
+            broken = False
+            while (queue or running) and not broken:
+                while queue and len(running) < 2 * workers:
+                    chunk = queue.popleft()
+                    running[pool.submit(run_chunk, chunk, worker)] = chunk
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if isinstance(future.exception(), BrokenProcessPool):
+                        broken = True
+                        continue
+                    del running[future]
+                    yield from future.result()
+            for chunk in running.values():
+                suspects.extend(chunk)
+
+
+# Callers write and checkpoint results in the parent as they arrive, so a
+# crash of the run repeats at most the plates in flight and never loses
+# one. A worker killed outright (e.g. a MuPDF segfault) breaks the pool
+# instead of hanging the run; the plates that were in flight are rerun one
+# at a time, and one that kills its worker again is the culprit.
+def pool_map(tasks, worker, on_crash, workers=None, chunksize=4,
+             initializer=None, initargs=()):
+    """Yield worker(task) for every task, in chunks across a process pool.
+
+    worker must be a module-level function (workers are spawned). For a
+    task that kills its worker even when run alone, on_crash(task) is
+    yielded instead.
+    """
+    chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+    suspects = []
+    yield from pool_results(chunks, workers, suspects, worker, initializer, initargs)
+    for task in suspects:
+        crashed = []
+        yield from pool_results([[task]], 1, crashed, worker, initializer, initargs)
+        if crashed:
+            yield on_crash(task)
+
+
+def crash_record(pdf_path):
+    """WORKER_CRASHED error line, keyed on the plate's bytes when readable."""
+    try:
+        key = content_key(read_input(pdf_path), EXTRACTOR_VERSION)
+    except Exception:
+        key = None
+    return error_record(pdf_path, WORKER_CRASHED, key)
+
+
+def append_line(f, record):
+    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    f.flush()
+
+
+def run_batch(paths, out_path, errors_path, checkpoint_path=None,
+              workers=None, chunksize=4, retry_errors=False,
+              cache_dir=None, cache_max_bytes=512 * 1024 * 1024,
+              stage_stats_path=None, route=False, worker=extract_one, chart_codes=None):
+    """Extract every plate not yet in the checkpoint; return run statistics.
+
+    Every plate gets a line in out_path (errors also go to errors_path).
+    worker is the per-plate function run in the pool. stage_stats_path
+    receives the batch's stage timings as JSON; with route, skipped charts
+    are counted under "unsupported_charts".
+    """
+    done = load_checkpoint(checkpoint_path, retry_errors)
+    pending = [p for p in paths if p not in done]
+    stats = {"total": len(paths), "skipped": len(paths) - len(pending),
+             "ok": 0, "error": 0, "crashed": 0, "seconds": 0.0}
+    if cache_dir:
+        stats.update(cache_hits=0, cache_misses=0, cache_evicted=0)
+    if route:
+        stats.update(unsupported=0, unsupported_charts={})
+    if not pending:
+        return stats
+
+    start = time.perf_counter()
+    batch_stages = StageRecorder() if stage_stats_path else None
+    initargs = (cache_dir, cache_max_bytes, bool(stage_stats_path), route, chart_codes)
+    checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+    try:
+        with open(out_path, "a") as out, open(errors_path, "a") as errors:
+            def finish(status, pdf_path, record, elapsed, hit, stages):
+                if status == "unsupported":
+                    chart = record["skipped"]
+                    kind = f"{chart['publisher']} {chart['chart_type']}"
+                    charts = stats["unsupported_charts"]
+                    charts[kind] = charts.get(kind, 0) + 1
+                elif status == "error":
+                    append_line(errors, record)
+                # Every plate gets a results line, so a cycle's results list all its plates
+                append_line(out, record)
+                stats[status] += 1
+                if stages is not None:
+                    batch_stages.merge(stages)
+                    batch_stages.record("plate", elapsed * 1000, outcome=status)
+                if hit is not None:
+                    stats["cache_hits" if hit else "cache_misses"] += 1
+                if checkpoint:
+                    checkpoint.write(f"{pdf_path}\t{status}\t{elapsed:.3f}\n")
+                    checkpoint.flush()
+
+            def crashed(pdf_path):
+                stats["crashed"] += 1
+                return "error", pdf_path, crash_record(pdf_path), 0.0, None, None
+
+            for result in pool_map(pending, worker, crashed, workers, chunksize,
+                                   init_worker, initargs):
+                finish(*result)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    if cache_dir:
+        # Evict once at the end, from a single process
+        stats["cache_evicted"], _ = ExtractionCache(cache_dir, cache_max_bytes).evict()
+
+    if batch_stages is not None:
+        with open(stage_stats_path, "w") as f:
+            json.dump(batch_stages.to_dict(), f, indent=1)
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-extract approach plate PDFs")
+    parser.add_argument("source",
+                        help="Directory of plate PDFs, a manifest of paths, or a zip archive")
+    parser.add_argument("--out", default="results.ndjson", help="NDJSON results file (appended)")
+    parser.add_argument("--errors", default="errors.ndjson", help="NDJSON error records (appended)")
+    parser.add_argument("--checkpoint", default="checkpoint.txt",
+                        help="Checkpoint manifest of finished plates; '' to disable")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=4,
+                        help="Plates handed to a worker at a time")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="Re-run plates that failed in a previous run")
+    parser.add_argument("--cache-dir", help="Content-addressed extraction cache directory")
+    parser.add_argument("--cache-max-mb", type=float, default=512,
+                        help="Cache size limit in MB (least recently used entries evicted)")
+    parser.add_argument("--stage-stats",
+                        help="Write per-stage timing/outcome histograms for the batch here")
+    parser.add_argument("--route", action="store_true",
+                        help="Fingerprint each chart first and skip those no extractor handles")
+    parser.add_argument("--metafile",
+                        help="d-TPP metafile; with --route, FAA charts are routed by chart code")
+    args = parser.parse_args()
+
+    paths = iter_inputs(args.source)
+    print(f"{len(paths)} plates in {args.source}", file=sys.stderr)
+    stats = run_batch(paths, args.out, args.errors, args.checkpoint or None,
+                      args.workers, args.chunksize, args.retry_errors,
+                      args.cache_dir, int(args.cache_max_mb * 1024 * 1024),
+                      args.stage_stats, args.route,
+                      chart_codes=load_chart_codes(args.metafile) if args.metafile else None)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
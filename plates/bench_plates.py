@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Benchmark and accuracy suite for extract_plate.py.
+
+Builds synthetic FAA-style plates with PyMuPDF (title, comms row, missed
+approach text, a CATEGORY minimums table with several procedures and
+stacked or inline fractions, and any number of plan-view clutter spans),
+times every extractor stage on them and on the real sample plates, and
+checks accuracy two ways:
+
+  - synthetic plates: extracted title, comms, missed approach and minimums
+    must match what the generator drew;
+  - sample plates: extract_plate() output must match golden/<name>.json.
+
+Timings (best over --rounds x --repeat runs, in ms) are compared with a saved baseline; a
+stage slower than baseline * (1 + --tolerance) fails the run, as does
+any accuracy mismatch. The baseline is machine-specific, so it is written
+on the first run (or with --save-baseline) rather than checked in.
+
+Usage:
+  python bench_plates.py                       # check accuracy and speed
+  python bench_plates.py --save-baseline       # record timings on this machine
+  python bench_plates.py --update-golden       # accept current sample output
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24.3 only ships the fitz name
+    import fitz
+
+import extract_plate as ep
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(HERE, "golden")
+SAMPLE_PLATES = [
+    "apa-ils35-faa.pdf",
+    "apa-ils35-jep.pdf",
+    "plates/faa-ils-kapa.pdf",
+    "plates/ils-faa-extended-missed.pdf",
+    "plates/ils-jep-extended-missed.pdf",
+]
+
+FONT = "tiro"
+# Column centres of the FAA minimums table
+COLUMN_X = {"A": 309, "B": 376, "C": 441, "D": 507}
+CATEGORY_Y = 650
+PROCEDURE_PITCH = 23
+COMM_NAMES = {
+    "ATIS": "ATIS",
+    "DENVER APP CON": "Denver Approach",
+    "CENTENNIAL TOWER": "Centennial Tower",
+    "GND CON": "Ground",
+    "CLNC DEL": "Clearance Delivery",
+}
+COMM_X = {"ATIS": 106, "DENVER APP CON": 179, "CENTENNIAL TOWER": 268,
+          "GND CON": 380, "CLNC DEL": 475}
+PROCEDURES = ["S-ILS 35R", "S-LOC 35R", "CIRCLING"]
+# (whole, stacked/inline fraction digits) for each visibility
+VISIBILITIES = [("", "12"), ("", "34"), ("1", ""), ("1", "14"), ("1", "12"),
+                ("1", "34"), ("2", ""), ("2", "14"), ("2", "12"), ("3", "")]
+WORDS = ["CLIMB", "HEADING", "TO", "INTERCEPT", "RADIAL", "AND", "HOLD",
+         "DIRECT", "VORTAC", "THEN", "RIGHT", "LEFT", "TURN", "FEET"]
+
+DEFAULT_BASELINE = os.path.join(HERE, ".bench_baseline.json")
+CALIBRATION = "_calibration"
+
+
+def put(page, x, y0, text, size):
+    """Draw text with its top edge at about y0 (insert_text takes a baseline)."""
+    page.insert_text((x, y0 + size), text, fontsize=size, fontname=FONT)
+
+
+def text_width(text, size):
+    return fitz.get_text_length(text, fontname=FONT, fontsize=size)
+
+
+def draw_fraction(page, x, y0, digits, stacked):
+    """A fraction drawn the way FAA plates do: stacked digits or one small span."""
+    if stacked:
+        put(page, x, y0 - 1, digits[0], 7.1)
+        put(page, x + 5, y0 + 3.1, digits[1], 7.1)
+    else:
+        put(page, x, y0 + 0.5, digits, 5.4)
+
+
+def make_synthetic_plate(seed, procedures=3, clutter=200, stacked=0.5):
+    """Draw a synthetic FAA-style plate; return (pdf_bytes, expected fields).
+
+    procedures: minimums rows (1-3, the table has room for three two-line
+    rows); clutter: extra plan/profile view spans; stacked: share of
+    altitude fractions drawn as stacked digits instead of one small span.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+
+    runway = f"{rng.randint(1, 36)}{rng.choice(['', 'L', 'R'])}"
+    title = f"ILS or LOC RWY {runway}"
+    put(page, 383, 57, title, 15.2)
+
+    comms = []
+    for label in ep.COMM_LABELS:
+        if rng.random() < 0.2:
+            continue
+        freq = f"{rng.randint(118, 135)}.{rng.randint(0, 9)}"
+        put(page, COMM_X[label] + 5, 141, label, 7.0)
+        put(page, COMM_X[label], 151.6, freq, 9.6)
+        comms.append({"name": COMM_NAMES[label], "frequency": freq})
+
+    lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 6)))
+             for _ in range(rng.randint(1, 3))]
+    put(page, 388, 95, "MISSED APPROACH:", 7.4)
+    for n, line in enumerate(lines):
+        put(page, 388, 102.5 + 7.5 * n, line, 7.4)
+
+    for _ in range(clutter):
+        kind = rng.random()
+        if kind < 0.4:
+            text = "".join(rng.choice("BCDFGHJLMNPQRSTVWXZ") for _ in range(5))
+        elif kind < 0.7:
+            text = str(rng.randint(20, 120) * 100)
+        else:
+            text = f"{rng.randint(1, 360):03d}°"
+        put(page, rng.uniform(20, 560), rng.uniform(175, 600), text, rng.uniform(5, 9))
+
+    put(page, 225, CATEGORY_Y, "CATEGORY", 6.5)
+    for col, x in COLUMN_X.items():
+        put(page, x - 3, CATEGORY_Y, col, 7.0)
+
+    minimums = {}
+    for n, name in enumerate(PROCEDURES[:procedures]):
+        # Two-line values sit either side of the procedure label
+        y = CATEGORY_Y + 14 + PROCEDURE_PITCH * n
+        put(page, 225, y, name, 7.1)
+        minimums[name] = {}
+        for col, x in COLUMN_X.items():
+            whole, frac = rng.choice(VISIBILITIES)
+            visibility = whole + ep.FRACTION_MAP.get(frac, "")
+            altitude = rng.randint(55, 75) * 100 + rng.choice([0, 20, 40, 60, 85])
+            hat = rng.randint(200, 900)
+            hat_ref = (hat + 99) // 100 * 100
+
+            alt_text = f"{altitude}-{whole}"
+            alt_x = x - 18
+            put(page, alt_x, y - 5.5, alt_text, 9.6)
+            if frac:
+                draw_fraction(page, alt_x + text_width(alt_text, 9.6), y - 5.5, frac,
+                              rng.random() < stacked)
+
+            hat_x = x - 24
+            if frac:
+                hat_text = f"{hat} ({hat_ref}-{whole}    )"
+                put(page, hat_x, y + 5.8, hat_text, 7.8)
+                draw_fraction(page, hat_x + text_width(hat_text, 7.8) - 12, y + 5.8,
+                              frac, False)
+            else:
+                put(page, hat_x, y + 5.8, f"{hat} ({hat_ref}-{whole})", 7.8)
+
+            minimums[name][col] = {"altitude": altitude, "visibility": visibility,
+                                   "hat": hat, "hat_ref": hat_ref,
+                                   "hat_visibility": visibility}
+
+    expected = {
+        "procedure_name": title,
+        "communications": comms,
+        "missed_approach": " ".join(lines),
+        "minimums": minimums,
+    }
+    data = doc.tobytes()
+    doc.close()
+    return data, expected
+
+
+def check_synthetic(result, expected):
+    """Differences between an extraction and what the generator drew."""
+    problems = []
+    for key in ("procedure_name", "communications", "missed_approach"):
+        if result.get(key) != expected[key]:
+            problems.append(f"{key}: got {result.get(key)!r}, want {expected[key]!r}")
+    got_min = result.get("minimums", {})
+    for proc, cols in expected["minimums"].items():
+        for col, want in cols.items():
+            got = got_min.get(proc, {}).get(col, {})
+            got = {k: got.get(k) for k in want}
+            if got != want:
+                problems.append(f"minimums {proc} {col}: got {got}, want {want}")
+    extra = set(got_min) - set(expected["minimums"])
+    if extra:
+        problems.append(f"minimums: unexpected procedures {sorted(extra)}")
+    return problems
+
+
+def check_golden(pdf_path, update=False):
+    """Compare a sample plate with its golden JSON (or rewrite the golden)."""
+    result = ep.extract_plate(pdf_path)
+    result.pop("source", None)
+    golden_path = os.path.join(GOLDEN_DIR, os.path.basename(pdf_path) + ".json")
+    if update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(golden_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        return []
+    try:
+        with open(golden_path, encoding="utf-8") as f:
+            golden = json.load(f)
+    except OSError:
+        return [f"no golden file {golden_path} (run with --update-golden)"]
+    return [f"{key}: got {result.get(key)!r}, want {golden.get(key)!r}"
+            for key in sorted(set(result) | set(golden))
+            if result.get(key) != golden.get(key)]
+
+
+def best_ms(fn, repeat):
+    """Best wall time of fn() over repeat runs, in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def time_stages(pdf_path, repeat):
+    """Per-stage timings for one plate: parse, index, tokens, each extractor."""
+    with fitz.open(pdf_path) as doc:
+        page = doc[0]
+        items = ep.extract_text_items(page)
+        index = ep.SpanIndex(items)
+        tokens = ep.Tokens(items)
+        width = page.rect.width
+        stages = {
+            "extract_text_items": lambda: ep.extract_text_items(page),
+            "SpanIndex": lambda: ep.SpanIndex(items),
+            "Tokens": lambda: ep.Tokens(items),
+            "extract_airport_info": lambda: ep.extract_airport_info(items, index, tokens),
+            "extract_approach_info": lambda: ep.extract_approach_info(items, index, tokens),
+            "extract_comms": lambda: ep.extract_comms(items, index, tokens),
+            "extract_missed_approach": lambda: ep.extract_missed_approach(items, index, tokens),
+            "extract_notes": lambda: ep.extract_notes(items, index, tokens),
+            "extract_minimums": lambda: ep.extract_minimums(items, width, index, tokens),
+        }
+        timings = {name: best_ms(fn, repeat) for name, fn in stages.items()}
+        timings["spans"] = len(items)
+    timings["extract_plate"] = best_ms(lambda: ep.extract_plate(pdf_path), repeat)
+    return timings
+
+
+def calibrate(repeat):
+    """Time a fixed workload that does not touch the extractor.
+
+    Stage timings are scaled by this run's calibration over the baseline's,
+    so a busier or slower machine does not read as a regression.
+    """
+    words = [f"W{i % 97}-{i}" for i in range(20000)]
+    return best_ms(lambda: sorted(w.lower() for w in words if "-" in w), repeat)
+
+
+def compare_timings(timings, baseline, tolerance, floor_ms=0.1):
+    """Stages slower than the calibrated baseline * (1 + tolerance).
+
+    Differences under floor_ms are ignored as noise.
+    """
+    scale = 1.0
+    if CALIBRATION in timings and CALIBRATION in baseline:
+        scale = timings[CALIBRATION]["ms"] / baseline[CALIBRATION]["ms"]
+    slower = []
+    for case, stages in timings.items():
+        if case == CALIBRATION:
+            continue
+        for stage, ms in stages.items():
+            if stage == "spans":
+                continue
+            base = baseline.get(case, {}).get(stage)
+            if base is None:
+                continue
+            allowed = base * scale
+            if ms > allowed * (1 + tolerance) and ms - allowed > floor_ms:
+                slower.append(f"{case} {stage}: {ms:.3f} ms vs baseline {base:.3f} ms "
+                              f"(x{scale:.2f} machine speed)")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and accuracy check for extract_plate")
+    parser.add_argument("--synthetic", type=int, default=24,
+                        help="Synthetic plates to check for accuracy")
+    parser.add_argument("--clutter", type=int, nargs="+", default=[200, 2000],
+                        help="Clutter span counts of the timed synthetic plates")
+    parser.add_argument("--rounds", type=int, default=5, help="Timing rounds over all cases")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timing runs per stage per round (best kept)")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown over baseline (0.5 = 50%%)")
+    parser.add_argument("--floor-ms", type=float, default=0.1,
+                        help="Ignore slowdowns smaller than this (timer noise)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Timing baseline JSON")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Write this run's timings as the baseline")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="Rewrite golden JSON from current sample output")
+    parser.add_argument("--json", help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Accuracy on synthetic plates of every shape
+        for seed in range(args.synthetic):
+            data, expected = make_synthetic_plate(
+                seed, procedures=1 + seed % 3, clutter=50 * (seed % 4),
+                stacked=(seed % 5) / 4)
+            path = os.path.join(tmp, f"synthetic-{seed}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            failures += [f"synthetic {seed}: {p}"
+                         for p in check_synthetic(ep.extract_plate(path), expected)]
+
+        for name in SAMPLE_PLATES:
+            failures += [f"golden {name}: {p}"
+                         for p in check_golden(os.path.join(HERE, name), args.update_golden)]
+
+        # Timings
+        cases = {}
+        for clutter in args.clutter:
+            data, _ = make_synthetic_plate(1000 + clutter, procedures=3, clutter=clutter)
+            path = os.path.join(tmp, f"timing-{clutter}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            cases[f"synthetic-{clutter}"] = path
+        for name in SAMPLE_PLATES:
+            cases[os.path.basename(name)] = os.path.join(HERE, name)
+        # Several short rounds over every case, keeping each stage's best,
+        # so a burst of load on the machine only spoils one round
+        timings = {CALIBRATION: {"ms": float("inf")}}
+        for _ in range(args.rounds):
+            timings[CALIBRATION]["ms"] = min(timings[CALIBRATION]["ms"],
+                                             calibrate(args.repeat))
+            for case, path in cases.items():
+                stages = time_stages(path, args.repeat)
+                best = timings.setdefault(case, stages)
+                for stage, ms in stages.items():
+                    best[stage] = min(best[stage], ms)
+
+    stages = [s for s in timings[os.path.basename(SAMPLE_PLATES[0])] if s != "spans"]
+    print(f"{'case':<34}{'spans':>7}" + "".join(f"{s.replace('extract_', ''):>16}" for s in stages))
+    for case, t in timings.items():
+        if case != CALIBRATION:
+            print(f"{case:<34}{t['spans']:>7}" + "".join(f"{t[s]:>16.3f}" for s in stages))
+    print(f"calibration {timings[CALIBRATION]['ms']:.3f} ms")
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures += compare_timings(timings, baseline, args.tolerance, args.floor_ms)
+    else:
+        with open(args.baseline, "w") as f:
+            json.dump(timings, f, indent=1)
+        print(f"timing baseline written to {args.baseline}", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"timings": timings, "baseline": baseline, "failures": failures}, f, indent=1)
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    print(f"{len(failures)} failure(s)", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
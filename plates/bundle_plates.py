@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+One-pass plate bundles: text, georeference and images from a single open.
+
+Today a plate is opened three times: extract_plate parses page 1, the API
+re-reads the file for its GeoPDF viewport, and pdftoppm renders it again.
+This job opens each PDF once (from disk or straight out of a d-TPP zip)
+and, for every page, runs the section extractors, reads the georeference
+(read_georef, the API's GeorefData shape) and rasterizes the images
+(render_page, the API image cache layout). Everything lands in one
+<name>.bundle.json per plate next to its images.
+
+Bundles carry the plate's content key (plate_cache.content_key), so
+re-running a cycle skips plates whose bytes and extractor version, and
+the requested images, are unchanged. bundles.json in the output
+directory lists every bundle; it is rewritten every
+MANIFEST_FLUSH_EVERY plates, so an interrupted run keeps its progress.
+
+Bundle:
+  {"version": 1, "source": ..., "content_key": ..., "page_count": 1,
+   "pages": [{"page": 1, "width_pt": ..., "height_pt": ...,
+              "extraction": {...}, "georef": {...} | null,
+              "images": {"200": {"file": ..., "width": ..., "height": ...}},
+              "tiles": {...}}]}
+
+Usage:
+  python bundle_plates.py /data/dtpp/DDTPPA_2602.zip \
+    --out api/data/procedures/images/2602 --dpi 200 --tiles --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24.3 only ships the fitz name
+    import fitz
+
+from batch_extract import WORKER_CRASHED, pool_map
+from extract_plate import Plate
+from plate_cache import content_key
+from plate_inputs import input_name, iter_inputs, read_input
+from plate_vector import read_georef
+from render_plates import (DEFAULT_DPI, MANIFEST_FLUSH_EVERY, TILE_MAX_DPI, TILE_SIZE,
+                           render_page, write_atomic)
+
+BUNDLE_VERSION = 1
+BUNDLE_MANIFEST = "bundles.json"
+
+
+def bundle_name(pdf_path):
+    return os.path.splitext(input_name(pdf_path))[0] + ".bundle.json"
+
+
+def build_bundle(data, source, out_dir, dpis=(DEFAULT_DPI,), tiles=False,
+                 tile_max_dpi=TILE_MAX_DPI, tile_size=TILE_SIZE, key=None):
+    """Open a plate once and write its images; return the bundle dict."""
+    pages = []
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page_no, page in enumerate(doc):
+            extraction = Plate(page, source).to_dict()
+            del extraction["source"]
+            entry = {"page": page_no + 1}
+            rendered = render_page(page, input_name(source), out_dir, dpis, tiles,
+                                   tile_max_dpi, tile_size, page_no)
+            entry["width_pt"] = rendered.pop("width_pt")
+            entry["height_pt"] = rendered.pop("height_pt")
+            entry["extraction"] = extraction
+            entry["georef"] = read_georef(doc, page)
+            entry.update(rendered)
+            pages.append(entry)
+    return {
+        "version": BUNDLE_VERSION,
+        "source": source,
+        "content_key": key or content_key(data),
+        "page_count": len(pages),
+        "pages": pages,
+    }
+
+
+def bundle_options(dpis, tiles, tile_max_dpi=TILE_MAX_DPI, tile_size=TILE_SIZE):
+    """Manifest fields of the images a bundle was built with."""
+    return {"version": BUNDLE_VERSION, "dpis": sorted(dpis),
+            "tiles": {"max_dpi": tile_max_dpi, "size": tile_size} if tiles else None}
+
+
+def is_current(record, key, out_dir, options):
+    """Whether a manifest record is this plate's bundle, built as requested."""
+    return (record.get("content_key") == key
+            and all(record.get(field) == value for field, value in options.items())
+            and os.path.exists(os.path.join(out_dir, record["bundle"])))
+
+
+def bundle_one(task):
+    """Worker: bundle one plate unless its manifest record is current.
+
+    Never raises; returns (status, path, record, seconds) with status
+    "ok", "skipped" or "error".
+    """
+    pdf_path, out_dir, dpis, tiles, tile_max_dpi, tile_size, previous = task
+    start = time.perf_counter()
+    try:
+        data = read_input(pdf_path)
+        key = content_key(data)
+        options = bundle_options(dpis, tiles, tile_max_dpi, tile_size)
+        if previous and is_current(previous, key, out_dir, options):
+            return "skipped", pdf_path, None, time.perf_counter() - start
+        bundle = build_bundle(data, pdf_path, out_dir, dpis, tiles,
+                              tile_max_dpi, tile_size, key)
+        name = bundle_name(pdf_path)
+        write_atomic(os.path.join(out_dir, name),
+                     json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        record = {"bundle": name, "content_key": key, **options,
+                  "page_count": bundle["page_count"],
+                  "georef": any(p["georef"] is not None for p in bundle["pages"])}
+        return "ok", pdf_path, record, time.perf_counter() - start
+    except Exception as e:
+        error = {"source": pdf_path, "error": f"{type(e).__name__}: {e}"}
+        return "error", pdf_path, error, time.perf_counter() - start
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, BUNDLE_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"plates": {}}
+
+
+def write_manifest(out_dir, plates, errors):
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "default_dpi": DEFAULT_DPI,
+        "bundled_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "plates": dict(sorted(plates.items())),
+        "errors": errors,
+    }
+    write_atomic(os.path.join(out_dir, BUNDLE_MANIFEST),
+                 json.dumps(manifest, indent=1).encode("utf-8"))
+
+
+def bundle_cycle(paths, out_dir, dpis=(DEFAULT_DPI,), tiles=False,
+                 tile_max_dpi=TILE_MAX_DPI, tile_size=TILE_SIZE,
+                 workers=None, chunksize=4, force=False,
+                 flush_every=MANIFEST_FLUSH_EVERY, worker=bundle_one):
+    """Bundle every plate of a cycle; return run statistics.
+
+    Plates whose content key, bundle version, dpis and tiles match the
+    previous run's bundles.json are hashed but not reopened. The manifest
+    is rewritten every flush_every plates and at the end; a plate that
+    kills its worker is recorded as WORKER_CRASHED and counted under
+    "crashed".
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    plates = load_manifest(out_dir).get("plates", {})
+
+    stats = {"total": len(paths), "ok": 0, "skipped": 0, "error": 0, "crashed": 0,
+             "seconds": 0.0}
+    start = time.perf_counter()
+    errors = {}
+    tasks = [(p, out_dir, tuple(dpis), tiles, tile_max_dpi, tile_size,
+              None if force else plates.get(input_name(p)))
+             for p in paths]
+
+    def crashed(task):
+        stats["crashed"] += 1
+        return "error", task[0], {"source": task[0], "error": WORKER_CRASHED}, 0.0
+
+    results = pool_map(tasks, worker, crashed, workers, chunksize)
+    for n, (status, pdf_path, record, _) in enumerate(results, 1):
+        stats[status] += 1
+        if status == "ok":
+            plates[input_name(pdf_path)] = record
+        elif status == "error":
+            errors[input_name(pdf_path)] = record["error"]
+        if n % flush_every == 0:
+            write_manifest(out_dir, plates, errors)
+
+    write_manifest(out_dir, plates, errors)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract, georeference and render every plate of a cycle in one pass")
+    parser.add_argument("source",
+                        help="Directory of plate PDFs, a manifest of paths, or a zip archive")
+    parser.add_argument("--out", required=True, help="Per-cycle bundle and image directory")
+    parser.add_argument("--dpi", type=int, action="append",
+                        help=f"Resolution to render (repeatable, default {DEFAULT_DPI})")
+    parser.add_argument("--tiles", action="store_true", help="Also write tile pyramids")
+    parser.add_argument("--tile-max-dpi", type=int, default=TILE_MAX_DPI,
+                        help="Resolution of the deepest tile level")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="Tile edge in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=4,
+                        help="Plates handed to a worker at a time")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild bundles that are already current")
+    args = parser.parse_args()
+
+    paths = iter_inputs(args.source)
+    print(f"{len(paths)} plates in {args.source}", file=sys.stderr)
+    stats = bundle_cycle(paths, args.out, args.dpi or [DEFAULT_DPI], args.tiles,
+                         args.tile_max_dpi, args.tile_size, args.workers,
+                         args.chunksize, args.force)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
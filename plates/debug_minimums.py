@@ -3,7 +3,10 @@
 
 import json
 import sys
-import fitz
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24.3 only ships the fitz name
+    import fitz
 
 pdf_path = sys.argv[1] if len(sys.argv) > 1 else "apa-ils35-faa.pdf"
 doc = fitz.open(pdf_path)
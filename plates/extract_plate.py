@@ -4,10 +4,20 @@ FAA d-TPP Approach Plate PDF → Structured JSON extractor.
 Proof of concept using PyMuPDF to extract minimums, comms, and approach data.
 """
 
+import bisect
+import contextlib
+import io
 import json
 import re
 import sys
-import fitz  # PyMuPDF
+import time
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24.3 only ships the fitz name
+    import fitz
+
+# Bump whenever extraction output changes; cached results are keyed on it
+EXTRACTOR_VERSION = "1"
 
 # Fraction map: "12" → "½", "14" → "¼", etc.
 FRACTION_MAP = {
@@ -15,11 +25,313 @@ FRACTION_MAP = {
     "18": "⅛", "38": "⅜", "58": "⅝", "78": "⅞",
 }
 
+# Spatial index cell size in PDF points (a few text lines tall)
+INDEX_CELL_SIZE = 16
+
+# Upper bounds of the stage timing histogram buckets, in ms (plus overflow)
+STAGE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class StageRecorder:
+    """Per-stage wall time, span counts and outcome codes across many plates.
+
+    Install one with instrumented(); extraction stages then report into
+    it and to_dict() gives per-stage histograms. Recorders from several
+    workers combine with merge().
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def _stage(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "histogram": [0] * (len(STAGE_BUCKETS_MS) + 1),
+                "spans": 0, "max_spans": 0, "outcomes": {},
+            }
+        return stats
+
+    def record(self, name, ms, spans=None, outcome=None):
+        stats = self._stage(name)
+        stats["count"] += 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+        stats["histogram"][bisect.bisect_left(STAGE_BUCKETS_MS, ms)] += 1
+        if spans is not None:
+            stats["spans"] += spans
+            stats["max_spans"] = max(stats["max_spans"], spans)
+        if outcome is not None:
+            stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + 1
+
+    def merge(self, other):
+        """Add another recorder's to_dict() output into this one."""
+        for name, theirs in other["stages"].items():
+            stats = self._stage(name)
+            stats["count"] += theirs["count"]
+            stats["total_ms"] += theirs["total_ms"]
+            stats["max_ms"] = max(stats["max_ms"], theirs["max_ms"])
+            stats["histogram"] = [a + b for a, b in zip(stats["histogram"], theirs["histogram"])]
+            stats["spans"] += theirs["spans"]
+            stats["max_spans"] = max(stats["max_spans"], theirs["max_spans"])
+            for outcome, n in theirs["outcomes"].items():
+                stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + n
+
+    def to_dict(self):
+        stages = {}
+        for name, stats in self.stages.items():
+            stages[name] = dict(stats, total_ms=round(stats["total_ms"], 3),
+                                max_ms=round(stats["max_ms"], 3),
+                                mean_ms=round(stats["total_ms"] / stats["count"], 3),
+                                histogram=list(stats["histogram"]),
+                                outcomes=dict(stats["outcomes"]))
+        return {"buckets_ms": list(STAGE_BUCKETS_MS), "stages": stages}
+
+
+class _Stage:
+    """One timed stage; set .spans and .outcome inside the with block."""
+
+    __slots__ = ("recorder", "name", "spans", "outcome", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.spans = None
+        self.outcome = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = self.outcome if exc_type is None else f"raised {exc_type.__name__}"
+        self.recorder.record(self.name, (time.perf_counter() - self.start) * 1000,
+                             self.spans, outcome)
+        return False
+
+
+class _NullStage:
+    """Stand-in when instrumentation is off: attribute writes are dropped."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+# Active StageRecorder, or None when instrumentation is off
+_recorder = None
+
+
+def stage(name):
+    """Context manager timing one extraction stage into the active recorder."""
+    return _NULL_STAGE if _recorder is None else _Stage(_recorder, name)
+
+
+@contextlib.contextmanager
+def instrumented(recorder=None):
+    """Record extraction stages into recorder (a new one by default) while active."""
+    global _recorder
+    recorder = recorder if recorder is not None else StageRecorder()
+    previous, _recorder = _recorder, recorder
+    try:
+        yield recorder
+    finally:
+        _recorder = previous
+
+
+class SpanIndex:
+    """Uniform-grid spatial index over text items, keyed by each item's (x0, y0).
+
+    Queries return items in their original page order, so extractors that
+    take the first match behave exactly as they did with a linear scan.
+    """
+
+    def __init__(self, items, cell_size=INDEX_CELL_SIZE):
+        self.items = items
+        self.cell_size = cell_size
+        self.cells = {}
+        self.by_text = {}
+        for pos, item in enumerate(items):
+            key = (int(item.x0 // cell_size), int(item.y0 // cell_size))
+            self.cells.setdefault(key, []).append(pos)
+            self.by_text.setdefault(item.text, []).append(item)
+        if self.cells:
+            self.min_cx = min(k[0] for k in self.cells)
+            self.max_cx = max(k[0] for k in self.cells)
+            self.min_cy = min(k[1] for k in self.cells)
+            self.max_cy = max(k[1] for k in self.cells)
+
+    def _cell_range(self, lo, hi, min_c, max_c):
+        first = min_c if lo is None else max(min_c, int(lo // self.cell_size))
+        last = max_c if hi is None else min(max_c, int(hi // self.cell_size))
+        return range(first, last + 1)
+
+    def rect(self, x_min=None, y_min=None, x_max=None, y_max=None, inclusive=False):
+        """Items whose (x0, y0) lies inside the rectangle; None leaves a side open.
+
+        Bounds are exclusive unless inclusive=True.
+        """
+        if not self.cells:
+            return []
+        positions = []
+        for cx in self._cell_range(x_min, x_max, self.min_cx, self.max_cx):
+            for cy in self._cell_range(y_min, y_max, self.min_cy, self.max_cy):
+                positions.extend(self.cells.get((cx, cy), ()))
+        positions.sort()
+
+        def inside(v, lo, hi):
+            if inclusive:
+                return (lo is None or v >= lo) and (hi is None or v <= hi)
+            return (lo is None or v > lo) and (hi is None or v < hi)
+
+        return [self.items[p] for p in positions
+                if inside(self.items[p].x0, x_min, x_max)
+                and inside(self.items[p].y0, y_min, y_max)]
+
+    def same_row(self, y, tolerance):
+        """Items whose y0 is within tolerance of y."""
+        return [i for i in self.rect(y_min=y - tolerance, y_max=y + tolerance, inclusive=True)
+                if abs(i.y0 - y) < tolerance]
+
+    def with_text(self, text):
+        """Items whose text is exactly `text`."""
+        return self.by_text.get(text, [])
+
+
+class Span:
+    """One text span and its bounding box.
+
+    Slots keep a dense page's spans small, font names are interned (a plate
+    uses only a handful), and spans hash by identity so extractors can keep
+    sets of them.
+    """
+
+    __slots__ = ("text", "x0", "y0", "x1", "y1", "size", "font", "fraction")
+
+    def __init__(self, text, x0, y0, x1, y1, size, font, fraction=False):
+        self.text = text
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.size = size
+        self.font = sys.intern(font)
+        self.fraction = fraction
+
+    def as_fraction(self, text):
+        """Copy of this span carrying a resolved fraction glyph."""
+        return Span(text, self.x0, self.y0, self.x1, self.y1, self.size, self.font, True)
+
+    def __repr__(self):
+        return f"Span({self.text!r}, x0={self.x0:.1f}, y0={self.y0:.1f})"
+
+
+# Briefing-strip communication labels, in output order
+COMM_LABELS = ["ATIS", "DENVER APP CON", "CENTENNIAL TOWER", "GND CON", "CLNC DEL"]
+
+
+def _match(pattern, value=lambda m: m.group(0)):
+    """Classifier: value of a re.match at the start of the span text."""
+    rx = re.compile(pattern)
+
+    def classify(text):
+        m = rx.match(text)
+        return value(m) if m else None
+    return classify
+
+
+def _search(pattern, value=lambda m: m.group(0)):
+    """Classifier: value of the first re.search hit anywhere in the span text."""
+    rx = re.compile(pattern)
+
+    def classify(text):
+        m = rx.search(text)
+        return value(m) if m else None
+    return classify
+
+
+# Token kinds and how to recognise them. A span can carry several kinds
+# (e.g. "111.3" is both a frequency and a nav_frequency).
+TOKEN_RULES = [
+    ("frequency", _match(r'\d{2,3}\.\d', lambda m: m.string.strip())),
+    ("nav_frequency", _match(r'^1\d{2}\.\d$', lambda m: float(m.group(0)))),
+    ("course", _match(r'\d{3}°?$', lambda m: int(m.group(0).replace("°", "")))),
+    ("altitude", _match(r'^\d{4,5}$', lambda m: int(m.group(0)))),
+    ("digit", _match(r'^[1-9]$')),
+    ("localizer_id", _match(r'^I-[A-Z]{3}$')),
+    ("channel", _match(r'^Chan\s*(\d+)$', lambda m: int(m.group(1)))),
+    ("glide_slope", _search(r'GS\s*(\d+\.\d+)°?', lambda m: float(m.group(1)))),
+    ("tch", _search(r'TCH\s*(\d+)', lambda m: int(m.group(1)))),
+    ("airport_elevation", _search(r'Apt\s*Elev\s*(\d+)', lambda m: int(m.group(1)))),
+    ("tdze", _search(r'TDZE\s+(\d+\w*)\s+(\d{4,5})',
+                     lambda m: {"runway": m.group(1), "elevation": int(m.group(2))})),
+    ("identifier", _search(r'\(([A-Z]{3,4})\)', lambda m: m.group(1))),
+    ("icao", _match(r'^(K[A-Z]{3})$', lambda m: m.group(1))),
+    ("city_state", _match(r'^([A-Z]+),\s*([A-Z]+)$', lambda m: (m.group(1), m.group(2)))),
+    ("procedure_label", _match(r'S-ILS|S-LOC|SIDESTEP|CIRCLING')),
+    ("section_label", _match(r'^(ATIS|DENVER|CENTENNIAL|GND|CLNC|MISSED)')),
+    ("short_code", _match(r'^[A-Z]\d$')),
+    ("elev_label", _match(r'ELEV')),
+    ("missed_approach_label", _search(r'MISSED APPROACH')),
+    ("comm_label", lambda text: tuple(label for label in COMM_LABELS if label in text) or None),
+]
+
+
+class Token:
+    """A span classified as one token kind, with its parsed value."""
+
+    __slots__ = ("kind", "value", "span")
+
+    def __init__(self, kind, value, span):
+        self.kind = kind
+        self.value = value
+        self.span = span
+
+
+class Tokens:
+    """Every span of a page classified once against TOKEN_RULES.
+
+    Extractors ask for tokens by kind (in page order) or for the kinds of a
+    given span, instead of re-running their own regexes over every span.
+    """
+
+    def __init__(self, items):
+        self.by_kind = {kind: [] for kind, _ in TOKEN_RULES}
+        self.by_span = {}
+        for span in items:
+            kinds = {}
+            for kind, classify in TOKEN_RULES:
+                value = classify(span.text)
+                if value is not None:
+                    kinds[kind] = value
+                    self.by_kind[kind].append(Token(kind, value, span))
+            if kinds:
+                self.by_span[span] = kinds
+
+    def of_kind(self, kind):
+        """Tokens of one kind, in page order."""
+        return self.by_kind[kind]
+
+    def has(self, span, kind):
+        return kind in self.by_span.get(span, ())
 
-def extract_text_items(page):
-    """Extract all text spans with bounding boxes from a PDF page."""
+    def value(self, span, kind):
+        return self.by_span.get(span, {}).get(kind)
+
+
+def extract_text_items(page, clip=None):
+    """Extract text spans with bounding boxes from a PDF page (or a clip of it)."""
     items = []
-    blocks = page.get_text("dict")["blocks"]
+    blocks = page.get_text("dict", clip=clip)["blocks"]
     for block in blocks:
         if "lines" not in block:
             continue
@@ -28,74 +340,65 @@ def extract_text_items(page):
                 text = span["text"].strip()
                 if not text:
                     continue
-                items.append({
-                    "text": text,
-                    "x0": span["bbox"][0],
-                    "y0": span["bbox"][1],
-                    "x1": span["bbox"][2],
-                    "y1": span["bbox"][3],
-                    "size": span["size"],
-                    "font": span["font"],
-                })
+                x0, y0, x1, y1 = span["bbox"]
+                items.append(Span(text, x0, y0, x1, y1, span["size"], span["font"]))
     return items
 
 
-def preprocess_minimums_items(items):
+def preprocess_minimums_items(items, tokens=None):
     """Pre-process minimums items: merge stacked fractions and resolve inline fractions."""
+    tokens = tokens if tokens is not None else Tokens(items)
     # Step 1: Merge stacked single-digit fractions (e.g., '1' over '2' → ½)
-    singles = [i for i in items if re.match(r'^[1-9]$', i["text"])]
-    merged_ids = set()
+    singles = [i for i in items if tokens.has(i, "digit")]
+    singles_index = SpanIndex(singles)
+    merged = set()
     new_items = []
 
     for top in singles:
-        if id(top) in merged_ids:
+        if top in merged:
             continue
-        for bot in singles:
-            if id(top) == id(bot) or id(bot) in merged_ids:
+        below = singles_index.rect(top.x0 - 8, top.y0 + 2, top.x0 + 8, top.y0 + 10,
+                                   inclusive=True)
+        for bot in below:
+            if top is bot or bot in merged:
                 continue
-            if (abs(top["x0"] - bot["x0"]) < 8
-                    and 2 < bot["y0"] - top["y0"] < 10):
-                combined = top["text"] + bot["text"]
+            if (abs(top.x0 - bot.x0) < 8
+                    and 2 < bot.y0 - top.y0 < 10):
+                combined = top.text + bot.text
                 if combined in FRACTION_MAP:
-                    new_items.append({
-                        "text": FRACTION_MAP[combined],
-                        "x0": min(top["x0"], bot["x0"]),
-                        "y0": top["y0"],
-                        "x1": max(top["x1"], bot["x1"]),
-                        "y1": bot["y1"],
-                        "size": top["size"],
-                        "font": top["font"],
-                        "_fraction": True,
-                    })
-                    merged_ids.add(id(top))
-                    merged_ids.add(id(bot))
+                    new_items.append(Span(
+                        FRACTION_MAP[combined],
+                        min(top.x0, bot.x0), top.y0,
+                        max(top.x1, bot.x1), bot.y1,
+                        top.size, top.font, fraction=True,
+                    ))
+                    merged.add(top)
+                    merged.add(bot)
                     break
 
-    result = [i for i in items if id(i) not in merged_ids] + new_items
+    result = [i for i in items if i not in merged] + new_items
 
-    # Step 2: Resolve inline fraction patterns (e.g., "12" → "½") at any font size
-    for item in result:
-        if item["text"] in FRACTION_MAP and not item.get("_fraction"):
-            item["text"] = FRACTION_MAP[item["text"]]
-            item["_fraction"] = True
-
-    return result
+    # Step 2: Resolve inline fraction patterns (e.g., "12" → "½") at any font size.
+    # Resolved spans are copies, so the page's own spans stay untouched.
+    return [i.as_fraction(FRACTION_MAP[i.text])
+            if i.text in FRACTION_MAP and not i.fraction else i
+            for i in result]
 
 
-def find_category_row(items):
+def find_category_row(items, index=None):
     """Find CATEGORY header and column centers/boundaries for A, B, C, D."""
-    cat = [i for i in items if i["text"] == "CATEGORY"]
+    index = index or SpanIndex(items)
+    cat = index.with_text("CATEGORY")
     if not cat:
         return None, {}, {}
 
-    cat_y = cat[0]["y0"]
-    row = [i for i in items
-           if abs(i["y0"] - cat_y) < 8
-           and i["text"] in ("A", "B", "C", "D")]
+    cat_y = cat[0].y0
+    row = [i for i in index.same_row(cat_y, 8)
+           if i.text in ("A", "B", "C", "D")]
 
     centers = {}
     for item in row:
-        centers[item["text"]] = (item["x0"] + item["x1"]) / 2
+        centers[item.text] = (item.x0 + item.x1) / 2
 
     # Column boundaries (midpoints between adjacent columns)
     col_names = sorted(centers.keys())
@@ -110,7 +413,7 @@ def find_category_row(items):
 
 def assign_to_column(item, col_bounds):
     """Assign a single item to a column based on its x-center."""
-    x_center = (item["x0"] + item["x1"]) / 2
+    x_center = (item.x0 + item.x1) / 2
     for col, (left, right) in col_bounds.items():
         if left <= x_center <= right:
             return col
@@ -122,34 +425,38 @@ def merge_column_items(items):
     if not items:
         return ""
 
-    # Group items into y-rows (items within 8px are same visual row)
-    items_sorted = sorted(items, key=lambda i: i["y0"])
+    # Group items into y-rows (items within 8px are same visual row).
+    # Items arrive in y order, so row anchors are sorted and the first
+    # matching row is found by bisection instead of scanning every row.
+    items_sorted = sorted(items, key=lambda i: i.y0)
     rows = []
+    anchors = []
     for item in items_sorted:
         placed = False
-        for row in rows:
-            if abs(item["y0"] - row[0]["y0"]) < 8:
-                row.append(item)
+        for r in range(bisect.bisect_left(anchors, item.y0 - 8), len(rows)):
+            if abs(item.y0 - anchors[r]) < 8:
+                rows[r].append(item)
                 placed = True
                 break
         if not placed:
             rows.append([item])
+            anchors.append(item.y0)
 
-    rows.sort(key=lambda r: r[0]["y0"])
+    rows.sort(key=lambda r: r[0].y0)
 
     # Merge each row's items, then join rows with spaces
     parts = []
     for row in rows:
-        row.sort(key=lambda i: i["x0"])
+        row.sort(key=lambda i: i.x0)
         row_parts = []
         for idx, item in enumerate(row):
             if idx > 0:
                 prev = row[idx - 1]
-                gap = item["x0"] - prev["x1"]
-                if gap > 3 and not item.get("_fraction"):
+                gap = item.x0 - prev.x1
+                if gap > 3 and not item.fraction:
                     row_parts.append(" ")
                 # Fractions attach directly (no space)
-            row_parts.append(item["text"])
+            row_parts.append(item.text)
         if parts:
             parts.append(" ")
         parts.append("".join(row_parts))
@@ -157,34 +464,39 @@ def merge_column_items(items):
     return "".join(parts)
 
 
-def extract_minimums(items, page_width):
+def extract_minimums(items, page_width, index=None, tokens=None):
     """Extract the minimums table into structured data."""
-    cat_y, col_centers, col_bounds = find_category_row(items)
+    index = index or SpanIndex(items)
+    tokens = tokens if tokens is not None else Tokens(items)
+    with stage("find_category_row") as st:
+        cat_y, col_centers, col_bounds = find_category_row(items, index)
+        st.outcome = ("CATEGORY row not found" if cat_y is None
+                      else "no column headers" if not col_centers else "ok")
     if cat_y is None:
         return {"error": "CATEGORY row not found"}
 
     # Collect items in minimums area (below CATEGORY, above footer)
-    min_items = [i for i in items
-                 if i["y0"] > cat_y + 5
-                 and i["y0"] < cat_y + 88  # Stay above footer text
-                 and i["x0"] > 120]
+    min_items = index.rect(x_min=120, y_min=cat_y + 5,
+                           y_max=cat_y + 88)  # Stay above footer text
 
     # Pre-process: merge stacked fractions, resolve inline fractions
-    min_items = preprocess_minimums_items(min_items)
+    with stage("fraction_merge") as st:
+        st.spans = len(min_items)
+        min_items = preprocess_minimums_items(min_items, tokens)
+        st.outcome = "ok" if min_items else "empty minimums area"
 
     # Find procedure labels
-    proc_labels = []
-    for item in min_items:
-        if item["x0"] < 280 and re.match(r'S-ILS|S-LOC|SIDESTEP|CIRCLING', item["text"]):
-            proc_labels.append({"name": item["text"], "y": item["y0"]})
-    proc_labels.sort(key=lambda p: p["y"])
+    with stage("procedure_labels") as st:
+        proc_labels = []
+        for item in min_items:
+            if item.x0 < 280 and tokens.has(item, "procedure_label"):
+                proc_labels.append({"name": item.text, "y": item.y0})
+        proc_labels.sort(key=lambda p: p["y"])
+        st.spans = len(proc_labels)
+        st.outcome = "ok" if proc_labels else "no procedure labels"
 
     # Value items only (x >= 280, exclude left-side airport diagram labels)
-    value_items = [i for i in min_items if i["x0"] >= 280]
-
-    # Assign each value item to a column
-    for item in value_items:
-        item["_col"] = assign_to_column(item, col_bounds)
+    value_items = [i for i in min_items if i.x0 >= 280]
 
     # Associate each item with a procedure using smart y-range detection
     def find_procedure_for_y(y):
@@ -214,36 +526,45 @@ def extract_minimums(items, page_width):
     for proc in proc_labels:
         proc_col_items[proc["name"]] = {"A": [], "B": [], "C": [], "D": []}
 
-    for item in value_items:
-        col = item.get("_col")
-        if not col:
-            continue
-        proc_name = find_procedure_for_y(item["y0"])
-        if proc_name and proc_name in proc_col_items:
-            proc_col_items[proc_name][col].append(item)
+    with stage("column_assignment") as st:
+        unplaced = 0
+        for item in value_items:
+            col = assign_to_column(item, col_bounds)
+            if not col:
+                unplaced += 1
+                continue
+            proc_name = find_procedure_for_y(item.y0)
+            if proc_name and proc_name in proc_col_items:
+                proc_col_items[proc_name][col].append(item)
+            else:
+                unplaced += 1
+        st.spans = len(value_items)
+        st.outcome = "ok" if not unplaced else "unplaced spans"
 
     # Merge items within each column and parse
-    result = {}
-    for proc_name, cols in proc_col_items.items():
-        col_texts = {}
-        for col, col_items in cols.items():
-            text = merge_column_items(col_items)
-            if text.strip():
-                col_texts[col] = text.strip()
-
-        # Post-process: combine complementary columns
-        # When a value spans two adjacent columns (one has altitude, other has HAT),
-        # combine them and assign to both columns.
-        col_texts = combine_complementary_columns(col_texts)
-
-        # Parse each column's text
-        proc_result = {}
-        for col, text in col_texts.items():
-            if text:
-                proc_result[col] = parse_min_value(text)
-
-        if proc_result:
-            result[proc_name] = proc_result
+    with stage("combine_columns") as st:
+        result = {}
+        for proc_name, cols in proc_col_items.items():
+            col_texts = {}
+            for col, col_items in cols.items():
+                text = merge_column_items(col_items)
+                if text.strip():
+                    col_texts[col] = text.strip()
+
+            # Post-process: combine complementary columns
+            # When a value spans two adjacent columns (one has altitude, other has HAT),
+            # combine them and assign to both columns.
+            col_texts = combine_complementary_columns(col_texts)
+
+            # Parse each column's text
+            proc_result = {}
+            for col, text in col_texts.items():
+                if text:
+                    proc_result[col] = parse_min_value(text)
+
+            if proc_result:
+                result[proc_name] = proc_result
+        st.outcome = "ok" if result else "no values"
 
     return result
 
@@ -331,30 +652,28 @@ def parse_min_value(text):
     return result
 
 
-def extract_comms(items):
+def extract_comms(items, index=None, tokens=None):
     """Extract communications frequencies from the briefing strip."""
+    index = index or SpanIndex(items)
+    tokens = tokens if tokens is not None else Tokens(items)
     comms = []
-    comm_row = [i for i in items if 125 < i["y0"] < 160]
-    comm_row.sort(key=lambda i: i["x0"])
+    comm_row = [t for t in tokens.of_kind("comm_label") if 125 < t.span.y0 < 160]
+    comm_row.sort(key=lambda t: t.span.x0)
 
-    labels = ["ATIS", "DENVER APP CON", "CENTENNIAL TOWER", "GND CON", "CLNC DEL"]
-
-    for label in labels:
+    for label in COMM_LABELS:
         label_item = None
-        for item in comm_row:
-            if label in item["text"]:
-                label_item = item
+        for token in comm_row:
+            if label in token.value:
+                label_item = token.span
                 break
         if not label_item:
             continue
 
-        freqs = [i for i in items
-                 if i["y0"] > label_item["y1"] - 2
-                 and i["y0"] < label_item["y1"] + 16
-                 and abs(i["x0"] - label_item["x0"]) < 40
-                 and re.match(r'\d{2,3}\.\d', i["text"])]
-
-        freq_list = [f["text"].strip() for f in freqs]
+        nearby = index.rect(label_item.x0 - 40, label_item.y1 - 2,
+                            label_item.x0 + 40, label_item.y1 + 16)
+        freq_list = [tokens.value(i, "frequency") for i in nearby
+                     if abs(i.x0 - label_item.x0) < 40
+                     and tokens.has(i, "frequency")]
         comms.append({
             "name": label.replace("DENVER APP CON", "Denver Approach")
                          .replace("CENTENNIAL TOWER", "Centennial Tower")
@@ -366,122 +685,114 @@ def extract_comms(items):
     return comms
 
 
-def extract_approach_info(items):
+def extract_approach_info(items, index=None, tokens=None):
     """Extract localizer, course, GS, TCH, TDZE, elevation from briefing strip."""
+    index = index or SpanIndex(items)
+    tokens = tokens if tokens is not None else Tokens(items)
     info = {}
-    header = [i for i in items if i["y0"] < 130]
 
-    for item in header:
-        if re.match(r'^1\d{2}\.\d$', item["text"]):
-            freq = float(item["text"])
-            if 108.0 <= freq <= 112.0:
-                info["localizer_frequency"] = freq
-                break
+    def first(kind, in_header=False):
+        for token in tokens.of_kind(kind):
+            if not in_header or token.span.y0 < 130:
+                return token
+        return None
 
-    for item in items:
-        m = re.match(r'^I-[A-Z]{3}$', item["text"])
-        if m:
-            info["localizer_id"] = m.group(0)
+    for token in tokens.of_kind("nav_frequency"):
+        if token.span.y0 < 130 and 108.0 <= token.value <= 112.0:
+            info["localizer_frequency"] = token.value
             break
 
-    for item in header:
-        m = re.match(r'^Chan\s*(\d+)$', item["text"])
-        if m:
-            info["channel"] = int(m.group(1))
-
-    for item in header:
-        if item["text"] == "APP CRS":
-            course_items = [i for i in header
-                            if abs(i["x0"] - item["x0"]) < 40
-                            and i["y0"] > item["y1"] - 5
-                            and re.match(r'\d{3}°?$', i["text"])]
-            if course_items:
-                info["course"] = int(course_items[0]["text"].replace("°", ""))
-                break
+    localizer = first("localizer_id")
+    if localizer:
+        info["localizer_id"] = localizer.value
 
-    for item in items:
-        m = re.search(r'GS\s*(\d+\.\d+)°?', item["text"])
-        if m:
-            info["glide_slope_angle"] = float(m.group(1))
-            break
+    for token in tokens.of_kind("channel"):
+        if token.span.y0 < 130:
+            info["channel"] = token.value
 
-    for item in items:
-        m = re.search(r'TCH\s*(\d+)', item["text"])
-        if m:
-            info["tch"] = int(m.group(1))
+    for item in index.with_text("APP CRS"):
+        if item.y0 >= 130:
+            continue
+        nearby = index.rect(item.x0 - 40, item.y1 - 5, item.x0 + 40, 130)
+        course_items = [i for i in nearby
+                        if abs(i.x0 - item.x0) < 40
+                        and tokens.has(i, "course")]
+        if course_items:
+            info["course"] = tokens.value(course_items[0], "course")
             break
 
-    for item in header:
-        m = re.search(r'Apt\s*Elev\s*(\d+)', item["text"])
-        if m:
-            info["airport_elevation"] = int(m.group(1))
-            break
+    glide_slope = first("glide_slope")
+    if glide_slope:
+        info["glide_slope_angle"] = glide_slope.value
+
+    tch = first("tch")
+    if tch:
+        info["tch"] = tch.value
+
+    elevation = first("airport_elevation", in_header=True)
+    if elevation:
+        info["airport_elevation"] = elevation.value
     if "airport_elevation" not in info:
-        for item in items:
-            if item["text"].startswith("ELEV"):
-                nearby = [i for i in items
-                          if abs(i["y0"] - item["y0"]) < 5
-                          and i["x0"] > item["x1"]
-                          and re.match(r'^\d{4,5}$', i["text"])]
-                if nearby:
-                    info["airport_elevation"] = int(nearby[0]["text"])
-                    break
+        for token in tokens.of_kind("elev_label"):
+            item = token.span
+            nearby = [i for i in index.same_row(item.y0, 5)
+                      if i.x0 > item.x1
+                      and tokens.has(i, "altitude")]
+            if nearby:
+                info["airport_elevation"] = tokens.value(nearby[0], "altitude")
+                break
 
-    tdze_list = []
-    for item in items:
-        m = re.search(r'TDZE\s+(\d+\w*)\s+(\d{4,5})', item["text"])
-        if m:
-            tdze_list.append({"runway": m.group(1), "elevation": int(m.group(2))})
+    tdze_list = [token.value for token in tokens.of_kind("tdze")]
     if tdze_list:
         info["tdze"] = tdze_list
 
     return info
 
 
-def extract_missed_approach(items):
+def extract_missed_approach(items, index=None, tokens=None):
     """Extract missed approach text."""
-    ma_label = [i for i in items if "MISSED APPROACH" in i["text"]]
+    index = index or SpanIndex(items)
+    tokens = tokens if tokens is not None else Tokens(items)
+    ma_label = tokens.of_kind("missed_approach_label")
     if not ma_label:
         return None
 
-    label = ma_label[0]
-    ma_items = [i for i in items
-                if i["y0"] >= label["y0"] - 2
-                and i["y0"] <= label["y0"] + 35
-                and i["x0"] >= label["x0"] - 5
-                and i["x0"] < 560]
+    label = ma_label[0].span
+    ma_items = [i for i in index.rect(label.x0 - 5, label.y0 - 2, 560, label.y0 + 35,
+                                      inclusive=True)
+                if i.x0 < 560]
 
     ma_items = [i for i in ma_items
-                if not re.match(r'^[A-Z]\d$', i["text"])
-                and i["text"] not in ("Rwy 35R", "MALSR")]
+                if not tokens.has(i, "short_code")
+                and i.text not in ("Rwy 35R", "MALSR")]
 
-    ma_items.sort(key=lambda i: (round(i["y0"] / 5) * 5, i["x0"]))
+    ma_items.sort(key=lambda i: (round(i.y0 / 5) * 5, i.x0))
 
-    text = " ".join(i["text"] for i in ma_items)
+    text = " ".join(i.text for i in ma_items)
     text = re.sub(r'\s+', ' ', text).strip()
     text = text.replace("MISSED APPROACH:", "").strip()
     return text
 
 
-def extract_notes(items):
+def extract_notes(items, index=None, tokens=None):
     """Extract notes/cautions from the plate."""
+    index = index or SpanIndex(items)
+    tokens = tokens if tokens is not None else Tokens(items)
     notes = []
-    note_items = [i for i in items
-                  if 85 < i["y0"] < 130
-                  and i["x0"] < 350
-                  and not re.match(r'^(ATIS|DENVER|CENTENNIAL|GND|CLNC|MISSED)', i["text"])
-                  and not re.match(r'^\d{2,3}\.\d', i["text"])]
-    note_items.sort(key=lambda i: (round(i["y0"] / 6) * 6, i["x0"]))
+    note_items = [i for i in index.rect(x_max=350, y_min=85, y_max=130)
+                  if not tokens.has(i, "section_label")
+                  and not tokens.has(i, "frequency")]
+    note_items.sort(key=lambda i: (round(i.y0 / 6) * 6, i.x0))
 
     lines = {}
     for item in note_items:
-        y_key = round(item["y0"] / 6) * 6
+        y_key = round(item.y0 / 6) * 6
         if y_key not in lines:
             lines[y_key] = []
         lines[y_key].append(item)
 
     for y_key in sorted(lines.keys()):
-        text = " ".join(i["text"] for i in sorted(lines[y_key], key=lambda i: i["x0"]))
+        text = " ".join(i.text for i in sorted(lines[y_key], key=lambda i: i.x0))
         text = re.sub(r'\s+', ' ', text).strip()
         if text and len(text) > 5:
             notes.append(text)
@@ -489,68 +800,194 @@ def extract_notes(items):
     return notes
 
 
-def extract_airport_info(items):
+def extract_airport_info(items, index=None, tokens=None):
     """Extract airport identifier, name, city/state."""
+    index = index or SpanIndex(items)
+    tokens = tokens if tokens is not None else Tokens(items)
     info = {}
+    footer = index.rect(y_min=700)
 
     for item in items:
-        if "CENTENNIAL" in item["text"] and "(APA)" in item["text"]:
+        if "CENTENNIAL" in item.text and "(APA)" in item.text:
             info["name"] = "CENTENNIAL"
             info["faa_id"] = "APA"
             break
 
     if "name" not in info:
-        for item in items:
-            if item["text"] == "CENTENNIAL" and item["y0"] > 700:
+        for item in footer:
+            if item.text == "CENTENNIAL":
                 info["name"] = "CENTENNIAL"
-            if "(APA)" in item["text"] and item["y0"] > 700:
+            if "(APA)" in item.text:
                 info["faa_id"] = "APA"
 
     if "faa_id" not in info:
-        for item in items:
-            m = re.search(r'\(([A-Z]{3,4})\)', item["text"])
-            if m and item["y0"] > 700:
-                info["faa_id"] = m.group(1)
+        for token in tokens.of_kind("identifier"):
+            if token.span.y0 > 700:
+                info["faa_id"] = token.value
 
-    for item in items:
-        m = re.match(r'^(K[A-Z]{3})$', item["text"])
-        if m:
-            info["icao"] = m.group(1)
+    for token in tokens.of_kind("icao"):
+        info["icao"] = token.value
 
-    for item in items:
-        if item["y0"] > 700:
-            m = re.match(r'^([A-Z]+),\s*([A-Z]+)$', item["text"])
-            if m:
-                info["city"] = m.group(1)
-                info["state"] = m.group(2)
+    for token in tokens.of_kind("city_state"):
+        if token.span.y0 > 700:
+            info["city"], info["state"] = token.value
 
     return info
 
 
-def extract_plate(pdf_path):
-    """Main extraction — parse FAA approach plate PDF into structured JSON."""
-    doc = fitz.open(pdf_path)
-    page = doc[0]
-    items = extract_text_items(page)
+def extract_procedure_name(items):
+    """Procedure title, e.g. "ILS or LOC RWY 35R"."""
+    title = [i for i in items if "ILS or LOC" in i.text and i.size > 12]
+    return title[0].text if title else None
+
+
+# Region of the page each section reads, as (x0, y0, x1, y1) in points; a
+# None edge is the page edge, a None region the whole page. Approach info
+# takes GS/TCH from the profile view and the localizer ident from the plan
+# view, so it cannot be clipped. Key order is the output key order.
+SECTION_CLIPS = {
+    "procedure_name": (None, None, None, 140),
+    "airport": (None, 690, None, None),
+    "approach": None,
+    "communications": (None, 110, None, 200),
+    "missed_approach": (None, None, None, 200),
+    "notes": (None, 80, None, 140),
+    "minimums": (None, 396, None, None),
+}
 
-    result = {"source": pdf_path}
+SECTION_EXTRACTORS = {
+    "procedure_name": lambda page, items, index, tokens: extract_procedure_name(items),
+    "airport": lambda page, items, index, tokens: extract_airport_info(items, index, tokens),
+    "approach": lambda page, items, index, tokens: extract_approach_info(items, index, tokens),
+    "communications": lambda page, items, index, tokens: extract_comms(items, index, tokens),
+    "missed_approach": lambda page, items, index, tokens: extract_missed_approach(items, index, tokens),
+    "notes": lambda page, items, index, tokens: extract_notes(items, index, tokens),
+    "minimums": lambda page, items, index, tokens: extract_minimums(items, page.rect.width, index, tokens),
+}
 
-    title = [i for i in items if "ILS or LOC" in i["text"] and i["size"] > 12]
-    if title:
-        result["procedure_name"] = title[0]["text"]
 
-    result["airport"] = extract_airport_info(items)
-    result["approach"] = extract_approach_info(items)
-    result["communications"] = extract_comms(items)
-    result["missed_approach"] = extract_missed_approach(items)
-    result["notes"] = extract_notes(items)
-    result["minimums"] = extract_minimums(items, page.rect.width)
+def section_outcome(value):
+    """Outcome code of a section result: its error, "empty" or "ok"."""
+    if isinstance(value, dict) and "error" in value:
+        return value["error"]
+    return "ok" if value else "empty"
 
-    doc.close()
-    return result
+
+class Plate:
+    """A plate page whose sections are extracted lazily.
+
+    The first access to a section parses only that section's clip region
+    (SECTION_CLIPS) and caches both the parse and the result, so a caller
+    that only wants the minimums never lays out the plan or profile view.
+    Once the whole page has been parsed, later sections reuse that parse.
+    """
+
+    def __init__(self, page, source=None):
+        self.page = page
+        self.source = source
+        self._text = {}
+        self._sections = {}
+
+    def text(self, clip=None):
+        """(items, index, tokens) for a clip region, parsed on first use."""
+        if None in self._text:
+            return self._text[None]
+        if clip not in self._text:
+            rect = None
+            if clip is not None:
+                page_rect = self.page.rect
+                x0, y0, x1, y1 = clip
+                rect = fitz.Rect(page_rect.x0 if x0 is None else x0,
+                                 page_rect.y0 if y0 is None else y0,
+                                 page_rect.x1 if x1 is None else x1,
+                                 page_rect.y1 if y1 is None else y1)
+            with stage("text_items") as st:
+                items = extract_text_items(self.page, rect)
+                st.spans = len(items)
+                st.outcome = "full page" if clip is None else "clipped"
+            with stage("index_tokens") as st:
+                self._text[clip] = (items, SpanIndex(items), Tokens(items))
+                st.spans = len(items)
+        return self._text[clip]
+
+    def section(self, name):
+        if name not in self._sections:
+            items, index, tokens = self.text(SECTION_CLIPS[name])
+            with stage(name) as st:
+                value = SECTION_EXTRACTORS[name](self.page, items, index, tokens)
+                st.outcome = section_outcome(value)
+            self._sections[name] = value
+        return self._sections[name]
+
+    @property
+    def procedure_name(self):
+        return self.section("procedure_name")
+
+    @property
+    def airport(self):
+        return self.section("airport")
+
+    @property
+    def approach(self):
+        return self.section("approach")
+
+    @property
+    def communications(self):
+        return self.section("communications")
+
+    @property
+    def missed_approach(self):
+        return self.section("missed_approach")
+
+    @property
+    def notes(self):
+        return self.section("notes")
+
+    @property
+    def minimums(self):
+        return self.section("minimums")
+
+    def to_dict(self, sections=None):
+        """Result dict for the given sections (default: all, from one full parse)."""
+        if sections is None:
+            self.text()
+            sections = SECTION_CLIPS
+        result = {"source": self.source}
+        for name in sections:
+            value = self.section(name)
+            if name == "procedure_name" and value is None:
+                continue
+            result[name] = value
+        return result
+
+
+def extract_plate(pdf_path, sections=None):
+    """Main extraction — parse FAA approach plate PDF into structured JSON.
+
+    With a list of section names only those sections are extracted, each
+    from its own clipped region of the page.
+    """
+    with fitz.open(pdf_path) as doc:
+        return Plate(doc[0], pdf_path).to_dict(sections)
+
+
+def extract_plate_bytes(data, source=None, sections=None):
+    """Extract a plate from an in-memory PDF instead of a file.
+
+    data is bytes, bytearray, a memoryview or a binary stream; PyMuPDF
+    opens the buffer in place, so nothing is written to disk. source is
+    reported as the result's "source".
+    """
+    if hasattr(data, "read") and not isinstance(data, io.BytesIO):
+        data = data.read()
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return Plate(doc[0], source).to_dict(sections)
 
 
 if __name__ == "__main__":
     pdf_path = sys.argv[1] if len(sys.argv) > 1 else "apa-ils35-faa.pdf"
-    result = extract_plate(pdf_path)
+    if pdf_path == "-":
+        result = extract_plate_bytes(sys.stdin.buffer.read(), "-", sys.argv[2:] or None)
+    else:
+        result = extract_plate(pdf_path, sys.argv[2:] or None)
     print(json.dumps(result, indent=2, ensure_ascii=False))
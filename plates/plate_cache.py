@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache of plate extraction results.
+
+Results are keyed on SHA-256 of the PDF bytes plus EXTRACTOR_VERSION, so a
+plate that is unchanged from one d-TPP cycle to the next (whatever its path
+or cycle directory) is extracted once. Bumping EXTRACTOR_VERSION invalidates
+every entry. Entries are JSON files sharded by key prefix; when the cache
+grows past its size limit the least recently used entries are evicted.
+
+Usage:
+  python plate_cache.py /var/cache/plates --max-mb 512   # report and evict
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+from extract_plate import EXTRACTOR_VERSION, extract_plate_bytes
+
+
+def content_key(pdf_bytes, version=EXTRACTOR_VERSION):
+    """Cache key for a plate: hash of its bytes and the extractor version."""
+    h = hashlib.sha256()
+    h.update(version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(pdf_bytes)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """Directory of cached results with size-based LRU eviction."""
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Cached result for key, or None. A hit refreshes the entry's age."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store a result atomically (safe with several writer processes)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def entries(self):
+        """(mtime, size, path) of every cache entry."""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def evict(self):
+        """Delete least recently used entries until under max_bytes.
+
+        Returns (entries_removed, bytes_removed).
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def cached_extract(pdf_path, cache, data=None, extract=extract_plate_bytes,
+                   version=EXTRACTOR_VERSION, key=None):
+    """Extract a plate unless the cache holds a result for its bytes.
+
+    The PDF is read once (or taken from data): the same buffer is hashed
+    and, on a miss, handed to extract(data, pdf_path). The stored result is
+    path-independent; "source" is set to the plate being asked for. A
+    different extract function needs its own version so results never mix.
+    key, when the caller already hashed data, must be content_key(data, version).
+    Returns (result, hit).
+    """
+    if data is None:
+        with open(pdf_path, "rb") as f:
+            data = f.read()
+    key = key or content_key(data, version)
+    result = cache.get(key)
+    hit = result is not None
+    if not hit:
+        result = extract(data, pdf_path)
+        cache.put(key, result)
+    result = dict(result, source=pdf_path)
+    return result, hit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and trim the plate extraction cache")
+    parser.add_argument("directory", help="Cache directory")
+    parser.add_argument("--max-mb", type=float, default=512, help="Size limit in MB")
+    args = parser.parse_args()
+
+    cache = ExtractionCache(args.directory, int(args.max_mb * 1024 * 1024))
+    entries = cache.entries()
+    removed, freed = cache.evict()
+    print(json.dumps({
+        "entries": len(entries) - removed,
+        "bytes": sum(size for _, size, _ in entries) - freed,
+        "evicted": removed,
+        "evicted_bytes": freed,
+        "extractor_version": EXTRACTOR_VERSION,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Change feed of plate content between two d-TPP cycles.
+
+Compares the previous cycle's batch_extract results with the current
+one's, plate by plate (matched on the PDF file name, which d-TPP keeps
+across cycles). A plate whose "content_key" is the same in both cycles
+has the same bytes and extractor version, so it is skipped with one
+comparison; batch_extract keys routed and unrouted runs alike. Only
+plates whose key changed are compared field by field:
+
+  minimums.<procedure>.<category>.<field>   parse_min_value fields
+                                            (raw text when none parsed)
+  approach.<field>, airport.<field>, procedure_name
+  communications.<facility>                 frequencies, as a list
+  missed_approach, notes                    text, whitespace-normalized
+
+The feed is NDJSON, one line per added, removed or changed plate:
+
+  {"plate": "00057IL35R.PDF", "airport": "APA", "procedure": "ILS or LOC RWY 35R",
+   "status": "changed",
+   "changes": [{"field": "minimums.S-ILS 35R.C.altitude", "old": 6085, "new": 6105}]}
+
+A plate whose bytes changed but whose extracted fields did not (a
+reissue, a new amendment date) is counted, not emitted. So is a plate
+with an error or skip record (failed extraction, chart not routed) on
+either side: its content is unknown, so it is neither changed nor
+removed. Only a plate with a result last cycle and no record in the
+current results is removed.
+
+Usage:
+  python plate_changes.py results-2601.ndjson results-2602.ndjson --out changes-2602.ndjson
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+from plate_inputs import input_name
+
+# parse_min_value fields compared per procedure and category
+MIN_FIELDS = ("altitude", "visibility", "hat", "hat_ref", "hat_visibility")
+
+_FREQUENCY = re.compile(r"\d{3}\.\d{1,3}")
+
+
+def unknown(result):
+    """Whether a record is an error or skip record rather than an extraction."""
+    return "error" in result or "skipped" in result
+
+
+def load_results(path):
+    """Records of one cycle by plate file name.
+
+    Error and skip records are kept, so a plate that failed is not taken
+    for removed; a later record replaces an earlier one (a resumed or
+    retried batch) unless it would replace a result with an error.
+    """
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            name = input_name(result.get("source") or "")
+            if unknown(result) and name in results and not unknown(results[name]):
+                continue
+            results[name] = result
+    return results
+
+
+def _text(value):
+    return " ".join(value.split()) if isinstance(value, str) else value
+
+
+def _minimum(values):
+    """Comparable form of one procedure/category minimums cell."""
+    if not isinstance(values, dict):
+        return {}
+    parsed = {k: values[k] for k in MIN_FIELDS if values.get(k) is not None}
+    if not parsed and values.get("raw"):
+        parsed["raw"] = _text(values["raw"])
+    return parsed
+
+
+def _frequencies(comm):
+    freqs = comm.get("frequency") or []
+    texts = [freqs] if isinstance(freqs, str) else freqs
+    return [freq for text in texts for freq in _FREQUENCY.findall(text)]
+
+
+def _diff_fields(changes, prefix, old, new):
+    """Append a change per key of two flat dicts whose values differ."""
+    old = old if isinstance(old, dict) else {}
+    new = new if isinstance(new, dict) else {}
+    for key in sorted(old.keys() | new.keys()):
+        if old.get(key) != new.get(key):
+            changes.append({"field": f"{prefix}.{key}", "old": old.get(key), "new": new.get(key)})
+
+
+def diff_plate(old, new):
+    """Field-level changes between two extraction results of one plate."""
+    changes = []
+    if old.get("procedure_name") != new.get("procedure_name"):
+        changes.append({"field": "procedure_name",
+                        "old": old.get("procedure_name"), "new": new.get("procedure_name")})
+    _diff_fields(changes, "airport", old.get("airport"), new.get("airport"))
+    _diff_fields(changes, "approach", old.get("approach"), new.get("approach"))
+
+    _diff_fields(changes, "communications",
+                 {c.get("name"): _frequencies(c) for c in old.get("communications") or []},
+                 {c.get("name"): _frequencies(c) for c in new.get("communications") or []})
+
+    for field in ("missed_approach", "notes"):
+        before, after = old.get(field), new.get(field)
+        if isinstance(before, list):
+            before = [_text(v) for v in before]
+        if isinstance(after, list):
+            after = [_text(v) for v in after]
+        if _text(before) != _text(after):
+            changes.append({"field": field, "old": old.get(field), "new": new.get(field)})
+
+    old_min = old.get("minimums") or {}
+    new_min = new.get("minimums") or {}
+    for label in sorted(old_min.keys() | new_min.keys()):
+        before, after = old_min.get(label), new_min.get(label)
+        # An extraction failure ({"error": ...}) compares as its message
+        if not isinstance(before, dict) or not isinstance(after, dict) \
+                or "error" in before or "error" in after:
+            if before != after:
+                changes.append({"field": f"minimums.{label}", "old": before, "new": after})
+            continue
+        for category in sorted(before.keys() | after.keys()):
+            _diff_fields(changes, f"minimums.{label}.{category}",
+                         _minimum(before.get(category)), _minimum(after.get(category)))
+    return changes
+
+
+def _event(name, result, status, changes=None):
+    event = {
+        "plate": name,
+        "airport": (result.get("airport") or {}).get("faa_id"),
+        "procedure": result.get("procedure_name"),
+        "status": status,
+    }
+    if changes is not None:
+        event["changes"] = changes
+    return event
+
+
+def change_feed(previous, current):
+    """Feed events and statistics for two cycles' results (dicts by plate name)."""
+    stats = {"plates": len(current), "unchanged": 0, "reissued": 0,
+             "changed": 0, "added": 0, "removed": 0, "unknown": 0}
+    events = []
+    for name in sorted(current):
+        new = current[name]
+        old = previous.get(name)
+        if old is None:
+            if unknown(new):
+                stats["unknown"] += 1
+            else:
+                stats["added"] += 1
+                events.append(_event(name, new, "added"))
+            continue
+        key = new.get("content_key")
+        if key is not None and key == old.get("content_key") and unknown(old) == unknown(new):
+            stats["unchanged"] += 1
+            continue
+        if unknown(old) or unknown(new):
+            stats["unknown"] += 1
+            continue
+        changes = diff_plate(old, new)
+        if not changes:
+            stats["reissued"] += 1
+            continue
+        stats["changed"] += 1
+        events.append(_event(name, new, "changed", changes))
+    for name in sorted(previous.keys() - current.keys()):
+        if unknown(previous[name]):
+            stats["unknown"] += 1
+            continue
+        stats["removed"] += 1
+        events.append(_event(name, previous[name], "removed"))
+    return events, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two cycles' plate extractions")
+    parser.add_argument("previous", help="Previous cycle's NDJSON results")
+    parser.add_argument("current", help="Current cycle's NDJSON results")
+    parser.add_argument("--out", help="Change feed NDJSON (default stdout)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    events, stats = change_feed(load_results(args.previous), load_results(args.current))
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for event in events:
+            out.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
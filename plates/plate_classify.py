@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Cheap chart-type and publisher fingerprinting for d-TPP pages.
+
+extract_plate assumes an FAA instrument approach and only finds out
+otherwise after a full-page parse. classify_page() decides in tiers and
+stops as soon as the route is settled:
+
+  1. fonts in the page resources (Jeppesen charts embed their own faces),
+     the d-TPP chart code of the file and the document's metadata title,
+     about 1 ms with no text layout;
+  2. only if the chart could still be routed to an extractor: the title
+     and publisher marks in the header and footer bands of the page text.
+
+The chart code comes from the cycle's d-TPP metafile (the chart_code the
+API stores on each Procedure; load_chart_codes) or, without one, from the
+file-name forms d-TPP uses for airport diagrams and minimums pages
+(chart_code_of). Every FAA chart in a d-TPP cycle therefore settles in
+tier 1, and only approaches are laid out.
+
+PyMuPDF interprets the whole content stream even for a clipped text
+request, so tier 2 costs a full parse; it goes through Plate.text(), and
+an extraction of the same Plate reuses that parse instead of repeating it.
+Charts skipped in tier 1 are never laid out.
+
+Classification:
+  {"publisher": "faa" | "jeppesen" | "unknown",
+   "chart_type": "iap" | "apd" | "dp" | "star" | "min" | "hot" | "unknown",
+   "approach": "ILS" | "RNAV" | ... | None,   # first approach type in the title
+   "title": "ILS or LOC RWY 35R" | None,
+   "extractor": "faa_approach" | None}
+
+Usage:
+  python plate_classify.py apa-ils35-faa.pdf apa-ils35-jep.pdf
+  python plate_classify.py /data/dtpp/2602      # one line per plate
+  python plate_classify.py /data/dtpp/2602 --metafile /data/dtpp/2602/d-TPP_Metafile.xml
+"""
+
+import argparse
+import json
+import re
+import xml.etree.ElementTree as ET
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24.3 only ships the fitz name
+    import fitz
+
+from extract_plate import Plate, stage
+from plate_inputs import input_name, iter_inputs, read_input
+
+# Header and footer bands searched for the title, as fractions of page height
+HEADER_FRACTION = 0.08
+FOOTER_FRACTION = 0.08
+
+_NUMBER = r"(?:ONE|TWO|THREE|FOUR|FIVE|SIX|SEVEN|EIGHT|NINE|TEN|\d+)"
+
+# Checked in order against the title text; the first match wins
+CHART_TYPES = [
+    ("apd", re.compile(r"\bAIRPORT\s+DIAGRAM\b", re.IGNORECASE)),
+    ("hot", re.compile(r"\bHOT\s+SPOTS?\b", re.IGNORECASE)),
+    ("min", re.compile(r"\b(?:TAKE-?OFF|ALTERNATE)\s+MINIMUMS\b", re.IGNORECASE)),
+    ("star", re.compile(rf"\b{_NUMBER}\s+ARRIVAL\b", re.IGNORECASE)),
+    ("dp", re.compile(rf"\b{_NUMBER}\s+DEPARTURE\b|\(OBSTACLE\)", re.IGNORECASE)),
+    ("iap", re.compile(r"\b(ILS|LOC|LDA|SDF|RNAV|GPS|GLS|VOR|NDB|TACAN|COPTER)\b[^\n]*?"
+                       r"(?:\bRWY\s*\d|-[A-Z]\b)", re.IGNORECASE)),
+]
+
+# d-TPP chart_code -> chart type; codes not listed (LAH, DAU, ...) are "unknown"
+CHART_CODES = {
+    "IAP": "iap", "APD": "apd", "DP": "dp", "ODP": "dp", "STAR": "star",
+    "MIN": "min", "HOT": "hot",
+}
+
+# d-TPP file names that give the chart code away: 00375AD.PDF, NE1TO.PDF, NE1ALT.PDF
+FILE_CODES = [
+    (re.compile(r"^\d{5}AD\.PDF$", re.IGNORECASE), "APD"),
+    (re.compile(r"^[A-Z]{2}\d+(?:TO|ALT)\.PDF$", re.IGNORECASE), "MIN"),
+]
+
+_JEPPESEN = re.compile(r"\bJEPPESEN\b", re.IGNORECASE)
+# FAA charts: "(FAA)" in the header, amendment line and ddMMMyy dates in the footer
+_FAA = re.compile(r"\(FAA\)|\b(?:Amdt\s+\d+[A-Z]?|Orig(?:-[A-Z])?)\s+\d{2}[A-Z]{3}\d{2}\b")
+
+# (publisher, chart_type) -> extractor name; charts with no route are skipped
+ROUTES = {
+    ("faa", "iap"): "faa_approach",
+}
+
+# Extractor name -> function of the page's Plate
+EXTRACTORS = {
+    "faa_approach": lambda plate: plate.to_dict(),
+}
+
+
+def _routable(publisher, chart_type):
+    """Whether some route could still apply; None means not yet known."""
+    return any(publisher in (None, p) and chart_type in (None, c) for p, c in ROUTES)
+
+
+def _chart_type(text):
+    """(chart_type, approach, title line) of the first chart title in text."""
+    for kind, pattern in CHART_TYPES:
+        m = pattern.search(text)
+        if m:
+            title = text[text.rfind("\n", 0, m.start()) + 1:].split("\n", 1)[0].strip()
+            return kind, m.group(1).upper() if kind == "iap" else None, title
+    return None, None, None
+
+
+def load_chart_codes(metafile):
+    """{pdf_name (upper case): (chart_code, chart_name)} from a d-TPP metafile."""
+    codes = {}
+    for _, elem in ET.iterparse(metafile):
+        if elem.tag != "record":
+            continue
+        pdf_name = (elem.findtext("pdf_name") or "").strip().upper()
+        if pdf_name and pdf_name != "DELETED":
+            codes[pdf_name] = ((elem.findtext("chart_code") or "").strip(),
+                               (elem.findtext("chart_name") or "").strip())
+        elem.clear()
+    return codes
+
+
+def chart_code_of(name, chart_codes=None):
+    """(chart_code, chart_name) of a plate input path, or (None, None)."""
+    name = input_name(name or "").upper()
+    if chart_codes and name in chart_codes:
+        return chart_codes[name]
+    for pattern, code in FILE_CODES:
+        if pattern.match(name):
+            return code, None
+    return None, None
+
+
+def classify_page(doc, page, plate=None, chart_code=None, chart_name=None):
+    """Classify one page; see the module docstring.
+
+    Pass the Plate that will be extracted so a text parse done here is
+    shared with the extraction, and the file's d-TPP chart code (and
+    name) when known, so FAA charts are classified without a text parse.
+    """
+    fonts = " ".join(font[3] for font in page.get_fonts())
+    publisher = "jeppesen" if "Jeppesen" in fonts else None
+    if publisher is None and chart_code:
+        # d-TPP lists FAA charts only
+        publisher = "faa"
+        chart_type = CHART_CODES.get(chart_code.upper(), "unknown")
+        _, approach, title = _chart_type(chart_name or "")
+        title = title or chart_name
+    else:
+        # d-TPP metadata titles are often only the file name; then this finds nothing
+        chart_type, approach, title = _chart_type((doc.metadata or {}).get("title") or "")
+
+    if _routable(publisher, chart_type) and (publisher is None or chart_type is None):
+        plate = plate or Plate(page)
+        items = plate.text()[0]
+        rect = page.rect
+        header_y = rect.y0 + rect.height * HEADER_FRACTION
+        footer_y = rect.y1 - rect.height * FOOTER_FRACTION
+        bands = sorted((s for s in items if (s.y0 + s.y1) / 2 <= header_y
+                        or (s.y0 + s.y1) / 2 >= footer_y), key=lambda s: (s.y0, s.x0))
+        text = "\n".join(s.text for s in bands)
+        if publisher is None:
+            if _JEPPESEN.search(text):
+                publisher = "jeppesen"
+            elif _FAA.search(text):
+                publisher = "faa"
+        band_type, band_approach, band_title = _chart_type(text)
+        if band_type is not None:
+            chart_type, approach, title = band_type, band_approach, band_title
+
+    publisher = publisher or "unknown"
+    chart_type = chart_type or "unknown"
+    return {
+        "publisher": publisher,
+        "chart_type": chart_type,
+        "approach": approach,
+        "title": title or None,
+        "extractor": ROUTES.get((publisher, chart_type)),
+    }
+
+
+def classify_bytes(data, source=None, chart_codes=None):
+    """Classification of page 1 of an in-memory PDF."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return classify_page(doc, doc[0], None, *chart_code_of(source, chart_codes))
+
+
+def classify_pdf(pdf_path, chart_codes=None):
+    """Classification of page 1 of a PDF file."""
+    with fitz.open(pdf_path) as doc:
+        return classify_page(doc, doc[0], None, *chart_code_of(pdf_path, chart_codes))
+
+
+def extract_routed(data, source=None, chart_codes=None):
+    """Classify page 1 of an in-memory PDF and run its extractor.
+
+    Returns the extractor's result, or {"source", "skipped": classification}
+    for a chart no extractor handles. The two share one open and one parse.
+    chart_codes is load_chart_codes() of the cycle's metafile, if any.
+    """
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page = doc[0]
+        plate = Plate(page, source)
+        with stage("classify") as st:
+            chart = classify_page(doc, page, plate, *chart_code_of(source, chart_codes))
+            st.outcome = chart["extractor"] or f"skip {chart['publisher']} {chart['chart_type']}"
+        if chart["extractor"] is None:
+            return {"source": source, "skipped": chart}
+        return EXTRACTORS[chart["extractor"]](plate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify d-TPP chart pages")
+    parser.add_argument("sources", nargs="+",
+                        help="Plate PDFs, directories, manifests or zip archives")
+    parser.add_argument("--metafile", help="d-TPP metafile giving each PDF's chart code")
+    args = parser.parse_args()
+
+    chart_codes = load_chart_codes(args.metafile) if args.metafile else None
+    for arg in args.sources:
+        for path in iter_inputs(arg) if not arg.lower().endswith(".pdf") else [arg]:
+            chart = classify_bytes(read_input(path), path, chart_codes)
+            print(json.dumps({"source": path, **chart}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Per-cycle search index over extracted plate content.
+
+Built in one pass over batch_extract's NDJSON results, so questions like
+"which approaches use 118.9" or "ILS approaches with a TCH under 45 ft"
+are answered without rescanning every result. The index directory holds:
+
+  meta.json        format version, tables, row counts, term lexicon
+  plates.json      source path and procedure name of each plate id
+  postings.u32     inverted index: term -> sorted plate ids
+  <table>.<col>.f8         column values by row (NaN when absent)
+  <table>.<col>.sorted.f8  non-NaN values ascending
+  <table>.<col>.order.u32  row of each sorted value
+  minimums.plate.u32       plate id of each minimums row
+
+Every array is raw little-endian and memory-mapped when the index is
+opened; a range condition is two bisects over the sorted column, a term
+one slice of the postings.
+
+Two tables: "plates" (one row per plate: localizer_frequency, course,
+glide_slope_angle, tch, airport_elevation) and "minimums" (one row per
+procedure and category: altitude, hat, visibility_sm, rvr_ft). Conditions
+on minimums columns are intersected row by row before mapping to plates.
+
+Terms: apt:<FAA id>, name:<procedure name word>, rwy:<runway>,
+freq:<MHz> (localizer and communications), loc:<localizer id>,
+course:<degrees>, min:<minimums label>, missed:<missed-approach word>.
+
+Usage:
+  python plate_index.py build results.ndjson --out index/2602
+  python plate_index.py query index/2602 freq:118.9
+  python plate_index.py query index/2602 name:ILS "tch<45"
+"""
+
+import argparse
+import bisect
+import json
+import math
+import mmap
+import os
+import re
+import sys
+from array import array
+
+INDEX_VERSION = 1
+
+PLATE_COLUMNS = ("localizer_frequency", "course", "glide_slope_angle", "tch", "airport_elevation")
+MINIMUMS_COLUMNS = ("altitude", "hat", "visibility_sm", "rvr_ft")
+TABLES = {"plates": PLATE_COLUMNS, "minimums": MINIMUMS_COLUMNS}
+
+# Unicode fraction glyphs used in visibilities
+FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅛": 0.125, "⅜": 0.375, "⅝": 0.625, "⅞": 0.875}
+# Visibilities at or above this are RVR in hundreds of feet, not statute miles
+RVR_MIN = 10
+
+_CONDITION = re.compile(r"^\s*([A-Za-z_]+)\s*(<=|>=|!=|==|=|<|>)\s*(-?[\d.]+)\s*$")
+_WORD = re.compile(r"[A-Z0-9][A-Z0-9./-]*[A-Z0-9]|[A-Z0-9]")
+_RUNWAY = re.compile(r"\bRWY\s+(\d{1,2}[LRC]?)\b", re.IGNORECASE)
+_FREQUENCY = re.compile(r"\b\d{3}\.\d{1,3}\b")
+
+
+def format_number(value):
+    """Term spelling of a number: 118.90 -> "118.9", 350.0 -> "350"."""
+    return f"{float(value):g}"
+
+
+def visibility_value(text):
+    """Numeric value of a visibility ("1¼" -> 1.25, "24" -> 24.0), or None."""
+    if not text:
+        return None
+    m = re.fullmatch(r"\s*(\d*)\s*([½¼¾⅛⅜⅝⅞]?)\s*", text)
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    return float(m.group(1) or 0) + FRACTIONS.get(m.group(2), 0.0)
+
+
+def plate_terms(result):
+    """Every index term of one extraction result."""
+    terms = set()
+    airport = result.get("airport") or {}
+    if airport.get("faa_id"):
+        terms.add(f"apt:{airport['faa_id'].upper()}")
+
+    name = result.get("procedure_name") or ""
+    terms.update(f"name:{word}" for word in _WORD.findall(name.upper()))
+    terms.update(f"rwy:{rwy.upper()}" for rwy in _RUNWAY.findall(name))
+
+    approach = result.get("approach") or {}
+    if approach.get("localizer_frequency") is not None:
+        terms.add(f"freq:{format_number(approach['localizer_frequency'])}")
+    if approach.get("localizer_id"):
+        terms.add(f"loc:{approach['localizer_id'].upper()}")
+    if approach.get("course") is not None:
+        terms.add(f"course:{format_number(approach['course'])}")
+    for tdze in approach.get("tdze") or []:
+        if tdze.get("runway"):
+            terms.add(f"rwy:{tdze['runway'].upper()}")
+
+    for comm in result.get("communications") or []:
+        # One frequency string, or a list of them when a facility has several
+        freqs = comm.get("frequency") or []
+        for text in [freqs] if isinstance(freqs, str) else freqs:
+            terms.update(f"freq:{format_number(freq)}" for freq in _FREQUENCY.findall(text))
+
+    terms.update(f"min:{label.upper()}" for label, categories in _minimums(result))
+    terms.update(f"missed:{word}"
+                 for word in _WORD.findall((result.get("missed_approach") or "").upper()))
+    return terms
+
+
+def plate_row(result):
+    approach = result.get("approach") or {}
+    return [approach.get(col) for col in PLATE_COLUMNS]
+
+
+def _minimums(result):
+    """(label, categories) pairs of a result's minimums; none when extraction failed."""
+    minimums = result.get("minimums") or {}
+    return [(label, categories) for label, categories in minimums.items()
+            if isinstance(categories, dict)]
+
+
+def minimums_rows(result):
+    """[altitude, hat, visibility_sm, rvr_ft] per procedure and category."""
+    rows = []
+    for _, categories in _minimums(result):
+        for values in categories.values():
+            visibility = visibility_value(values.get("visibility"))
+            rows.append([
+                values.get("altitude"),
+                values.get("hat"),
+                visibility if visibility is not None and visibility < RVR_MIN else None,
+                visibility * 100 if visibility is not None and visibility >= RVR_MIN else None,
+            ])
+    return rows
+
+
+def _write_array(path, values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, "wb") as f:
+        values.tofile(f)
+
+
+def _write_columns(out_dir, table, columns, rows):
+    for i, col in enumerate(columns):
+        values = array("d", (math.nan if row[i] is None else float(row[i]) for row in rows))
+        order = sorted((r for r in range(len(values)) if not math.isnan(values[r])),
+                       key=values.__getitem__)
+        _write_array(os.path.join(out_dir, f"{table}.{col}.f8"), values)
+        _write_array(os.path.join(out_dir, f"{table}.{col}.sorted.f8"),
+                     array("d", (values[r] for r in order)))
+        _write_array(os.path.join(out_dir, f"{table}.{col}.order.u32"), array("I", order))
+
+
+def build_index(results_path, out_dir):
+    """Index an NDJSON results file; return build statistics.
+
+    A source seen more than once (a resumed batch repeating plates that
+    were in flight) keeps its last result, as plate_changes.load_results
+    does, and its first plate id. Error and skip records are not indexed.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = {}
+    duplicates = 0
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            if "error" in result or "skipped" in result:
+                continue
+            source = result.get("source")
+            if source in results:
+                duplicates += 1
+            results[source] = result
+
+    plates = []
+    postings = {}
+    plate_rows = []
+    min_rows = []
+    min_plate = array("I")
+    for source, result in results.items():
+        plate_id = len(plates)
+        plates.append([source, result.get("procedure_name")])
+        for term in plate_terms(result):
+            postings.setdefault(term, array("I")).append(plate_id)
+        plate_rows.append(plate_row(result))
+        for row in minimums_rows(result):
+            min_rows.append(row)
+            min_plate.append(plate_id)
+
+    # Plate ids are appended in increasing order, so every posting list is sorted
+    lexicon = {}
+    flat = array("I")
+    for term in sorted(postings):
+        lexicon[term] = [len(flat), len(postings[term])]
+        flat.extend(postings[term])
+    _write_array(os.path.join(out_dir, "postings.u32"), flat)
+    _write_columns(out_dir, "plates", PLATE_COLUMNS, plate_rows)
+    _write_columns(out_dir, "minimums", MINIMUMS_COLUMNS, min_rows)
+    _write_array(os.path.join(out_dir, "minimums.plate.u32"), min_plate)
+    with open(os.path.join(out_dir, "plates.json"), "w", encoding="utf-8") as f:
+        json.dump(plates, f, ensure_ascii=False, separators=(",", ":"))
+
+    # Written last: an index without meta.json is incomplete
+    meta = {
+        "version": INDEX_VERSION,
+        "rows": {"plates": len(plates), "minimums": len(min_rows)},
+        "columns": {table: list(columns) for table, columns in TABLES.items()},
+        "terms": lexicon,
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+    return {"plates": len(plates), "minimums_rows": len(min_rows),
+            "terms": len(lexicon), "postings": len(flat), "duplicates": duplicates}
+
+
+class PlateIndex:
+    """Read side of an index directory; arrays are memory-mapped on demand."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"index version {meta.get('version')}, expected {INDEX_VERSION}")
+        self.rows = meta["rows"]
+        self.columns = meta["columns"]
+        self.lexicon = meta["terms"]
+        self._plates = None
+        self._maps = {}
+        self._arrays = {}
+
+    def _array(self, name, typecode):
+        """Memory-mapped array file as a typed memoryview."""
+        view = self._arrays.get(name)
+        if view is None:
+            path = os.path.join(self.directory, name)
+            if os.path.getsize(path) == 0:
+                view = memoryview(array(typecode))
+            else:
+                with open(path, "rb") as f:
+                    self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                view = memoryview(self._maps[name]).cast(typecode)
+            self._arrays[name] = view
+        return view
+
+    def close(self):
+        for view in self._arrays.values():
+            view.release()
+        for m in self._maps.values():
+            m.close()
+        self._arrays.clear()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def plate(self, plate_id):
+        """(source, procedure_name) of a plate id."""
+        if self._plates is None:
+            with open(os.path.join(self.directory, "plates.json"), encoding="utf-8") as f:
+                self._plates = json.load(f)
+        return tuple(self._plates[plate_id])
+
+    def table_of(self, column):
+        for table, columns in self.columns.items():
+            if column in columns:
+                return table
+        raise KeyError(f"unknown column: {column}")
+
+    def term(self, term):
+        """Sorted plate ids carrying a term."""
+        entry = self.lexicon.get(term)
+        if entry is None:
+            return []
+        offset, count = entry
+        return self._array("postings.u32", "I")[offset:offset + count].tolist()
+
+    def value(self, column, row):
+        """One column value (None when absent)."""
+        v = self._array(f"{self.table_of(column)}.{column}.f8", "d")[row]
+        return None if math.isnan(v) else v
+
+    def rows_where(self, column, op, value):
+        """Rows of column's table where `row op value` holds, as a set."""
+        table = self.table_of(column)
+        values = self._array(f"{table}.{column}.sorted.f8", "d")
+        order = self._array(f"{table}.{column}.order.u32", "I")
+        lo = bisect.bisect_left(values, value)
+        hi = bisect.bisect_right(values, value)
+        if op == "<":
+            selected = order[:lo]
+        elif op == "<=":
+            selected = order[:hi]
+        elif op == ">":
+            selected = order[hi:]
+        elif op == ">=":
+            selected = order[lo:]
+        elif op in ("=", "=="):
+            selected = order[lo:hi]
+        elif op == "!=":
+            return set(order[:lo].tolist()) | set(order[hi:].tolist())
+        else:
+            raise ValueError(f"unknown operator: {op}")
+        return set(selected.tolist())
+
+    def query(self, conditions):
+        """Sorted plate ids matching every condition.
+
+        A condition is a term ("freq:118.9") or a comparison on a column
+        ("tch<45", "visibility_sm<=0.5").
+        """
+        plates = None
+        min_rows = None
+        for condition in conditions:
+            m = _CONDITION.match(condition)
+            if not m:
+                matched = set(self.term(condition.strip()))
+            else:
+                column, op, value = m.group(1), m.group(2), float(m.group(3))
+                rows = self.rows_where(column, op, value)
+                if self.table_of(column) == "minimums":
+                    min_rows = rows if min_rows is None else min_rows & rows
+                    continue
+                matched = rows
+            plates = matched if plates is None else plates & matched
+        if min_rows is not None:
+            min_plate = self._array("minimums.plate.u32", "I")
+            matched = {min_plate[r] for r in min_rows}
+            plates = matched if plates is None else plates & matched
+        return sorted(plates or ())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a per-cycle plate index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Index batch_extract NDJSON results")
+    build.add_argument("results", help="NDJSON results file")
+    build.add_argument("--out", required=True, help="Index directory")
+    query = sub.add_parser("query", help="List plates matching every condition")
+    query.add_argument("index", help="Index directory")
+    query.add_argument("conditions", nargs="+",
+                       help='Terms ("freq:118.9", "name:ILS") or comparisons ("tch<45")')
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(build_index(args.results, args.out)), file=sys.stderr)
+        return
+
+    with PlateIndex(args.index) as index:
+        try:
+            ids = index.query(args.conditions)
+        except (KeyError, ValueError) as e:
+            sys.exit(f"error: {e}")
+        for plate_id in ids:
+            source, name = index.plate(plate_id)
+            print(f"{source}\t{name or ''}")
+    print(f"{len(ids)} plate(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Plate inputs: PDF files on disk and members of d-TPP zip archives.
+
+An input path is a file path or an archive path and member name joined
+by ARCHIVE_SEP; archives are read in memory, never unpacked to disk.
+"""
+
+import json
+import os
+import time
+import zipfile
+
+# Separates an archive from a member in input paths: DDTPPA_2602.zip!00057IL35R.PDF
+ARCHIVE_SEP = "!"
+
+# Open archives of this process, by path
+_archives = {}
+
+
+def iter_inputs(source):
+    """List plate PDFs from a directory (recursive) or a manifest file.
+
+    A manifest is either a JSON list of paths or one path per line; relative
+    paths are resolved against the manifest's directory. A zip archive
+    yields ARCHIVE_SEP-joined paths to its PDF members.
+    """
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            return sorted(f"{source}{ARCHIVE_SEP}{name}" for name in archive.namelist()
+                          if name.lower().endswith(".pdf"))
+
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(".pdf"):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [line.strip() for line in text.splitlines()]
+    return [os.path.join(base, p) for p in entries if p and not p.startswith("#")]
+
+
+def input_name(path):
+    """File name of an input path; the member's name for archive paths."""
+    _, sep, member = path.partition(ARCHIVE_SEP)
+    return os.path.basename(member if sep else path)
+
+
+def _archive_member(path):
+    """(open ZipFile, member name) for an archive path, else (None, None)."""
+    archive_path, sep, member = path.partition(ARCHIVE_SEP)
+    if not sep or not zipfile.is_zipfile(archive_path):
+        return None, None
+    archive = _archives.get(archive_path)
+    if archive is None:
+        archive = _archives[archive_path] = zipfile.ZipFile(archive_path)
+    return archive, member
+
+
+def read_input(path):
+    """PDF bytes for an input path, from disk or from inside a zip archive."""
+    archive, member = _archive_member(path)
+    if archive is not None:
+        return archive.read(member)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def input_mtime(path):
+    """Modification time of an input path; an archive member's own date."""
+    archive, member = _archive_member(path)
+    if archive is not None:
+        return time.mktime(archive.getinfo(member).date_time + (0, 0, -1))
+    return os.path.getmtime(path)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Resident plate extraction service.
+
+Keeps a bounded pool of worker processes with PyMuPDF already imported and
+serves extraction requests as JSON lines, either on stdin/stdout or on a
+Unix socket (one JSON line per request and per response on each
+connection). Requests are handled concurrently, so responses may come
+back out of order; each response carries the request's "id".
+
+Request:
+  {"id": 1, "path": "/data/dtpp/2602/00057IL35R.PDF", "sections": ["minimums"]}
+  {"id": 2, "pdf_base64": "JVBERi0...", "source": "upload", "sections": null}
+  {"id": 3, "op": "stats"}
+
+Response:
+  {"id": 1, "ok": true, "result": {...}, "ms": 41.2}
+  {"id": 2, "ok": false, "error": "timeout after 10.0s"}
+
+A request that runs past --timeout gets an error response and its worker
+is killed and replaced. When every worker is busy and --queue-size
+requests are waiting, reading new requests blocks until one finishes.
+
+Usage:
+  python plate_service.py --workers 4 --timeout 10          # stdin/stdout
+  python plate_service.py --socket /tmp/plates.sock --workers 4
+"""
+
+import argparse
+import base64
+import io
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+from extract_plate import SECTION_CLIPS, extract_plate, extract_plate_bytes
+
+# Latencies kept for the percentile stats
+LATENCY_WINDOW = 1000
+
+
+def handle_request(request):
+    """Extract one plate for a request dict; never raises."""
+    try:
+        sections = request.get("sections")
+        if sections is not None:
+            if not isinstance(sections, list) or not all(isinstance(s, str) for s in sections):
+                return {"ok": False, "error": "sections must be a list of section names"}
+            unknown = [s for s in sections if s not in SECTION_CLIPS]
+            if unknown:
+                return {"ok": False, "error": f"unknown sections: {', '.join(unknown)}"}
+        if "pdf_base64" in request:
+            data = base64.b64decode(request["pdf_base64"])
+            result = extract_plate_bytes(data, request.get("source"), sections)
+        elif "path" in request:
+            result = extract_plate(request["path"], sections)
+        else:
+            return {"ok": False, "error": "request needs a path or pdf_base64"}
+        return {"ok": True, "result": result}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def serve_worker(conn):
+    """Worker process: answer requests from the pipe until None or EOF."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        conn.send(handle_request(request))
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        "p50": round(ordered[round(last * 0.50)], 2),
+        "p95": round(ordered[round(last * 0.95)], 2),
+        "max": round(ordered[last], 2),
+    }
+
+
+class ExtractionService:
+    """Bounded pool of extraction workers with per-request timeouts.
+
+    One dispatcher thread per worker takes requests off a bounded queue,
+    hands each to its process and waits up to timeout seconds for the
+    answer. A worker that times out or dies is replaced. The first workers
+    are started before any dispatcher thread runs.
+    """
+
+    def __init__(self, workers=2, timeout=10.0, queue_size=64):
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.counts = {"ok": 0, "error": 0, "timeout": 0, "crashed": 0}
+        self.in_flight = 0
+        self.restarts = 0
+        self.queue_ms = deque(maxlen=LATENCY_WINDOW)
+        self.total_ms = deque(maxlen=LATENCY_WINDOW)
+        self.started = time.monotonic()
+        # Workers are replaced from dispatcher threads, and forking a threaded
+        # process can copy a lock some other thread holds. The fork server
+        # forks them from a single-threaded process that has extract_plate
+        # imported.
+        self.context = multiprocessing.get_context("forkserver")
+        self.context.set_forkserver_preload(["extract_plate"])
+        self.threads = [threading.Thread(target=self._dispatch, args=self._spawn(), daemon=True)
+                        for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, request, respond):
+        """Queue a request; respond(response) is called from a dispatcher thread.
+
+        Blocks while the queue is full.
+        """
+        self.queue.put((request, respond, time.monotonic()))
+
+    def close(self):
+        """Finish queued requests, then stop the workers."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counts,
+                "workers": len(self.threads),
+                "in_flight": self.in_flight,
+                "queued": self.queue.qsize(),
+                "restarts": self.restarts,
+                "uptime_s": round(time.monotonic() - self.started, 1),
+                "queue_ms": percentiles(self.queue_ms),
+                "total_ms": percentiles(self.total_ms),
+            }
+
+    def _spawn(self):
+        parent, child = self.context.Pipe()
+        proc = self.context.Process(target=serve_worker, args=(child,), daemon=True)
+        proc.start()
+        child.close()
+        return parent, proc
+
+    def _dispatch(self, conn, proc):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            request, respond, enqueued = job
+            started = time.monotonic()
+            with self.lock:
+                self.in_flight += 1
+            outcome = None
+            try:
+                conn.send(request)
+                if conn.poll(self.timeout):
+                    response = conn.recv()
+                else:
+                    outcome = "timeout"
+                    response = {"ok": False, "error": f"timeout after {self.timeout}s"}
+            except (EOFError, OSError):
+                outcome = "crashed"
+                response = {"ok": False, "error": "worker exited"}
+            if outcome:
+                proc.kill()
+                proc.join()
+                conn.close()
+                conn, proc = self._spawn()
+
+            finished = time.monotonic()
+            outcome = outcome or ("ok" if response["ok"] else "error")
+            with self.lock:
+                self.in_flight -= 1
+                self.counts[outcome] += 1
+                if outcome in ("timeout", "crashed"):
+                    self.restarts += 1
+                self.queue_ms.append((started - enqueued) * 1000)
+                self.total_ms.append((finished - enqueued) * 1000)
+            response = dict(response, id=request.get("id"),
+                            ms=round((finished - started) * 1000, 1))
+            respond(response)
+        conn.send(None)
+        conn.close()
+        proc.join()
+
+
+def serve_lines(service, lines, write):
+    """Feed JSON request lines to the service; write(response) for each.
+
+    "op": "stats" requests are answered immediately, without queueing.
+    Returns once every request read has been answered.
+    """
+    done = threading.Condition()
+    pending = 0
+
+    def respond(response):
+        nonlocal pending
+        write(response)
+        with done:
+            pending -= 1
+            done.notify_all()
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            write({"id": None, "ok": False, "error": f"bad request: {e}"})
+            continue
+        if request.get("op") == "stats":
+            write({"id": request.get("id"), "ok": True, "result": service.stats()})
+            continue
+        with done:
+            pending += 1
+        service.submit(request, respond)
+
+    with done:
+        done.wait_for(lambda: pending == 0)
+
+
+def line_writer(stream):
+    """Thread-safe write of one JSON response per line.
+
+    Write errors (a client that went away) are dropped.
+    """
+    lock = threading.Lock()
+
+    def write(response):
+        line = json.dumps(response, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with lock:
+            try:
+                stream.write(line)
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    return write
+
+
+def serve_socket(service, path):
+    """Serve JSON lines on a Unix socket until interrupted."""
+    if os.path.exists(path):
+        os.unlink(path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = io.TextIOWrapper(self.rfile, encoding="utf-8")
+            out = io.TextIOWrapper(self.wfile, encoding="utf-8", write_through=True)
+            serve_lines(service, lines, line_writer(out))
+
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve plate extraction requests as JSON lines")
+    parser.add_argument("--socket", help="Unix socket path (default: stdin/stdout)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Worker processes")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="Seconds before a request is abandoned and its worker replaced")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Requests waiting for a worker before reads block")
+    args = parser.parse_args()
+
+    service = ExtractionService(args.workers, args.timeout, args.queue_size)
+    if args.socket:
+        print(f"listening on {args.socket}", file=sys.stderr)
+        serve_socket(service, args.socket)
+    else:
+        serve_lines(service, sys.stdin, line_writer(sys.stdout))
+    service.close()
+    print(json.dumps(service.stats()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
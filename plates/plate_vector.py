@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Vector overlay of an approach plate: line work plus text, quantized.
+
+Pulls every stroked and filled path from the plate (page.get_drawings()),
+flattens curves, simplifies each polyline (Ramer-Douglas-Peucker) and
+quantizes coordinates to a fixed grid. Paths are packed as zigzag varint
+deltas into one base64 buffer; text comes from the spans
+extract_text_items() already collects. The page's GeoPDF viewport (the
+same bbox/GPTS/LPTS/WKT the API's georef parser reads) is carried along,
+so clients can place the overlay on a map and render it sharp at any zoom.
+
+Overlay JSON:
+  {"version": 1, "page": [w, h], "origin": "top-left", "precision": 0.25,
+   "georef": {...} | null,
+   "styles": [{"stroke": "#646464", "width": 0.52} | {"fill": "#000000"}, ...],
+   "path_count": N, "paths": "<base64>",
+   "fonts": [...], "text": [[x, y, size, font, "text"], ...]}
+
+Each path in the buffer is: style, flags (1 = closed, 2 = even-odd fill),
+point count, then x, y of the first point and dx, dy for the rest, all in
+units of `precision` points. Text x/y is the span's left/bottom edge in
+the same units.
+
+Usage:
+  python plate_vector.py plates/faa-ils-kapa.pdf -o kapa.pvo
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import re
+import struct
+import sys
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24.3 only ships the fitz name
+    import fitz
+
+from extract_plate import extract_text_items
+
+OVERLAY_VERSION = 1
+OVERLAY_MAGIC = b"PVO"
+# Grid size of quantized coordinates, in points
+DEFAULT_PRECISION = 0.25
+# Maximum deviation allowed when simplifying a polyline, in points
+DEFAULT_TOLERANCE = 0.3
+# Segments per flattened Bezier curve
+CURVE_SEGMENTS = 6
+
+
+# --- Minimal PDF object parsing, enough for the GeoPDF viewport ---
+
+_PDF_TOKEN = re.compile(rb"""
+    \s*(?:
+      (?P<ref>\d+\s+\d+\s+R\b)
+    | (?P<open><<|\[)
+    | (?P<close>>>|\])
+    | (?P<name>/[^\s/\[\]<>()]*)
+    | (?P<hex><[0-9A-Fa-f\s]*>)
+    | (?P<number>[-+]?(?:\d+\.?\d*|\.\d+))
+    | (?P<keyword>true|false|null)
+    | (?P<string>\()
+    )""", re.VERBOSE)
+
+
+# Literal-string escapes (PDF 32000-1, 7.3.4.2); other escaped characters stand for themselves
+_PDF_ESCAPES = {ord("n"): 0x0A, ord("r"): 0x0D, ord("t"): 0x09, ord("b"): 0x08, ord("f"): 0x0C}
+_OCTAL = b"01234567"
+
+
+def _read_pdf_string(text, pos):
+    """Literal string starting after '(' at pos; returns (str, end).
+
+    Handles the escape table, \\ddd octal codes, backslash line
+    continuations and unescaped CR / CRLF line ends (read as LF).
+    """
+    depth = 1
+    out = bytearray()
+    while pos < len(text):
+        ch = text[pos]
+        if ch == 0x5C:  # backslash
+            pos += 1
+            if pos >= len(text):
+                break
+            ch = text[pos]
+            if ch in _OCTAL:
+                end = pos + 1
+                while end < len(text) and end < pos + 3 and text[end] in _OCTAL:
+                    end += 1
+                out.append(int(text[pos:end], 8) & 0xFF)
+                pos = end
+                continue
+            if ch in (0x0D, 0x0A):  # line continuation
+                pos += 2 if text[pos:pos + 2] == b"\r\n" else 1
+                continue
+            out.append(_PDF_ESCAPES.get(ch, ch))
+            pos += 1
+            continue
+        if ch == 0x0D:
+            out.append(0x0A)
+            pos += 2 if text[pos:pos + 2] == b"\r\n" else 1
+            continue
+        if ch == 0x28:
+            depth += 1
+        elif ch == 0x29:
+            depth -= 1
+            if depth == 0:
+                return out.decode("latin-1"), pos + 1
+        out.append(ch)
+        pos += 1
+    raise ValueError("unterminated PDF string")
+
+
+def parse_pdf_object(text, pos=0):
+    """Parse one PDF object from source text; returns (value, end).
+
+    Dicts become dict (names without the slash), arrays list, indirect
+    references ("ref", number).
+    """
+    if isinstance(text, str):
+        text = text.encode("latin-1")
+    m = _PDF_TOKEN.match(text, pos)
+    if not m:
+        raise ValueError(f"bad PDF object at {pos}")
+    pos = m.end()
+    kind = m.lastgroup
+    token = m.group(kind)
+    if kind == "ref":
+        return ("ref", int(token.split()[0])), pos
+    if kind == "number":
+        return float(token), pos
+    if kind == "name":
+        return token[1:].decode("latin-1"), pos
+    if kind == "keyword":
+        return {b"true": True, b"false": False, b"null": None}[token], pos
+    if kind == "hex":
+        return bytes.fromhex(re.sub(rb"\s", b"", token[1:-1]).decode()).decode("latin-1"), pos
+    if kind == "string":
+        return _read_pdf_string(text, pos)
+    if kind == "open" and token == b"[":
+        items = []
+        while True:
+            m = _PDF_TOKEN.match(text, pos)
+            if m and m.group("close") == b"]":
+                return items, m.end()
+            value, pos = parse_pdf_object(text, pos)
+            items.append(value)
+    if kind == "open":
+        entries = {}
+        while True:
+            m = _PDF_TOKEN.match(text, pos)
+            if m and m.group("close") == b">>":
+                return entries, m.end()
+            key, pos = parse_pdf_object(text, pos)
+            entries[key], pos = parse_pdf_object(text, pos)
+    raise ValueError(f"unexpected {token!r} at {pos}")
+
+
+def _resolve(doc, value):
+    while isinstance(value, tuple) and value[0] == "ref":
+        value = parse_pdf_object(doc.xref_object(value[1], compressed=True))[0]
+    return value
+
+
+def read_georef(doc, page):
+    """GeoPDF viewport of a page, shaped like the API's GeorefData, or None.
+
+    Uses the first /VP viewport with a BBox and a Measure holding at least
+    four ground (GPTS) and logical (LPTS) points.
+    """
+    kind, source = doc.xref_get_key(page.xref, "VP")
+    if kind == "null":
+        return None
+    viewports = _resolve(doc, parse_pdf_object(source)[0])
+    if not isinstance(viewports, list):
+        return None
+    for viewport in viewports:
+        viewport = _resolve(doc, viewport)
+        if not isinstance(viewport, dict):
+            continue
+        bbox = _resolve(doc, viewport.get("BBox"))
+        measure = _resolve(doc, viewport.get("Measure"))
+        if not isinstance(bbox, list) or len(bbox) < 4 or not isinstance(measure, dict):
+            continue
+        gpts = _resolve(doc, measure.get("GPTS"))
+        lpts = _resolve(doc, measure.get("LPTS"))
+        if not isinstance(gpts, list) or len(gpts) < 8:
+            continue
+        if not isinstance(lpts, list) or len(lpts) < 8:
+            continue
+        gcs = _resolve(doc, measure.get("GCS"))
+        wkt = _resolve(doc, gcs.get("WKT")) if isinstance(gcs, dict) else None
+        return {
+            "bbox": [float(v) for v in bbox[:4]],
+            "gpts": [[gpts[i], gpts[i + 1]] for i in range(0, len(gpts) - 1, 2)],
+            "lpts": [[lpts[i], lpts[i + 1]] for i in range(0, len(lpts) - 1, 2)],
+            "wkt": wkt if isinstance(wkt, str) else None,
+            "pageWidthPt": page.rect.width,
+            "pageHeightPt": page.rect.height,
+        }
+    return None
+
+
+# --- Line work ---
+
+def _bezier(p0, p1, p2, p3, segments=CURVE_SEGMENTS):
+    points = []
+    for n in range(1, segments + 1):
+        t = n / segments
+        u = 1 - t
+        points.append((u * u * u * p0.x + 3 * u * u * t * p1.x + 3 * u * t * t * p2.x + t * t * t * p3.x,
+                       u * u * u * p0.y + 3 * u * u * t * p1.y + 3 * u * t * t * p2.y + t * t * t * p3.y))
+    return points
+
+
+def drawing_polylines(drawing):
+    """Split one get_drawings() path into (points, closed) polylines."""
+    polylines = []
+    current = []
+
+    def flush(closed=False):
+        if len(current) > 1:
+            polylines.append((list(current), closed))
+        current.clear()
+
+    for item in drawing["items"]:
+        op = item[0]
+        if op in ("re", "qu"):
+            flush()
+            quad = item[1].quad if op == "re" else item[1]
+            polylines.append(([(p.x, p.y) for p in (quad.ul, quad.ur, quad.lr, quad.ll)], True))
+            continue
+        start = item[1]
+        if not current or abs(current[-1][0] - start.x) > 1e-3 or abs(current[-1][1] - start.y) > 1e-3:
+            flush()
+            current.append((start.x, start.y))
+        if op == "l":
+            current.append((item[2].x, item[2].y))
+        elif op == "c":
+            current.extend(_bezier(*item[1:5]))
+    flush(bool(drawing.get("closePath")))
+    return polylines
+
+
+def simplify(points, tolerance):
+    """Ramer-Douglas-Peucker: drop points within tolerance of the kept line."""
+    if len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tol2 = tolerance * tolerance
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        worst, worst_d2 = None, tol2
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length2 == 0:
+                d2 = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                cross = dx * (py - ay) - dy * (px - ax)
+                d2 = cross * cross / length2
+            if d2 > worst_d2:
+                worst, worst_d2 = i, d2
+        if worst is not None:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _hex(color):
+    return "#" + "".join(f"{round(c * 255):02x}" for c in color[:3])
+
+
+def drawing_style(drawing):
+    """Style of a path: stroke colour and width, and/or fill colour."""
+    style = {}
+    if drawing.get("color") is not None and "s" in drawing["type"]:
+        style["stroke"] = _hex(drawing["color"])
+        style["width"] = round(drawing.get("width") or 0, 2)
+        if drawing.get("dashes") and drawing["dashes"] not in ("[] 0", "[] 0.0"):
+            style["dashes"] = drawing["dashes"]
+    if drawing.get("fill") is not None and "f" in drawing["type"]:
+        style["fill"] = _hex(drawing["fill"])
+    return style
+
+
+# --- Encoding ---
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def encode_paths(paths):
+    """Pack [(style, flags, [(qx, qy), ...])] into the overlay buffer."""
+    out = bytearray()
+    for style, flags, points in paths:
+        _varint(out, style)
+        _varint(out, flags)
+        _varint(out, len(points))
+        px = py = 0
+        for x, y in points:
+            _varint(out, _zigzag(x - px))
+            _varint(out, _zigzag(y - py))
+            px, py = x, y
+    return bytes(out)
+
+
+def decode_paths(overlay):
+    """Reference decoder: [(style, flags, [(x, y), ...])] in points."""
+    buf = base64.b64decode(overlay["paths"])
+    precision = overlay["precision"]
+    paths = []
+    pos = 0
+    for _ in range(overlay["path_count"]):
+        style, pos = _read_varint(buf, pos)
+        flags, pos = _read_varint(buf, pos)
+        count, pos = _read_varint(buf, pos)
+        points = []
+        x = y = 0
+        for _ in range(count):
+            dx, pos = _read_varint(buf, pos)
+            dy, pos = _read_varint(buf, pos)
+            x += _unzigzag(dx)
+            y += _unzigzag(dy)
+            points.append((x * precision, y * precision))
+        paths.append((style, flags, points))
+    return paths
+
+
+def build_overlay(doc, page, precision=DEFAULT_PRECISION, tolerance=DEFAULT_TOLERANCE,
+                  items=None):
+    """Vector overlay dict for one page.
+
+    items are the page's text spans if already extracted (Span objects from
+    extract_text_items), so a caller that also runs extract_plate on the
+    page need not parse the text twice.
+    """
+    styles = {}
+    paths = []
+    seen = set()
+    for drawing in page.get_drawings():
+        style = drawing_style(drawing)
+        if not style:
+            continue
+        key = tuple(sorted(style.items()))
+        style_id = styles.setdefault(key, len(styles))
+        flags = 2 if drawing.get("even_odd") else 0
+        for points, closed in drawing_polylines(drawing):
+            quantized = []
+            for x, y in simplify(points, tolerance):
+                q = (round(x / precision), round(y / precision))
+                if not quantized or quantized[-1] != q:
+                    quantized.append(q)
+            if len(quantized) < 2:
+                continue
+            path = (style_id, flags | (1 if closed else 0), tuple(quantized))
+            # Plates often draw the same path twice (e.g. halo then line)
+            if path in seen:
+                continue
+            seen.add(path)
+            paths.append(path)
+
+    if items is None:
+        items = extract_text_items(page)
+    fonts = {}
+    text = []
+    for span in items:
+        font = fonts.setdefault(span.font, len(fonts))
+        text.append([round(span.x0 / precision), round(span.y1 / precision),
+                     round(span.size / precision), font, span.text])
+
+    return {
+        "version": OVERLAY_VERSION,
+        "page": [round(page.rect.width, 2), round(page.rect.height, 2)],
+        "origin": "top-left",
+        "precision": precision,
+        "georef": read_georef(doc, page),
+        "styles": [dict(key) for key in styles],
+        "path_count": len(paths),
+        "paths": base64.b64encode(encode_paths(paths)).decode("ascii"),
+        "fonts": list(fonts),
+        "text": text,
+    }
+
+
+def overlay_bytes(overlay, binary=False, compress=True):
+    """Serialized overlay, gzip-compressed unless compress is False.
+
+    The binary form ("PVO" + version byte + little-endian u32 header
+    length + header JSON + raw path buffer) skips the base64 of the JSON
+    form, about a quarter smaller after gzip.
+    """
+    if binary:
+        header = {k: v for k, v in overlay.items() if k != "paths"}
+        header_json = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        data = (OVERLAY_MAGIC + bytes([OVERLAY_VERSION]) + struct.pack("<I", len(header_json))
+                + header_json + base64.b64decode(overlay["paths"]))
+    else:
+        data = json.dumps(overlay, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(data, 9) if compress else data
+
+
+def load_overlay(data):
+    """Overlay dict from either serialized form, compressed or not."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    if data[:3] != OVERLAY_MAGIC:
+        return json.loads(data)
+    (length,) = struct.unpack_from("<I", data, 4)
+    overlay = json.loads(data[8:8 + length])
+    overlay["paths"] = base64.b64encode(data[8 + length:]).decode("ascii")
+    return overlay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract a plate's vector overlay")
+    parser.add_argument("pdf", help="Plate PDF")
+    parser.add_argument("-o", "--out",
+                        help="Output file: .pvo binary, .gz gzip JSON, else JSON (default stdout)")
+    parser.add_argument("--precision", type=float, default=DEFAULT_PRECISION,
+                        help="Coordinate grid in points")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Simplification tolerance in points")
+    args = parser.parse_args()
+
+    with fitz.open(args.pdf) as doc:
+        overlay = build_overlay(doc, doc[0], args.precision, args.tolerance)
+    raw = overlay_bytes(overlay, compress=False)
+    binary = overlay_bytes(overlay, binary=True)
+    if args.out:
+        with open(args.out, "wb") as f:
+            if args.out.endswith(".pvo"):
+                f.write(binary)
+            elif args.out.endswith(".gz"):
+                f.write(gzip.compress(raw, 9))
+            else:
+                f.write(raw)
+    else:
+        sys.stdout.buffer.write(raw + b"\n")
+    print(json.dumps({"paths": overlay["path_count"], "text": len(overlay["text"]),
+                      "georef": overlay["georef"] is not None, "json_bytes": len(raw),
+                      "binary_gzip_bytes": len(binary)}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
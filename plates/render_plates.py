@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+In-process rasterization of approach plates into a per-cycle image cache.
+
+Renders page 1 of every plate PDF in a d-TPP cycle with PyMuPDF across a
+process pool, instead of forking pdftoppm per plate on first view. Each
+plate gets a PNG per requested DPI and, optionally, a tile pyramid for
+zooming on mobile. Images land in one directory per cycle, laid out like
+the API image cache (data/procedures/images/<cycle>/<pdf_name>.png at
+200 DPI), so a pre-rendered cycle turns every first view into a cache hit.
+Plates are read through plate_inputs.read_input, so a d-TPP zip
+archive works as a source without unpacking it. A manifest.json in the
+cycle directory lists what was rendered; plates whose PDF (or archive
+member) has not changed since the manifest was written are skipped. The
+manifest is rewritten every MANIFEST_FLUSH_EVERY plates, so a run that
+dies part-way keeps the skip state of what it finished.
+
+Layout of the output directory:
+  <name>.png                     200 DPI (the API's default image)
+  <name>@<dpi>.png               any other DPI
+  <name>.tiles/<z>/<col>_<row>.png  tile pyramid; z=0 fits in one tile
+  manifest.json
+
+Usage:
+  python render_plates.py api/data/procedures/pdfs/2602 \
+    --out api/data/procedures/images/2602 --dpi 200 --dpi 100 --tiles --workers 8
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:  # PyMuPDF < 1.24.3 only ships the fitz name
+    import fitz
+
+from batch_extract import WORKER_CRASHED, pool_map
+from plate_inputs import input_mtime, input_name, iter_inputs, read_input
+
+# ProceduresService.getProcedureImage renders at this resolution
+DEFAULT_DPI = 200
+TILE_SIZE = 256
+# Resolution of the deepest tile pyramid level
+TILE_MAX_DPI = 400
+
+MANIFEST_NAME = "manifest.json"
+# Plates rendered between manifest rewrites
+MANIFEST_FLUSH_EVERY = 200
+
+
+def _page_base(pdf_path, page_no=0):
+    base = os.path.splitext(input_name(pdf_path))[0]
+    return base if page_no == 0 else f"{base}-p{page_no + 1}"
+
+
+def image_name(pdf_path, dpi, page_no=0):
+    """File name of a plate page rendered at dpi (the API's name for page 1 at DEFAULT_DPI)."""
+    base = _page_base(pdf_path, page_no)
+    return f"{base}.png" if dpi == DEFAULT_DPI else f"{base}@{dpi}.png"
+
+
+def tiles_name(pdf_path, page_no=0):
+    return _page_base(pdf_path, page_no) + ".tiles"
+
+
+def write_atomic(path, data):
+    """Write bytes so a reader never sees a partial image."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def pyramid_levels(page_rect, max_dpi=TILE_MAX_DPI, tile_size=TILE_SIZE):
+    """Zoom levels from one tile (z=0) up to max_dpi, doubling each level.
+
+    Returns [{"z", "dpi", "width", "height", "cols", "rows"}], shallowest first.
+    """
+    longest = max(page_rect.width, page_rect.height) / 72
+    depth = max(0, math.ceil(math.log2(longest * max_dpi / tile_size)))
+    levels = []
+    for z in range(depth + 1):
+        dpi = max_dpi / 2 ** (depth - z)
+        width = math.ceil(page_rect.width / 72 * dpi)
+        height = math.ceil(page_rect.height / 72 * dpi)
+        levels.append({
+            "z": z, "dpi": round(dpi, 3), "width": width, "height": height,
+            "cols": math.ceil(width / tile_size), "rows": math.ceil(height / tile_size),
+        })
+    return levels
+
+
+def render_tiles(display_list, page_rect, out_dir, max_dpi=TILE_MAX_DPI,
+                 tile_size=TILE_SIZE):
+    """Write a tile pyramid for one page; return its level descriptions."""
+    levels = pyramid_levels(page_rect, max_dpi, tile_size)
+    for level in levels:
+        scale = level["dpi"] / 72
+        matrix = fitz.Matrix(scale, scale)
+        level_dir = os.path.join(out_dir, str(level["z"]))
+        os.makedirs(level_dir, exist_ok=True)
+        for row in range(level["rows"]):
+            for col in range(level["cols"]):
+                # Tile edges in page points
+                clip = fitz.Rect(col * tile_size / scale, row * tile_size / scale,
+                                 (col + 1) * tile_size / scale, (row + 1) * tile_size / scale)
+                clip &= page_rect
+                pix = display_list.get_pixmap(matrix=matrix, clip=clip, alpha=False)
+                write_atomic(os.path.join(level_dir, f"{col}_{row}.png"), pix.tobytes("png"))
+    return levels
+
+
+def render_page(page, pdf_path, out_dir, dpis=(DEFAULT_DPI,), tiles=False,
+                tile_max_dpi=TILE_MAX_DPI, tile_size=TILE_SIZE, page_no=0):
+    """Render one page at each DPI (and as tiles); return its images and size.
+
+    The page is interpreted once into a display list and every image is
+    rasterized from that.
+    """
+    page_rect = page.rect
+    display_list = page.get_displaylist()
+    entry = {
+        "width_pt": round(page_rect.width, 2),
+        "height_pt": round(page_rect.height, 2),
+        "images": {},
+    }
+    for dpi in dpis:
+        scale = dpi / 72
+        pix = display_list.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+        name = image_name(pdf_path, dpi, page_no)
+        write_atomic(os.path.join(out_dir, name), pix.tobytes("png"))
+        entry["images"][str(dpi)] = {"file": name, "width": pix.width, "height": pix.height}
+
+    if tiles:
+        name = tiles_name(pdf_path, page_no)
+        levels = render_tiles(display_list, page_rect, os.path.join(out_dir, name),
+                              tile_max_dpi, tile_size)
+        entry["tiles"] = {"dir": name, "tile_size": tile_size, "levels": levels}
+    return entry
+
+
+def render_plate(pdf_path, out_dir, dpis=(DEFAULT_DPI,), tiles=False,
+                 tile_max_dpi=TILE_MAX_DPI, tile_size=TILE_SIZE):
+    """Render page 1 of a plate at each DPI (and as tiles); return its manifest entry."""
+    with fitz.open(stream=read_input(pdf_path), filetype="pdf") as doc:
+        entry = {"source": pdf_path, "source_mtime": input_mtime(pdf_path)}
+        entry.update(render_page(doc[0], pdf_path, out_dir, dpis, tiles, tile_max_dpi, tile_size))
+    return entry
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"plates": {}}
+
+
+def is_current(entry, pdf_path, out_dir, dpis, tiles):
+    """Whether a manifest entry already covers this plate as requested."""
+    try:
+        if entry["source_mtime"] != input_mtime(pdf_path):
+            return False
+    except (KeyError, OSError):
+        return False
+    if any(str(dpi) not in entry.get("images", {}) for dpi in dpis):
+        return False
+    if tiles and "tiles" not in entry:
+        return False
+    return all(os.path.exists(os.path.join(out_dir, image["file"]))
+               for image in entry["images"].values())
+
+
+def render_one(task):
+    """Worker: render one plate, never raising (errors become records)."""
+    pdf_path, out_dir, dpis, tiles, tile_max_dpi, tile_size = task
+    start = time.perf_counter()
+    try:
+        entry = render_plate(pdf_path, out_dir, dpis, tiles, tile_max_dpi, tile_size)
+        return "ok", pdf_path, entry, time.perf_counter() - start
+    except Exception as e:
+        error = {"source": pdf_path, "error": f"{type(e).__name__}: {e}"}
+        return "error", pdf_path, error, time.perf_counter() - start
+
+
+def write_manifest(out_dir, plates, errors):
+    manifest = {
+        "default_dpi": DEFAULT_DPI,
+        "rendered_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "plates": dict(sorted(plates.items())),
+        "errors": errors,
+    }
+    write_atomic(os.path.join(out_dir, MANIFEST_NAME),
+                 json.dumps(manifest, indent=1).encode("utf-8"))
+
+
+def render_cycle(paths, out_dir, dpis=(DEFAULT_DPI,), tiles=False,
+                 tile_max_dpi=TILE_MAX_DPI, tile_size=TILE_SIZE,
+                 workers=None, chunksize=4, force=False,
+                 flush_every=MANIFEST_FLUSH_EVERY, worker=render_one):
+    """Render every plate not already current in the manifest; return run statistics.
+
+    The manifest is rewritten every flush_every plates and at the end,
+    keeping entries from earlier runs for plates that were skipped. A
+    plate that kills its worker is recorded as WORKER_CRASHED and counted
+    under "crashed"; worker is the per-plate function run in the pool.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    plates = manifest.get("plates", {})
+    pending = [p for p in paths
+               if force or not is_current(plates.get(input_name(p), {}),
+                                          p, out_dir, dpis, tiles)]
+    stats = {"total": len(paths), "skipped": len(paths) - len(pending),
+             "ok": 0, "error": 0, "crashed": 0, "seconds": 0.0}
+    if not pending:
+        return stats
+
+    start = time.perf_counter()
+    errors = {}
+    tasks = [(p, out_dir, tuple(dpis), tiles, tile_max_dpi, tile_size) for p in pending]
+
+    def crashed(task):
+        stats["crashed"] += 1
+        return "error", task[0], {"source": task[0], "error": WORKER_CRASHED}, 0.0
+
+    results = pool_map(tasks, worker, crashed, workers, chunksize)
+    for n, (status, pdf_path, record, _) in enumerate(results, 1):
+        stats[status] += 1
+        if status == "ok":
+            plates[input_name(pdf_path)] = record
+        else:
+            errors[input_name(pdf_path)] = record["error"]
+        if n % flush_every == 0:
+            write_manifest(out_dir, plates, errors)
+
+    write_manifest(out_dir, plates, errors)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render approach plates for a cycle")
+    parser.add_argument("source",
+                        help="Directory of plate PDFs, a manifest of paths, or a zip archive")
+    parser.add_argument("--out", required=True, help="Per-cycle image directory")
+    parser.add_argument("--dpi", type=int, action="append",
+                        help=f"Resolution to render (repeatable, default {DEFAULT_DPI})")
+    parser.add_argument("--tiles", action="store_true", help="Also write a tile pyramid")
+    parser.add_argument("--tile-max-dpi", type=int, default=TILE_MAX_DPI,
+                        help="Resolution of the deepest tile level")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="Tile edge in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=4,
+                        help="Plates handed to a worker at a time")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render plates that are already current")
+    args = parser.parse_args()
+
+    paths = iter_inputs(args.source)
+    print(f"{len(paths)} plates in {args.source}", file=sys.stderr)
+    stats = render_cycle(paths, args.out, args.dpi or [DEFAULT_DPI], args.tiles,
+                         args.tile_max_dpi, args.tile_size, args.workers,
+                         args.chunksize, args.force)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
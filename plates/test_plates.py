@@ -0,0 +1,762 @@
+#!/usr/bin/env python3
+"""Unit tests for the plate batch, cache, service and index tools."""
+
+import base64
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import batch_extract
+import bundle_plates
+import extract_plate
+import plate_cache
+import plate_changes
+import plate_classify
+import plate_index
+import plate_inputs
+import plate_service
+import plate_vector
+import render_plates
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PDF = os.path.join(HERE, "apa-ils35-faa.pdf")
+JEPPESEN_PDF = os.path.join(HERE, "apa-ils35-jep.pdf")
+SAMPLE_PDFS = [SAMPLE_PDF, JEPPESEN_PDF] + sorted(
+    os.path.join(HERE, "plates", name) for name in os.listdir(os.path.join(HERE, "plates"))
+    if name.endswith(".pdf"))
+
+METAFILE = """<?xml version="1.0"?>
+<digital_tpp cycle="2602">
+ <state_code ID="CO"><city_name ID="DENVER"><airport_name apt_ident="APA">
+  <record><chart_code>IAP</chart_code><chart_name>ILS OR LOC RWY 35R</chart_name>
+   <pdf_name>00057IL35R.PDF</pdf_name></record>
+  <record><chart_code>APD</chart_code><chart_name>AIRPORT DIAGRAM</chart_name>
+   <pdf_name>00057AD.PDF</pdf_name></record>
+  <record><chart_code>STAR</chart_code><chart_name>LANDR FOUR</chart_name>
+   <pdf_name>00057LANDR.PDF</pdf_name></record>
+  <record><chart_code>DP</chart_code><chart_name>GOLDEN</chart_name>
+   <pdf_name>DELETED</pdf_name></record>
+ </airport_name></city_name></state_code>
+</digital_tpp>
+"""
+
+
+def read_ndjson(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def golden(name):
+    with open(os.path.join(HERE, "golden", name + ".json"), encoding="utf-8") as f:
+        return dict(json.load(f), source=name)
+
+
+def write_ndjson(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+class TestExtractPlate(unittest.TestCase):
+    """Test lazy sections, span index, tokens, byte input and instrumentation."""
+
+    @classmethod
+    def setUpClass(cls):
+        with extract_plate.fitz.open(SAMPLE_PDF) as doc:
+            cls.items = extract_plate.extract_text_items(doc[0])
+
+    def test_clipped_sections_match_full_page(self):
+        for pdf_path in SAMPLE_PDFS:
+            full = extract_plate.extract_plate(pdf_path)
+            for name in extract_plate.SECTION_CLIPS:
+                with self.subTest(plate=os.path.basename(pdf_path), section=name):
+                    part = extract_plate.extract_plate(pdf_path, [name])
+                    self.assertEqual(part.get(name), full.get(name))
+                    self.assertEqual(name in part, name in full)
+
+    def test_unknown_section_rejected(self):
+        with self.assertRaises(KeyError):
+            extract_plate.extract_plate(SAMPLE_PDF, ["minimums", "bogus"])
+
+    def test_span_index_matches_linear_scan(self):
+        index = extract_plate.SpanIndex(self.items, cell_size=16)
+
+        def between(v, lo, hi, inclusive):
+            if inclusive:
+                return (lo is None or v >= lo) and (hi is None or v <= hi)
+            return (lo is None or v > lo) and (hi is None or v < hi)
+
+        for box in ((100, 200, 300, 400), (None, 396, None, None), (0, 0, 16, 16),
+                    (-50, None, 1000, 120.5), (250.3, 500.7, 250.3, 500.7)):
+            for inclusive in (False, True):
+                expected = [i for i in self.items
+                            if between(i.x0, box[0], box[2], inclusive)
+                            and between(i.y0, box[1], box[3], inclusive)]
+                self.assertEqual(index.rect(*box, inclusive=inclusive), expected)
+        for item in self.items[::7]:
+            self.assertEqual(index.same_row(item.y0, 2),
+                             [i for i in self.items if abs(i.y0 - item.y0) < 2])
+        self.assertEqual(extract_plate.SpanIndex([]).rect(0, 0, 100, 100), [])
+
+    def test_span_slots(self):
+        span = extract_plate.Span("12", 1.0, 2.0, 3.0, 4.0, 8.0, "Arial" + "Bold".lower())
+        self.assertFalse(hasattr(span, "__dict__"))
+        with self.assertRaises(AttributeError):
+            span.color = 0
+        self.assertIs(span.font, sys.intern("Arialbold"))
+        fraction = span.as_fraction("½")
+        self.assertEqual((fraction.text, fraction.fraction, fraction.x0, fraction.font),
+                         ("½", True, 1.0, span.font))
+        self.assertFalse(span.fraction)
+        # Spans hash by identity: equal boxes are still distinct set members
+        twin = extract_plate.Span("12", 1.0, 2.0, 3.0, 4.0, 8.0, "Arialbold")
+        self.assertEqual(len({span, twin}), 2)
+
+    def test_tokens(self):
+        def span(text, x0=0.0, y0=0.0):
+            return extract_plate.Span(text, x0, y0, x0 + 5, y0 + 6, 6.0, "Arial")
+
+        spans = [span(t) for t in ("118.9", "126.375", "6085", "350°", "DA", "1", "12")]
+        tokens = extract_plate.Tokens(spans)
+        self.assertEqual([t.value for t in tokens.of_kind("frequency")], ["118.9", "126.375"])
+        self.assertEqual([t.value for t in tokens.of_kind("nav_frequency")], [118.9])
+        self.assertEqual([t.span for t in tokens.of_kind("altitude")], [spans[2]])
+        self.assertEqual(tokens.value(spans[2], "altitude"), 6085)
+        self.assertEqual(tokens.value(spans[3], "course"), 350)
+        self.assertFalse(tokens.has(spans[4], "altitude"))
+        self.assertIsNone(tokens.value(spans[4], "frequency"))
+        self.assertTrue(tokens.has(spans[5], "digit"))
+        self.assertFalse(tokens.has(spans[6], "digit"))
+
+        # Fractions: a stacked "1" over "2" and an inline "34"
+        minimums = [span("1", 100, 500), span("2", 100.5, 506), span("34", 200, 500),
+                    span("6085", 50, 500)]
+        items = extract_plate.preprocess_minimums_items(minimums)
+        fractions = sorted((i.text, i.x0) for i in items if i.fraction)
+        self.assertEqual(fractions, [("½", 100), ("¾", 200)])
+        self.assertEqual([i.text for i in items if not i.fraction], ["6085"])
+
+    def test_bytes_input_matches_file(self):
+        expected = extract_plate.extract_plate(SAMPLE_PDF)
+        with open(SAMPLE_PDF, "rb") as f:
+            data = f.read()
+        for source in (data, bytearray(data), memoryview(data), io.BytesIO(data)):
+            with self.subTest(input=type(source).__name__):
+                self.assertEqual(extract_plate.extract_plate_bytes(source, SAMPLE_PDF), expected)
+        with open(SAMPLE_PDF, "rb") as f:
+            self.assertEqual(extract_plate.extract_plate_bytes(f, SAMPLE_PDF), expected)
+        result = extract_plate.extract_plate_bytes(data, "mem.pdf", ["minimums"])
+        self.assertEqual(result, {"source": "mem.pdf", "minimums": expected["minimums"]})
+
+    def test_stage_recorder(self):
+        recorder = extract_plate.StageRecorder()
+        recorder.record("minimums", 0.05, spans=10, outcome="ok")
+        recorder.record("minimums", 3.0, spans=30, outcome="ok")
+        recorder.record("minimums", 2000.0, outcome="empty")
+        other = extract_plate.StageRecorder()
+        other.record("minimums", 0.2, spans=5, outcome="ok")
+        other.record("notes", 1.0)
+        recorder.merge(other.to_dict())
+        result = recorder.to_dict()
+        self.assertEqual(result["buckets_ms"], list(extract_plate.STAGE_BUCKETS_MS))
+        minimums = result["stages"]["minimums"]
+        self.assertEqual((minimums["count"], minimums["total_ms"], minimums["max_ms"],
+                          minimums["mean_ms"]), (4, 2003.25, 2000.0, 500.812))
+        self.assertEqual((minimums["spans"], minimums["max_spans"]), (45, 30))
+        self.assertEqual(minimums["outcomes"], {"ok": 3, "empty": 1})
+        # 0.05 and 0.2 in the two lowest buckets, 3.0 under 5 ms, 2000 in the overflow
+        self.assertEqual(minimums["histogram"], [1, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(result["stages"]["notes"]["count"], 1)
+
+    def test_instrumented_extraction(self):
+        with extract_plate.instrumented() as recorder:
+            with extract_plate.instrumented() as inner:
+                extract_plate.extract_plate(SAMPLE_PDF, ["minimums"])
+            extract_plate.extract_plate(SAMPLE_PDF, ["notes"])
+        # Each run reports into the innermost active recorder only
+        self.assertLessEqual({"text_items", "index_tokens", "minimums"}, set(inner.stages))
+        self.assertNotIn("notes", inner.stages)
+        self.assertEqual(inner.stages["text_items"]["outcomes"], {"clipped": 1})
+        self.assertEqual(set(recorder.stages), {"text_items", "index_tokens", "notes"})
+        with extract_plate.stage("notes") as st:
+            with self.assertRaises(ValueError):
+                with extract_plate.instrumented(recorder):
+                    with extract_plate.stage("minimums"):
+                        raise ValueError("bad plate")
+        self.assertEqual(recorder.stages["minimums"]["outcomes"], {"raised ValueError": 1})
+
+        # Disabled: stages are a shared no-op and record nothing
+        self.assertIs(st, extract_plate.stage("minimums"))
+        st.outcome = "ok"
+        self.assertFalse(hasattr(st, "outcome"))
+        self.assertIsNone(extract_plate._recorder)
+
+
+def fake_extract(pdf_path):
+    """Pool worker standing in for extract_one; "crash" plates kill the process."""
+    if "crash" in os.path.basename(pdf_path):
+        os._exit(1)
+    return "ok", pdf_path, {"source": pdf_path, "content_key": "k"}, 0.0, None, None
+
+
+def fake_render(task):
+    """Pool worker wrapping render_one; "crash" plates kill the process."""
+    if "crash" in os.path.basename(task[0]):
+        os._exit(1)
+    return render_plates.render_one(task)
+
+
+class TestBatchExtract(unittest.TestCase):
+    """Test cycle batch runs, error records and worker crashes."""
+
+    def run_batch(self, tmp, paths, **kwargs):
+        out = os.path.join(tmp, "results.ndjson")
+        errors = os.path.join(tmp, "errors.ndjson")
+        checkpoint = os.path.join(tmp, "checkpoint.txt")
+        stats = batch_extract.run_batch(paths, out, errors, checkpoint, **kwargs)
+        return stats, out, errors, checkpoint
+
+    def test_error_record_carries_content_key(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            broken = os.path.join(tmp, "broken.pdf")
+            with open(broken, "wb") as f:
+                f.write(b"not a pdf")
+            stats, out, errors, _ = self.run_batch(tmp, [SAMPLE_PDF, broken], workers=2)
+            self.assertEqual((stats["ok"], stats["error"]), (1, 1))
+            error = read_ndjson(errors)[0]
+            self.assertEqual(error["source"], broken)
+            self.assertEqual(error["content_key"],
+                             batch_extract.content_key(b"not a pdf"))
+            # Errors are in the results too, so the change feed sees every plate
+            records = {r["source"]: r for r in read_ndjson(out)}
+            self.assertEqual(records[broken], error)
+            self.assertNotIn("error", records[SAMPLE_PDF])
+
+    def test_routed_records_share_unrouted_keys(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            diagram = os.path.join(tmp, "00375AD.PDF")
+            with open(SAMPLE_PDF, "rb") as src, open(diagram, "wb") as dst:
+                dst.write(src.read())
+            stats, out, _, _ = self.run_batch(tmp, [SAMPLE_PDF, diagram], workers=1,
+                                              route=True)
+            self.assertEqual((stats["ok"], stats["unsupported"]), (1, 1))
+            records = {r["source"]: r for r in read_ndjson(out)}
+            self.assertEqual(records[diagram]["skipped"]["chart_type"], "apd")
+            # One key for both plates (same bytes) whether routed or not
+            with open(SAMPLE_PDF, "rb") as f:
+                key = batch_extract.content_key(f.read())
+            self.assertEqual({r["content_key"] for r in records.values()}, {key})
+
+    def test_worker_crash_is_isolated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"{name}.pdf")
+                     for name in ("a", "b", "crash", "c", "d", "e")]
+            stats, out, errors, checkpoint = self.run_batch(
+                tmp, paths, workers=2, chunksize=2, worker=fake_extract)
+            self.assertEqual((stats["ok"], stats["error"], stats["crashed"]), (5, 1, 1))
+            self.assertEqual(sorted(r["source"] for r in read_ndjson(out)
+                                    if "error" not in r),
+                             [p for p in paths if "crash" not in p])
+            error = read_ndjson(errors)[0]
+            self.assertIn(error, read_ndjson(out))
+            self.assertEqual(error["error"], batch_extract.WORKER_CRASHED)
+            self.assertIsNone(error["content_key"])
+            # Every plate is checkpointed, so a resumed run has nothing left
+            self.assertEqual(len(batch_extract.load_checkpoint(checkpoint)), 6)
+
+    def test_resume_skips_checkpointed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, "a.pdf"), os.path.join(tmp, "b.pdf")]
+            self.run_batch(tmp, paths[:1], worker=fake_extract)
+            stats, out, _, _ = self.run_batch(tmp, paths, worker=fake_extract)
+            self.assertEqual((stats["skipped"], stats["ok"]), (1, 1))
+            self.assertEqual(len(read_ndjson(out)), 2)
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test content keys, cache hits and invalidation."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = plate_cache.ExtractionCache(self.tmp.name)
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def extract(self, data, source):
+        self.calls.append(source)
+        return {"source": source, "size": len(data)}
+
+    def test_key_depends_on_bytes_and_version(self):
+        key = plate_cache.content_key(b"plate")
+        self.assertEqual(key, plate_cache.content_key(b"plate"))
+        self.assertNotEqual(key, plate_cache.content_key(b"plate2"))
+        self.assertNotEqual(key, plate_cache.content_key(b"plate", version="2"))
+
+    def test_hit_is_path_independent(self):
+        result, hit = plate_cache.cached_extract("2601/a.pdf", self.cache, b"x", self.extract)
+        self.assertFalse(hit)
+        result, hit = plate_cache.cached_extract("2602/a.pdf", self.cache, b"x", self.extract)
+        self.assertTrue(hit)
+        self.assertEqual(result, {"source": "2602/a.pdf", "size": 1})
+        self.assertEqual(self.calls, ["2601/a.pdf"])
+
+    def test_changed_bytes_or_version_miss(self):
+        plate_cache.cached_extract("a.pdf", self.cache, b"x", self.extract)
+        _, hit = plate_cache.cached_extract("a.pdf", self.cache, b"y", self.extract)
+        self.assertFalse(hit)
+        _, hit = plate_cache.cached_extract("a.pdf", self.cache, b"x", self.extract, version="2")
+        self.assertFalse(hit)
+        self.assertEqual(len(self.calls), 3)
+
+    def test_evicts_least_recently_used(self):
+        for name in ("a", "b", "c"):
+            key = plate_cache.content_key(name.encode())
+            self.cache.put(key, {"pad": "x" * 100})
+            path = self.cache._path(key)
+            os.utime(path, (1000 + ord(name), 1000 + ord(name)))
+        self.cache.max_bytes = sum(size for _, size, _ in self.cache.entries()) - 1
+        self.assertEqual(self.cache.evict()[0], 1)
+        self.assertIsNone(self.cache.get(plate_cache.content_key(b"a")))
+        self.assertIsNotNone(self.cache.get(plate_cache.content_key(b"c")))
+
+
+class TestPlateInputs(unittest.TestCase):
+    """Test plate inputs from directories and zip archives."""
+
+    def test_archive_members(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = os.path.join(tmp, "DDTPPA_2602.zip")
+            with zipfile.ZipFile(archive, "w") as z:
+                z.write(SAMPLE_PDF, "00057IL35R.PDF")
+                z.writestr("README.TXT", "not a plate")
+            paths = plate_inputs.iter_inputs(archive)
+            self.assertEqual(paths, [archive + plate_inputs.ARCHIVE_SEP + "00057IL35R.PDF"])
+            self.assertEqual(plate_inputs.input_name(paths[0]), "00057IL35R.PDF")
+            with open(SAMPLE_PDF, "rb") as f:
+                self.assertEqual(plate_inputs.read_input(paths[0]), f.read())
+            self.assertEqual(plate_inputs.iter_inputs(tmp), [])
+            plate_inputs._archives.pop(archive).close()
+
+
+class TestRenderPlates(unittest.TestCase):
+    """Test cycle rendering from files and zip archives."""
+
+    def test_renders_zip_members_and_skips_current(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = os.path.join(tmp, "DDTPPA_2602.zip")
+            with zipfile.ZipFile(archive, "w") as z:
+                z.write(SAMPLE_PDF, "00057IL35R.PDF")
+            out = os.path.join(tmp, "images")
+            paths = plate_inputs.iter_inputs(archive)
+            stats = render_plates.render_cycle(paths, out, dpis=[20], workers=1)
+            self.assertEqual((stats["ok"], stats["error"]), (1, 0))
+            self.assertTrue(os.path.exists(os.path.join(out, "00057IL35R@20.png")))
+            manifest = render_plates.load_manifest(out)
+            self.assertIn("00057IL35R.PDF", manifest["plates"])
+            stats = render_plates.render_cycle(paths, out, dpis=[20], workers=1)
+            self.assertEqual((stats["skipped"], stats["ok"]), (1, 0))
+
+    def test_manifest_flushed_during_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            broken = os.path.join(tmp, "broken.pdf")
+            with open(broken, "wb") as f:
+                f.write(b"not a pdf")
+            out = os.path.join(tmp, "images")
+            with mock.patch.object(render_plates, "write_manifest",
+                                   wraps=render_plates.write_manifest) as write:
+                render_plates.render_cycle([SAMPLE_PDF, broken], out, dpis=[20],
+                                           workers=1, chunksize=1, flush_every=1)
+            # One rewrite per plate, then the final one
+            self.assertEqual(write.call_count, 3)
+            manifest = render_plates.load_manifest(out)
+            self.assertEqual(list(manifest["plates"]), ["apa-ils35-faa.pdf"])
+            self.assertIn("broken.pdf", manifest["errors"])
+
+    def test_worker_crash_is_recorded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            crash = os.path.join(tmp, "crash.pdf")
+            with open(crash, "wb") as f:
+                f.write(b"never opened")
+            out = os.path.join(tmp, "images")
+            stats = render_plates.render_cycle([SAMPLE_PDF, crash], out, dpis=[20],
+                                               workers=2, chunksize=2, worker=fake_render)
+            self.assertEqual((stats["ok"], stats["error"], stats["crashed"]), (1, 1, 1))
+            manifest = render_plates.load_manifest(out)
+            self.assertEqual(list(manifest["plates"]), ["apa-ils35-faa.pdf"])
+            self.assertEqual(manifest["errors"], {"crash.pdf": batch_extract.WORKER_CRASHED})
+
+
+def fake_bundle(task):
+    """Pool worker wrapping bundle_one; "crash" plates kill the process."""
+    if "crash" in os.path.basename(task[0]):
+        os._exit(1)
+    return bundle_plates.bundle_one(task)
+
+
+class TestBundlePlates(unittest.TestCase):
+    """Test one-pass bundles, their manifest and reruns."""
+
+    def test_bundle_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "bundles")
+            stats = bundle_plates.bundle_cycle([SAMPLE_PDF], out, dpis=[20], workers=1)
+            self.assertEqual((stats["ok"], stats["skipped"], stats["error"]), (1, 0, 0))
+            with open(os.path.join(out, "apa-ils35-faa.bundle.json"), encoding="utf-8") as f:
+                bundle = json.load(f)
+            with open(SAMPLE_PDF, "rb") as f:
+                key = plate_cache.content_key(f.read())
+            self.assertEqual((bundle["version"], bundle["content_key"], bundle["page_count"]),
+                             (bundle_plates.BUNDLE_VERSION, key, 1))
+            page = bundle["pages"][0]
+            expected = golden("apa-ils35-faa.pdf")
+            del expected["source"]
+            self.assertEqual(page["extraction"], expected)
+            self.assertEqual(list(page["images"]), ["20"])
+            self.assertTrue(os.path.exists(os.path.join(out, page["images"]["20"]["file"])))
+            record = bundle_plates.load_manifest(out)["plates"]["apa-ils35-faa.pdf"]
+            self.assertEqual((record["content_key"], record["dpis"], record["tiles"]),
+                             (key, [20], None))
+
+            # Unchanged plate and options: skipped without reopening
+            stats = bundle_plates.bundle_cycle([SAMPLE_PDF], out, dpis=[20], workers=1)
+            self.assertEqual((stats["ok"], stats["skipped"]), (0, 1))
+
+            # A new dpi rebuilds the bundle and writes the new image
+            stats = bundle_plates.bundle_cycle([SAMPLE_PDF], out, dpis=[20, 30], workers=1)
+            self.assertEqual((stats["ok"], stats["skipped"]), (1, 0))
+            self.assertTrue(os.path.exists(os.path.join(out, "apa-ils35-faa@30.png")))
+            record = bundle_plates.load_manifest(out)["plates"]["apa-ils35-faa.pdf"]
+            self.assertEqual(record["dpis"], [20, 30])
+
+    def test_worker_crash_is_recorded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            crash = os.path.join(tmp, "crash.pdf")
+            with open(crash, "wb") as f:
+                f.write(b"never opened")
+            out = os.path.join(tmp, "bundles")
+            with mock.patch.object(bundle_plates, "write_manifest",
+                                   wraps=bundle_plates.write_manifest) as write:
+                stats = bundle_plates.bundle_cycle([SAMPLE_PDF, crash], out, dpis=[20],
+                                                   workers=2, chunksize=2, flush_every=1,
+                                                   worker=fake_bundle)
+            self.assertEqual((stats["ok"], stats["error"], stats["crashed"]), (1, 1, 1))
+            # One rewrite per plate, then the final one
+            self.assertEqual(write.call_count, 3)
+            manifest = bundle_plates.load_manifest(out)
+            self.assertEqual(list(manifest["plates"]), ["apa-ils35-faa.pdf"])
+            self.assertEqual(manifest["errors"], {"crash.pdf": batch_extract.WORKER_CRASHED})
+
+
+class TestPlateService(unittest.TestCase):
+    """Test request validation and worker replacement in the service."""
+
+    def test_bad_sections_are_error_records(self):
+        for sections in (5, "minimums", ["minimums", 3]):
+            response = plate_service.handle_request({"path": SAMPLE_PDF, "sections": sections})
+            self.assertEqual(response, {"ok": False,
+                                        "error": "sections must be a list of section names"})
+        response = plate_service.handle_request({"path": SAMPLE_PDF, "sections": ["bogus"]})
+        self.assertEqual(response["error"], "unknown sections: bogus")
+
+    def test_import_leaves_forkserver_alone(self):
+        code = ("import multiprocessing.forkserver as f, plate_service; "
+                "print(f._forkserver._preload_modules)")
+        output = subprocess.run([sys.executable, "-c", code], cwd=HERE, check=True,
+                                capture_output=True, text=True).stdout
+        self.assertNotIn("extract_plate", output)
+
+    def test_request_errors(self):
+        self.assertFalse(plate_service.handle_request({})["ok"])
+        response = plate_service.handle_request({"path": "/nonexistent.pdf"})
+        self.assertFalse(response["ok"])
+        response = plate_service.handle_request({"pdf_base64": "not base64!"})
+        self.assertFalse(response["ok"])
+
+    def test_section_request(self):
+        response = plate_service.handle_request({"path": SAMPLE_PDF, "sections": ["minimums"]})
+        self.assertTrue(response["ok"])
+        self.assertIn("minimums", response["result"])
+
+    def serve(self, lines, **kwargs):
+        service = plate_service.ExtractionService(**kwargs)
+        responses = []
+        try:
+            plate_service.serve_lines(service, lines, responses.append)
+            return sorted(responses, key=lambda r: r["id"] or 0), service.stats()
+        finally:
+            service.close()
+
+    def test_serve_lines(self):
+        responses, stats = self.serve([
+            json.dumps({"id": 1, "path": SAMPLE_PDF, "sections": ["minimums"]}),
+            json.dumps({"id": 2, "path": SAMPLE_PDF, "sections": 5}),
+            "[1, 2]",
+        ], workers=2)
+        self.assertEqual([r["id"] for r in responses[1:]], [1, 2])
+        self.assertIsNone(responses[0]["id"])
+        self.assertEqual([r["ok"] for r in responses], [False, True, False])
+        self.assertEqual((stats["ok"], stats["error"], stats["crashed"]), (1, 1, 0))
+
+    def test_timeout_replaces_worker(self):
+        request = json.dumps({"id": 1, "path": SAMPLE_PDF})
+        responses, stats = self.serve([request, request], workers=1, timeout=0.001)
+        self.assertEqual([r["error"] for r in responses], ["timeout after 0.001s"] * 2)
+        self.assertEqual((stats["timeout"], stats["restarts"]), (2, 2))
+
+
+class TestPlateVector(unittest.TestCase):
+    """Test PDF object parsing and overlay encoding."""
+
+    def parse(self, source):
+        return plate_vector.parse_pdf_object(source)[0]
+
+    def test_string_escapes(self):
+        self.assertEqual(self.parse(rb"(a\nb\rc\td\be\ff)"), "a\nb\rc\td\be\ff")
+        self.assertEqual(self.parse(rb"(\(x\) \\ \q)"), "(x) \\ q")
+        self.assertEqual(self.parse(rb"(nested (paren) ok)"), "nested (paren) ok")
+
+    def test_string_octal(self):
+        self.assertEqual(self.parse(rb"(\101\102C)"), "ABC")
+        self.assertEqual(self.parse(rb"(\0533)"), "+3")      # at most three digits
+        self.assertEqual(self.parse(rb"(\5x)"), "\x05x")
+        self.assertEqual(self.parse(rb"(\260)"), "\xb0")    # degree sign, latin-1
+
+    def test_string_line_ends(self):
+        self.assertEqual(self.parse(b"(ab\\\r\ncd\\\nef)"), "abcdef")
+        self.assertEqual(self.parse(b"(x\r\ny\rz)"), "x\ny\nz")
+
+    def test_dict_and_refs(self):
+        value = self.parse(b"<< /Type /Measure /GPTS [39.5 -104.8] /VP 12 0 R /N (a\\)b) >>")
+        self.assertEqual(value, {"Type": "Measure", "GPTS": [39.5, -104.8],
+                                 "VP": ("ref", 12), "N": "a)b"})
+
+    def test_paths_round_trip(self):
+        paths = [(0, 1, ((0, 0), (100, -50), (-3, 7))), (2, 0, ((5, 5), (5, 6)))]
+        overlay = {"precision": 0.25, "path_count": 2,
+                   "paths": base64.b64encode(plate_vector.encode_paths(paths)).decode("ascii")}
+        decoded = plate_vector.decode_paths(overlay)
+        self.assertEqual(decoded[0][:2], (0, 1))
+        self.assertEqual(decoded[0][2], [(0.0, 0.0), (25.0, -12.5), (-0.75, 1.75)])
+        self.assertEqual(decoded[1][2], [(1.25, 1.25), (1.25, 1.5)])
+
+    def test_overlay_serializations(self):
+        with plate_vector.fitz.open(SAMPLE_PDF) as doc:
+            overlay = plate_vector.build_overlay(doc, doc[0])
+        self.assertGreater(overlay["path_count"], 0)
+        for binary in (False, True):
+            for compress in (False, True):
+                data = plate_vector.overlay_bytes(overlay, binary, compress)
+                self.assertEqual(plate_vector.load_overlay(data), overlay)
+
+
+class TestPlateIndex(unittest.TestCase):
+    """Test the index build and query round trip."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        faa = golden("apa-ils35-faa.pdf")
+        other = {
+            "source": "other.pdf", "procedure_name": "RNAV (GPS) RWY 17L",
+            "airport": {"faa_id": "APA"},
+            "approach": {"course": 170, "tch": 40, "airport_elevation": 5885},
+            "communications": [{"name": "Tower", "frequency": ["118.9", "126.375"]}],
+            "missed_approach": "Climb to 7000 and hold.",
+            "minimums": {"LPV DA": {"A": {"altitude": 6150, "hat": 250, "visibility": "1¼"}}},
+        }
+        failed = {"source": "failed.pdf", "procedure_name": None,
+                  "minimums": {"error": "CATEGORY row not found"}}
+        results = os.path.join(cls.tmp.name, "results.ndjson")
+        crashed = {"source": "other.pdf", "error": batch_extract.WORKER_CRASHED,
+                   "content_key": None}
+        diagram = {"source": "00375AD.PDF", "skipped": {"chart_type": "apd"},
+                   "content_key": "k"}
+        stale = dict(other, procedure_name="RNAV (GPS) RWY 17L (old)",
+                     approach=dict(other["approach"], tch=50))
+        # Repeated plates (a resumed batch) are indexed once, from their last
+        # record; error and skip records are not indexed, nor do they hide a result
+        write_ndjson(results, [faa, crashed, stale, diagram, failed, faa, other])
+        cls.out = os.path.join(cls.tmp.name, "index")
+        cls.stats = plate_index.build_index(results, cls.out)
+        cls.index = plate_index.PlateIndex(cls.out)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.index.close()
+        cls.tmp.cleanup()
+
+    def test_build_stats(self):
+        self.assertEqual((self.stats["plates"], self.stats["duplicates"]), (3, 2))
+        self.assertEqual(self.index.plate(1), ("other.pdf", "RNAV (GPS) RWY 17L"))
+
+    def test_duplicate_keeps_last_record(self):
+        self.assertEqual(self.index.value("tch", 1), 40)
+        self.assertEqual(self.index.query(["rwy:17L", "tch>45"]), [])
+        self.assertEqual(self.index.query(["name:OLD"]), [])
+
+    def test_terms(self):
+        self.assertEqual(self.index.query(["apt:APA"]), [0, 1])
+        self.assertEqual(self.index.query(["freq:118.9"]), [0, 1])
+        self.assertEqual(self.index.query(["freq:111.3"]), [0])
+        self.assertEqual(self.index.query(["loc:I-APA"]), [0])
+        self.assertEqual(self.index.query(["rwy:17L"]), [1])
+        self.assertEqual(self.index.query(["missed:22.5"]), [0])
+        self.assertEqual(self.index.query(["name:ILS", "name:RNAV"]), [])
+        self.assertEqual(self.index.query(["freq:999.9"]), [])
+
+    def test_column_conditions(self):
+        self.assertEqual(self.index.query(["tch<45"]), [1])
+        self.assertEqual(self.index.query(["tch>=40"]), [0, 1])
+        self.assertEqual(self.index.query(["course=350"]), [0])
+        self.assertEqual(self.index.query(["apt:APA", "glide_slope_angle>3"]), [0])
+        self.assertIsNone(self.index.value("glide_slope_angle", 1))
+
+    def test_minimums_rows_intersect_per_row(self):
+        self.assertEqual(self.index.query(["visibility_sm=1.25"]), [0, 1])
+        self.assertEqual(self.index.query(["visibility_sm>2.5"]), [0])
+        self.assertEqual(self.index.query(["altitude>6100", "hat<300"]), [1])
+        # Both hold on plate 0, but never in the same minimums row
+        self.assertEqual(self.index.query(["altitude<6100", "hat>=250"]), [])
+
+    def test_version_mismatch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"version": 0}, f)
+            with self.assertRaises(ValueError):
+                plate_index.PlateIndex(tmp)
+
+
+class TestPlateChanges(unittest.TestCase):
+    """Test the change feed between two cycles' results."""
+
+    def plate(self, name, key, **fields):
+        return dict(golden("apa-ils35-faa.pdf"), source=f"2602/{name}", content_key=key,
+                    **fields)
+
+    def test_change_feed(self):
+        base = golden("apa-ils35-faa.pdf")
+        minimums = json.loads(json.dumps(base["minimums"]))
+        label = sorted(minimums)[0]
+        category = sorted(minimums[label])[0]
+        old_altitude = minimums[label][category]["altitude"]
+        minimums[label][category]["altitude"] = old_altitude + 20
+        error = {"error": "ValueError: no CATEGORY row", "content_key": "e"}
+        skip = {"skipped": {"publisher": "faa", "chart_type": "apd"}, "content_key": "s"}
+        previous = {
+            "SAME.PDF": self.plate("SAME.PDF", "k1"),
+            "MINS.PDF": self.plate("MINS.PDF", "k2"),
+            "REISSUE.PDF": self.plate("REISSUE.PDF", "k3"),
+            "GONE.PDF": self.plate("GONE.PDF", "k4"),
+            "FAILED.PDF": self.plate("FAILED.PDF", "k5"),
+            "FIXED.PDF": dict(error, source="FIXED.PDF"),
+            "00375AD.PDF": dict(skip, source="00375AD.PDF"),
+            "GONEAD.PDF": dict(skip, source="GONEAD.PDF"),
+            "GONEFAILED.PDF": dict(error, source="GONEFAILED.PDF"),
+        }
+        current = {
+            "SAME.PDF": self.plate("SAME.PDF", "k1", notes="not compared"),
+            "MINS.PDF": self.plate("MINS.PDF", "k2b", minimums=minimums),
+            "REISSUE.PDF": self.plate("REISSUE.PDF", "k3b"),
+            "FAILED.PDF": dict(error, source="FAILED.PDF"),
+            "FIXED.PDF": self.plate("FIXED.PDF", "k6"),
+            "00375AD.PDF": dict(skip, source="00375AD.PDF"),
+            "NEW.PDF": self.plate("NEW.PDF", "k7"),
+            "NEWAD.PDF": dict(skip, source="NEWAD.PDF"),
+        }
+        events, stats = plate_changes.change_feed(previous, current)
+        self.assertEqual(
+            {k: stats[k] for k in ("unchanged", "reissued", "changed", "added", "removed",
+                                   "unknown")},
+            {"unchanged": 2, "reissued": 1, "changed": 1, "added": 1, "removed": 1,
+             "unknown": 5})
+        self.assertEqual([(e["plate"], e["status"]) for e in events],
+                         [("MINS.PDF", "changed"), ("NEW.PDF", "added"),
+                          ("GONE.PDF", "removed")])
+        self.assertEqual(events[0]["airport"], base["airport"]["faa_id"])
+        self.assertEqual(events[0]["changes"], [
+            {"field": f"minimums.{label}.{category}.altitude",
+             "old": old_altitude, "new": old_altitude + 20}])
+
+    def test_load_results(self):
+        ok = self.plate("00057IL35R.PDF", "k")
+        crashed = {"source": "DDTPPA_2602.zip!00057IL35R.PDF",
+                   "error": batch_extract.WORKER_CRASHED, "content_key": None}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.ndjson")
+            # An error never replaces a result; a retried result replaces an error
+            write_ndjson(path, [crashed, ok, crashed, dict(crashed, source="X.PDF")])
+            results = plate_changes.load_results(path)
+        self.assertEqual(sorted(results), ["00057IL35R.PDF", "X.PDF"])
+        self.assertEqual(results["00057IL35R.PDF"], ok)
+        self.assertTrue(plate_changes.unknown(results["X.PDF"]))
+
+
+class TestPlateClassify(unittest.TestCase):
+    """Test chart fingerprinting and routing."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(SAMPLE_PDF, "rb") as f:
+            cls.faa = f.read()
+        with open(JEPPESEN_PDF, "rb") as f:
+            cls.jeppesen = f.read()
+        with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False) as f:
+            f.write(METAFILE)
+        cls.chart_codes = plate_classify.load_chart_codes(f.name)
+        os.unlink(f.name)
+
+    def test_load_chart_codes(self):
+        self.assertEqual(self.chart_codes, {
+            "00057IL35R.PDF": ("IAP", "ILS OR LOC RWY 35R"),
+            "00057AD.PDF": ("APD", "AIRPORT DIAGRAM"),
+            "00057LANDR.PDF": ("STAR", "LANDR FOUR"),
+        })
+
+    def test_chart_code_of(self):
+        self.assertEqual(plate_classify.chart_code_of("/d/DDTPPA_2602.zip!00057landr.pdf",
+                                                      self.chart_codes),
+                         ("STAR", "LANDR FOUR"))
+        self.assertEqual(plate_classify.chart_code_of("2602/00375AD.PDF"), ("APD", None))
+        self.assertEqual(plate_classify.chart_code_of("2602/NE1TO.PDF"), ("MIN", None))
+        self.assertEqual(plate_classify.chart_code_of("2602/00375IL35R.PDF"), (None, None))
+
+    def test_text_routing_without_chart_code(self):
+        self.assertEqual(plate_classify.classify_bytes(self.faa)["extractor"], "faa_approach")
+        chart = plate_classify.classify_bytes(self.jeppesen)
+        self.assertEqual((chart["publisher"], chart["extractor"]), ("jeppesen", None))
+
+    def test_non_iap_chart_code_skips_text_parse(self):
+        for source, codes in (("2602/00057LANDR.PDF", self.chart_codes),
+                              ("2602/00375AD.PDF", None)):
+            with mock.patch.object(plate_classify.Plate, "text",
+                                   side_effect=AssertionError("text parsed")):
+                result = plate_classify.extract_routed(self.faa, source, codes)
+            self.assertEqual(result["source"], source)
+            self.assertEqual(result["skipped"]["publisher"], "faa")
+            self.assertIsNone(result["skipped"]["extractor"])
+        self.assertEqual(result["skipped"]["chart_type"], "apd")
+
+    def test_iap_chart_code_routes_to_extractor(self):
+        result = plate_classify.extract_routed(self.faa, "00057IL35R.PDF", self.chart_codes)
+        self.assertNotIn("skipped", result)
+        self.assertEqual(result["procedure_name"], golden("apa-ils35-faa.pdf")["procedure_name"])
+        chart = plate_classify.classify_bytes(self.faa, "00057IL35R.PDF", self.chart_codes)
+        self.assertEqual((chart["approach"], chart["title"]), ("ILS", "ILS OR LOC RWY 35R"))
+
+    def test_jeppesen_fonts_override_chart_code(self):
+        chart = plate_classify.classify_bytes(self.jeppesen, "00057IL35R.PDF", self.chart_codes)
+        self.assertEqual((chart["publisher"], chart["extractor"]), ("jeppesen", None))
+
+
+if __name__ == "__main__":
+    unittest.main()